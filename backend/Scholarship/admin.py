@@ -1,12 +1,12 @@
 from django.contrib import admin
-from .models import Scholarship, Stage
+from .models import Scholarship, ScholarshipMonthlySummary, Stage
 from django.contrib import messages
 
 
 @admin.register(Scholarship)
 class ScholarshipAdmin(admin.ModelAdmin):
     list_display = ['id', 'scholar_name', 'month_display', 'year', 'days', 'total_pay', 'release', 'status_display']
-    list_filter = ['year', 'month', 'release', 'status']
+    list_filter = ['year', 'month', 'release', 'status', 'current_stage_role', 'current_stage_status']
     search_fields = ['scholar__name', 'year']
     ordering = ['-year', '-month']
 
@@ -49,4 +49,12 @@ class StageAdmin(admin.ModelAdmin):
 
     def status_display(self, obj):
         return dict(obj._meta.get_field('status').choices).get(obj.status, obj.status)
-    status_display.short_description = 'Status'
\ No newline at end of file
+    status_display.short_description = 'Status'
+
+@admin.register(ScholarshipMonthlySummary)
+class ScholarshipMonthlySummaryAdmin(admin.ModelAdmin):
+    list_display = ['year', 'month', 'department', 'status', 'count', 'total_pay', 'pending_fac', 'pending_hod', 'pending_ad', 'pending_dean', 'updated_at']
+    list_filter = ['year', 'month', 'department', 'status']
+    ordering = ['-year', '-month', 'department']
+    # maintained by refresh_monthly_summary; rebuildMonthlySummary fixes drift
+    readonly_fields = [field.name for field in ScholarshipMonthlySummary._meta.fields]
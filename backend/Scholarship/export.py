@@ -0,0 +1,73 @@
+import csv
+import tempfile
+
+from django.http import FileResponse, StreamingHttpResponse
+from openpyxl import Workbook
+
+# (header, lookup) pairs; lookups follow Scholarship -> Student -> supervisors in one SQL join
+COLUMNS = [
+    ('Scholarship ID', 'id'),
+    ('Enrolment No', 'scholar__enroll'),
+    ('Registration No', 'scholar__registration'),
+    ('Name', 'scholar__name'),
+    ('Department', 'scholar__department'),
+    ('JRF/SRF', 'scholar__rf_category'),
+    ('Supervisor', 'scholar__supervisor__name'),
+    ('Co-supervisor', 'scholar__co_supervisor__name'),
+    ('Account No', 'scholar__account_no'),
+    ('IFSC', 'scholar__ifsc'),
+    ('Month', 'month'),
+    ('Year', 'year'),
+    ('Days', 'days'),
+    ('Pay Per Day', 'total_pay_per_day'),
+    ('Total Pay', 'total_pay'),
+    ('Released', 'release'),
+    ('Status', 'status'),
+    ('Current Stage', 'current_stage_role'),
+    ('Stage Status', 'current_stage_status'),
+]
+
+CHUNK_SIZE = 2000
+
+
+class Echo:
+    """File-like object whose write() hands the line back instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+def export_rows(scholarships):
+    rows = scholarships.order_by('year', 'month', 'id').values_list(*[lookup for _, lookup in COLUMNS])
+    return rows.iterator(chunk_size=CHUNK_SIZE)
+
+
+def csv_response(scholarships, filename):
+    writer = csv.writer(Echo())
+
+    def stream():
+        yield writer.writerow([header for header, _ in COLUMNS])
+        for row in export_rows(scholarships):
+            yield writer.writerow(row)
+
+    response = StreamingHttpResponse(stream(), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+    return response
+
+
+def xlsx_response(scholarships, filename):
+    # write-only workbooks spill rows to temporary XML parts instead of keeping cells in memory
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Scholarships')
+    sheet.append([header for header, _ in COLUMNS])
+    for row in export_rows(scholarships):
+        sheet.append(row)
+    output = tempfile.TemporaryFile()
+    workbook.save(output)
+    output.seek(0)
+    return FileResponse(
+        output,
+        as_attachment=True,
+        filename=f"{filename}.xlsx",
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    )
@@ -1,36 +1,84 @@
 from django.db import models
+from django.db.models import Case, ExpressionWrapper, F, OuterRef, Subquery, Value, When
+from django.db.models.functions import Mod
+from django.db.models.lookups import Exact, In
 from calendar import monthrange
 from datetime import date
-from Users.models import Student  
-import json
-import os
-    
+from Users.models import Student
+from Users.config import get_config
 from django.core.exceptions import ValidationError
-from calendar import monthrange
 
 
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-DEPARTMENT_JSON_PATH = os.path.join(BASE_DIR, 'conf.json')
-
-try:
-    if not os.path.exists(DEPARTMENT_JSON_PATH) or os.stat(DEPARTMENT_JSON_PATH).st_size == 0:
-        raise Exception("JSON file does not exist or is empty.")
-    with open(DEPARTMENT_JSON_PATH, 'r') as file:
-        data = json.load(file)
-        college_data = data.get('college', {})
-        status = data.get('status', {})
-        departments = college_data.get('departments', {})
-        roles = college_data.get('roles', {})
-        STATUS=[(key, value) for key, value in status.items()]
-        DEPARTMENT_CHOICES = [(key, value) for key, value in departments.items()]
-        ROLES = [(key, value) for key, value in roles.items()]
-except Exception as e:
-    print(f"Error loading: {e}")
-    DEPARTMENT_CHOICES = []
-    ROLES = []
-    STATUS=[]
-    
-    
+config = get_config()
+STATUS = config.STATUS
+DEPARTMENT_CHOICES = config.DEPARTMENT_CHOICES
+ROLES = config.ROLES
+
+# order in which a released scholarship moves through the approvers
+STAGE_FLOW = ['FAC', 'HOD', 'AD', 'DEAN']
+
+
+def month_length(year='year', month='month'):
+    """Database expression for monthrange(year, month)[1]."""
+    year, month = F(year), F(month)
+    return Case(
+        When(Exact(month, 2), then=Case(
+            When(Exact(Mod(year, 400), 0), then=Value(29)),
+            When(Exact(Mod(year, 100), 0), then=Value(28)),
+            When(Exact(Mod(year, 4), 0), then=Value(29)),
+            default=Value(28),
+        )),
+        When(In(month, [4, 6, 9, 11]), then=Value(30)),
+        default=Value(31),
+        output_field=models.IntegerField(),
+    )
+
+
+def calculate_pay(basic, hra, year, month, days):
+    # per-day rate is derived from the calendar length of the month
+    days_in_month = monthrange(year, month)[1]
+    total_pay_per_day = (basic + (basic * hra)) / days_in_month
+    return total_pay_per_day, days * total_pay_per_day
+
+
+class ScholarshipQuerySet(models.QuerySet):
+    """
+    Role inbox filters over the denormalized current stage. Roles outside
+    STAGE_FLOW fall back to joining Stage.
+    """
+
+    def reached(self, role):
+        if role not in STAGE_FLOW:
+            return self.filter(stage__role=role).distinct()
+        return self.filter(current_stage_role__in=STAGE_FLOW[STAGE_FLOW.index(role):])
+
+    def approved_by(self, role):
+        if role not in STAGE_FLOW:
+            return self.filter(stage__status="1", stage__role=role)
+        return self.filter(
+            models.Q(current_stage_role__in=STAGE_FLOW[STAGE_FLOW.index(role) + 1:])
+            | models.Q(current_stage_role=role, current_stage_status="1")
+        )
+
+    def pending_with(self, role):
+        if role not in STAGE_FLOW:
+            return self.filter(stage__status="2", stage__role=role)
+        return self.filter(current_stage_role=role, current_stage_status="2")
+
+    def reprice(self):
+        """
+        Recomputes total_pay_per_day and total_pay from each scholar's current
+        basic/HRA and the stored days in one UPDATE, with the calculate_pay
+        formula. Sends no signals; returns the number of rows updated.
+        """
+        money = models.DecimalField(max_digits=12, decimal_places=2)
+        monthly = Student.objects.filter(pk=OuterRef('scholar_id')).annotate(
+            monthly=ExpressionWrapper(F('scholarship_basic') * (Value(1) + F('scholarship_hra')), output_field=money)
+        ).values('monthly')[:1]
+        return self.update(
+            total_pay_per_day=ExpressionWrapper(Subquery(monthly) / month_length(), output_field=money),
+            total_pay=ExpressionWrapper(Subquery(monthly) * F('days') / month_length(), output_field=money),
+        )
 
 
 class Scholarship(models.Model):
@@ -42,6 +90,11 @@ class Scholarship(models.Model):
     total_pay_per_day = models.DecimalField(max_digits=12, decimal_places=2, editable=False)
     release = models.BooleanField(default=False)
     status = models.CharField(max_length=255, choices=STATUS, default="2")
+    # copy of the latest Stage's role/status, written together with the Stage rows
+    current_stage_role = models.CharField(max_length=255, choices=ROLES, null=True, blank=True)
+    current_stage_status = models.CharField(max_length=255, choices=STATUS, null=True, blank=True)
+
+    objects = ScholarshipQuerySet.as_manager()
 
     def save(self, *args, **kwargs):
         if self.scholar.admission_category != "INST_FEL":
@@ -49,11 +102,9 @@ class Scholarship(models.Model):
         
         if not self.days:
             self.days = monthrange(self.year, self.month)[1]
-        basic = self.scholar.scholarship_basic
-        hra = self.scholar.scholarship_hra
-        days_in_month = monthrange(self.year, self.month)[1]
-        self.total_pay_per_day = (basic + (basic * hra)) / days_in_month
-        self.total_pay = self.days * self.total_pay_per_day
+        self.total_pay_per_day, self.total_pay = calculate_pay(
+            self.scholar.scholarship_basic, self.scholar.scholarship_hra, self.year, self.month, self.days
+        )
 
         # is_new = self.pk is None
         super().save(*args, **kwargs)
@@ -61,6 +112,17 @@ class Scholarship(models.Model):
         # if is_new:
         #     Stage.objects.create(scholarship=self)
 
+    class Meta:
+        constraints = [
+            # also serves the (scholar, month, year) lookups
+            models.UniqueConstraint(fields=['scholar', 'month', 'year'], name='unique_scholar_month_year')
+        ]
+        indexes = [
+            models.Index(fields=['year', 'month', 'id'], name='scholarship_period_idx'),
+            models.Index(fields=['release', 'status'], name='scholarship_release_status_idx'),
+            models.Index(fields=['current_stage_role', 'current_stage_status'], name='scholarship_current_stage_idx'),
+        ]
+
     def __str__(self):
         return f"Scholarship for {self.scholar.name} - {self.get_month_display()} {self.year}"
 
@@ -73,3 +135,38 @@ class Stage(models.Model):
         constraints = [
             models.UniqueConstraint(fields=['scholarship', 'role', 'status'], name='unique_scholarship_role_status')
         ]
+        indexes = [
+            models.Index(fields=['role', 'status', 'scholarship'], name='stage_role_status_idx'),
+            # role inboxes only ever look for pending stages, which stay a small slice of the table
+            models.Index(fields=['role', 'scholarship'], condition=models.Q(status='2'), name='stage_pending_role_idx'),
+        ]
+
+
+class ScholarshipMonthlySummary(models.Model):
+    """
+    Rollup of Scholarship per year/month/department/status, kept current by
+    Scholarship.reports.refresh_monthly_summary. Scholars without a
+    department are counted under ''.
+    """
+    year = models.IntegerField()
+    month = models.IntegerField(choices=[(i, date(2000, i, 1).strftime('%B')) for i in range(1, 13)])
+    department = models.CharField(max_length=255, blank=True, default='')
+    status = models.CharField(max_length=255, choices=STATUS)
+    count = models.IntegerField(default=0)
+    total_pay = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    # days in the month minus days paid, summed; divide by count for the average
+    deducted_days = models.IntegerField(default=0)
+    # scholarships whose current stage is pending with each STAGE_FLOW role
+    pending_fac = models.IntegerField(default=0)
+    pending_hod = models.IntegerField(default=0)
+    pending_ad = models.IntegerField(default=0)
+    pending_dean = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['year', 'month', 'department', 'status'], name='unique_monthly_summary')
+        ]
+
+    def __str__(self):
+        return f"{self.get_month_display()} {self.year} {self.department or '-'} ({self.status})"
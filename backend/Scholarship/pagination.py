@@ -0,0 +1,62 @@
+import base64
+
+from django.conf import settings
+from django.db.models import Q
+
+
+# largest value a BIGINT column can compare against
+MAX_KEY = 2 ** 63 - 1
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(scholarship):
+    raw = f"{scholarship.year}:{scholarship.month}:{scholarship.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        year, month, pk = map(int, base64.urlsafe_b64decode(cursor.encode()).decode().split(":"))
+    except (ValueError, UnicodeError):
+        raise InvalidCursor("Cursor is not valid.")
+    # a tampered cursor must not reach the query (out-of-range integers fail there, not here)
+    if not (0 <= year <= MAX_KEY and 1 <= month <= 12 and 0 <= pk <= MAX_KEY):
+        raise InvalidCursor("Cursor is not valid.")
+    return year, month, pk
+
+
+def get_page_size(value):
+    # falls back to the default for missing values, caps at the configured maximum
+    default = getattr(settings, 'SCHOLARSHIP_PAGE_SIZE', 50)
+    maximum = getattr(settings, 'SCHOLARSHIP_MAX_PAGE_SIZE', 500)
+    if value in (None, ''):
+        return default
+    try:
+        page_size = int(value)
+    except (TypeError, ValueError):
+        raise InvalidCursor("page_size must be an integer.")
+    if page_size < 1:
+        raise InvalidCursor("page_size must be positive.")
+    return min(page_size, maximum)
+
+
+def keyset_page(queryset, cursor=None, page_size=None):
+    """
+    Returns one page of scholarships ordered by (year, month, id) and the cursor
+    of the next page. Each page is a single indexed range scan, so the cost stays
+    the same no matter how far into the history the caller is.
+    """
+    queryset = queryset.order_by('year', 'month', 'id')
+    if cursor:
+        year, month, pk = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(year__gt=year)
+            | Q(year=year, month__gt=month)
+            | Q(year=year, month=month, id__gt=pk)
+        )
+    rows = list(queryset[:page_size + 1])
+    next_cursor = encode_cursor(rows[page_size - 1]) if len(rows) > page_size else None
+    return rows[:page_size], next_cursor
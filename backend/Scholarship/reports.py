@@ -0,0 +1,223 @@
+"""
+Payroll totals computed in the database with GROUP BY. Ad-hoc reports are
+cached per grouping and filter set; any scholarship change bumps
+PAYROLL_VERSION_KEY so every cached report goes stale at once. The bump only
+reaches other processes through a shared cache backend; with LocMemCache a
+management command's changes show up once PAYROLL_CACHE_TTL expires. The
+fixed year/month/department/status rollup is stored in
+ScholarshipMonthlySummary.
+"""
+import hashlib
+import json
+import operator
+import time
+from decimal import Decimal
+from functools import reduce
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Avg, Count, F, Q, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import STAGE_FLOW, Scholarship, ScholarshipMonthlySummary, month_length
+
+PAYROLL_CACHE_PREFIX = 'payroll:summary:'
+PAYROLL_VERSION_KEY = 'payroll:version'
+
+# name used in ?group_by= and as a filter -> Scholarship lookup
+DIMENSIONS = {
+    'year': 'year',
+    'month': 'month',
+    'department': 'scholar__department',
+    'rf_category': 'scholar__rf_category',
+    'supervisor': 'scholar__supervisor',
+    'status': 'status',
+    'release': 'release',
+}
+DEFAULT_GROUPS = ('year', 'month')
+CENTS = Decimal('0.01')
+
+
+class InvalidReport(ValueError):
+    pass
+
+
+def _integer(name, value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise InvalidReport(f"{name} must be an integer.")
+
+
+def _boolean(name, value):
+    if str(value).lower() in ('true', '1'):
+        return True
+    if str(value).lower() in ('false', '0'):
+        return False
+    raise InvalidReport(f"{name} must be true or false.")
+
+
+PARSERS = {'year': _integer, 'month': _integer, 'supervisor': _integer, 'release': _boolean}
+
+
+def parse_groups(value):
+    """'year,department' -> ('year', 'department'); DEFAULT_GROUPS when empty."""
+    groups = tuple(dict.fromkeys(part.strip() for part in (value or '').split(',') if part.strip()))
+    unknown = [group for group in groups if group not in DIMENSIONS]
+    if unknown:
+        raise InvalidReport(f"Unknown group_by {', '.join(unknown)}; choose from {', '.join(DIMENSIONS)}.")
+    return groups or DEFAULT_GROUPS
+
+
+def parse_filters(params):
+    """The DIMENSIONS present in ``params``, converted to their column types."""
+    filters = {}
+    for name in DIMENSIONS:
+        value = params.get(name)
+        if value not in (None, ''):
+            filters[name] = PARSERS[name](name, value) if name in PARSERS else value
+    return filters
+
+
+def payroll_version():
+    cache.add(PAYROLL_VERSION_KEY, time.time_ns(), None)
+    return cache.get(PAYROLL_VERSION_KEY)
+
+
+def invalidate_payroll():
+    # called by the Scholarship/Student signals and by the bulk paths that skip them
+    cache.set(PAYROLL_VERSION_KEY, time.time_ns(), None)
+
+
+def _cache_key(groups, filters):
+    raw = json.dumps([list(groups), sorted(filters.items())], default=str)
+    return f"{PAYROLL_CACHE_PREFIX}{payroll_version()}:{hashlib.sha1(raw.encode()).hexdigest()}"
+
+
+def aggregate_payroll(groups, filters):
+    """
+    One GROUP BY query: scholarship count, Sum(total_pay) and the average days
+    deducted from the month (days in month - days paid) per group.
+    """
+    scholarships = Scholarship.objects.all()
+    for name, value in filters.items():
+        lookup = 'scholar__department__iexact' if name == 'department' else DIMENSIONS[name]
+        scholarships = scholarships.filter(**{lookup: value})
+    lookups = [DIMENSIONS[group] for group in groups]
+    rows = (
+        scholarships.values(*lookups)
+        .annotate(
+            count=Count('id'),
+            pay=Sum('total_pay'),
+            avg_deducted_days=Avg(month_length() - F('days')),
+        )
+        .order_by(*lookups)
+    )
+    return [
+        {
+            **{group: row[lookup] for group, lookup in zip(groups, lookups)},
+            'count': row['count'],
+            'total_pay': str(Decimal(row['pay']).quantize(CENTS)),
+            'avg_deducted_days': round(float(row['avg_deducted_days']), 2),
+        }
+        for row in rows
+    ]
+
+
+def payroll_summary(groups, filters):
+    """Cached aggregate_payroll() plus overall totals."""
+    key = _cache_key(groups, filters)
+    report = cache.get(key)
+    if report is None:
+        rows = aggregate_payroll(groups, filters)
+        report = {
+            'group_by': list(groups),
+            'filters': filters,
+            'rows': rows,
+            'count': sum(row['count'] for row in rows),
+            'total_pay': str(sum((Decimal(row['total_pay']) for row in rows), CENTS)),
+        }
+        cache.set(key, report, getattr(settings, 'PAYROLL_CACHE_TTL', 600))
+    return report
+
+
+# STAGE_FLOW role -> ScholarshipMonthlySummary pending column
+PENDING_COLUMNS = {role: f"pending_{role.lower()}" for role in STAGE_FLOW}
+SUMMARY_KEY = ['year', 'month', 'department', 'status']
+
+
+def summary_rows(scholarships):
+    """Unsaved ScholarshipMonthlySummary rows for ``scholarships`` (one GROUP BY)."""
+    rows = (
+        scholarships.annotate(summary_department=Coalesce('scholar__department', Value('')))
+        .values('year', 'month', 'summary_department', 'status')
+        .annotate(
+            scholarships=Count('id'),
+            pay=Sum('total_pay'),
+            deducted=Sum(month_length() - F('days')),
+            **{
+                column: Count('id', filter=Q(current_stage_role=role, current_stage_status='2'))
+                for role, column in PENDING_COLUMNS.items()
+            },
+        )
+        .order_by()
+    )
+    return [
+        ScholarshipMonthlySummary(
+            year=row['year'],
+            month=row['month'],
+            department=row['summary_department'],
+            status=row['status'],
+            count=row['scholarships'],
+            total_pay=Decimal(row['pay']).quantize(CENTS),
+            deducted_days=row['deducted'],
+            **{column: row[column] for column in PENDING_COLUMNS.values()},
+        )
+        for row in rows
+    ]
+
+
+def _group_scope(year, month, department):
+    # (Scholarship filter, summary filter) for one group; department None means the whole month
+    period = Q(year=year, month=month)
+    if department is None:
+        return period, period
+    if not department:
+        return period & (Q(scholar__department__isnull=True) | Q(scholar__department='')), period & Q(department='')
+    return period & Q(scholar__department=department), period & Q(department=department)
+
+
+def refresh_monthly_summary(groups=None):
+    """
+    Recomputes the summary rows of the given (year, month, department) groups
+    from Scholarship, or the whole table when ``groups`` is None. Returns the
+    number of rows written.
+    """
+    scholarships = Scholarship.objects.all()
+    summaries = ScholarshipMonthlySummary.objects.all()
+    if groups is not None:
+        scopes = [_group_scope(*group) for group in set(groups)]
+        if not scopes:
+            return 0
+        scholarships = scholarships.filter(reduce(operator.or_, (scope for scope, _ in scopes)))
+        summaries = summaries.filter(reduce(operator.or_, (scope for _, scope in scopes)))
+    with transaction.atomic():
+        rows = summary_rows(scholarships)
+        # statuses that emptied out must disappear, the rest are rewritten
+        summaries.delete()
+        ScholarshipMonthlySummary.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=SUMMARY_KEY,
+            update_fields=[
+                'count', 'total_pay', 'deducted_days', *PENDING_COLUMNS.values(), 'updated_at',
+            ],
+        )
+    return len(rows)
+
+
+def schedule_summary_refresh(groups):
+    """refresh_monthly_summary(groups) once the current transaction commits."""
+    groups = set(groups)
+    transaction.on_commit(lambda: refresh_monthly_summary(groups))
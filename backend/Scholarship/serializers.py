@@ -5,7 +5,8 @@ class ScholarshipSerializer(serializers.ModelSerializer):
     student_name = serializers.CharField(source='scholar.name', read_only=True)
     class Meta:
         model = Scholarship
-        fields = ['id', 'scholar', 'month', 'year', 'days', 'total_pay', 'total_pay_per_day', 'release', 'status', 'student_name']
+        fields = ['id', 'scholar', 'month', 'year', 'days', 'total_pay', 'total_pay_per_day', 'release', 'status', 'current_stage_role', 'current_stage_status', 'student_name']
+        read_only_fields = ['current_stage_role', 'current_stage_status']
     
     def to_representation(self, instance):
         ret = super().to_representation(instance)
@@ -21,4 +22,9 @@ class ScholarshipSerializer(serializers.ModelSerializer):
 class StageSerializer(serializers.ModelSerializer):
     class Meta:
         model = Stage
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+
+class MonthlySummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ScholarshipMonthlySummary
+        exclude = ['id']
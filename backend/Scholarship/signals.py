@@ -0,0 +1,54 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from Users.models import Student
+
+from .models import Scholarship
+from .reports import invalidate_payroll, schedule_summary_refresh
+
+
+@receiver(post_save, sender=Scholarship)
+@receiver(post_delete, sender=Scholarship)
+@receiver(post_save, sender=Student)
+@receiver(post_delete, sender=Student)
+def drop_payroll_reports(sender, instance, **kwargs):
+    # a scholar's department, category or supervisor regroups their scholarships
+    invalidate_payroll()
+
+
+# Student fields that feed Scholarship pay or the department rollup
+PAY_INPUTS = ('scholarship_basic', 'scholarship_hra', 'department')
+
+
+def _pay_inputs(values):
+    # rates as Decimals so 0.24 (float) and Decimal('0.24') compare equal
+    return tuple(Student._meta.get_field(name).to_python(value) for name, value in zip(PAY_INPUTS, values))
+
+
+@receiver(pre_save, sender=Student)
+def remember_pay_inputs(sender, instance, raw=False, update_fields=None, **kwargs):
+    # one primary-key lookup; saves that cannot touch the inputs skip it
+    if raw or instance._state.adding or (update_fields is not None and not set(PAY_INPUTS) & set(update_fields)):
+        return
+    instance._pay_inputs = Student.objects.filter(pk=instance.pk).values_list(*PAY_INPUTS).first()
+
+
+@receiver(post_save, sender=Student)
+def reprice_unreleased(sender, instance, created, **kwargs):
+    # Student.save may have changed the rates (e.g. JRF -> SRF); released rows keep what was submitted
+    before = instance.__dict__.pop('_pay_inputs', None)
+    if created or before is None:
+        return
+    old_basic, old_hra, old_department = _pay_inputs(before)
+    basic, hra, department = _pay_inputs(getattr(instance, name) for name in PAY_INPUTS)
+    groups = set()
+    if (old_basic, old_hra) != (basic, hra):
+        unreleased = Scholarship.objects.filter(scholar=instance, release=False)
+        if unreleased.reprice():
+            groups.update((year, month, department or '') for year, month in unreleased.values_list('year', 'month'))
+    if old_department != department:
+        # every month of this scholar moves from one department's rollup to the other's
+        periods = Scholarship.objects.filter(scholar=instance).values_list('year', 'month').distinct()
+        groups.update((year, month, name or '') for year, month in periods for name in (old_department, department))
+    if groups:
+        schedule_summary_refresh(groups)
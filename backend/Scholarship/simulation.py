@@ -0,0 +1,124 @@
+"""
+What-if payroll: loads one period's pay inputs into NumPy arrays and evaluates
+rate scenarios with the calculate_pay formula, without writing anything.
+
+A scenario overrides ``basic`` and/or ``hra``, either for everyone
+(``{"hra": 0.24}``) or per rf_category (``{"basic": {"SRF": 45000}}``).
+Scenarios are evaluated in chunks of (scenarios x scholarships) matrices of
+at most CHUNK_CELLS values, so memory stays flat however many are sent.
+"""
+from numbers import Number
+
+import numpy as np
+
+from .models import Scholarship
+
+RATES = ('basic', 'hra')
+# values per (scenarios x scholarships) matrix; a few of them (8 MB each) are alive at once
+CHUNK_CELLS = 1_000_000
+MONTH_DAYS = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+
+
+class InvalidScenario(ValueError):
+    pass
+
+
+def month_lengths(years, months):
+    """Vectorized monthrange(year, month)[1]."""
+    leap = (years % 4 == 0) & ((years % 100 != 0) | (years % 400 == 0))
+    return MONTH_DAYS[months - 1] + ((months == 2) & leap)
+
+
+class PayrollPeriod:
+    """Pay inputs of the scholarships matching ``filters``, one array per column."""
+
+    def __init__(self, rows):
+        columns = list(zip(*rows)) or [()] * 7
+        years, months, days, basic, hra, categories, departments = columns
+        self.days = np.array(days, dtype=float)
+        self.month_days = month_lengths(np.array(years, dtype=int), np.array(months, dtype=int)).astype(float)
+        self.basic = np.array(basic, dtype=float)
+        self.hra = np.array(hra, dtype=float)
+        self.categories, self.category_index = np.unique(np.array(categories, dtype=str), return_inverse=True)
+        self.departments, self.department_index = np.unique(
+            np.array([department or '' for department in departments], dtype=str), return_inverse=True
+        )
+
+    @classmethod
+    def load(cls, **filters):
+        """One query; ``filters`` are Scholarship lookups (year=, month=, scholar__department__iexact=...)."""
+        return cls(list(Scholarship.objects.filter(**filters).values_list(
+            'year', 'month', 'days', 'scholar__scholarship_basic', 'scholar__scholarship_hra',
+            'scholar__rf_category', 'scholar__department',
+        )))
+
+    def __len__(self):
+        return len(self.days)
+
+    def rate_matrix(self, scenarios, rate):
+        """(scenarios x scholarships) values of ``rate``; scholarships without an override keep their own."""
+        current = getattr(self, rate)
+        table = np.full((len(scenarios), len(self.categories)), np.nan)
+        for row, scenario in enumerate(scenarios):
+            override = scenario.get(rate)
+            if isinstance(override, dict):
+                for category, value in override.items():
+                    table[row, self.categories == category] = value
+            elif override is not None:
+                table[row, :] = override
+        overrides = table[:, self.category_index]
+        return np.where(np.isnan(overrides), current, overrides)
+
+    def pay(self, basic, hra):
+        # calculate_pay: (basic + basic * hra) / days in month * days paid
+        return (basic + basic * hra) / self.month_days * self.days
+
+    def by_department(self, pay):
+        """(scenarios x scholarships) pay -> (scenarios x departments) sums, one bincount for the chunk."""
+        width = len(self.departments)
+        index = self.department_index + width * np.arange(len(pay))[:, np.newaxis]
+        return np.bincount(index.ravel(), weights=pay.ravel(), minlength=len(pay) * width).reshape(len(pay), width)
+
+    def simulate(self, scenarios, chunk_cells=CHUNK_CELLS):
+        """Baseline and per-scenario totals and deltas, overall and by department."""
+        scenarios = [parse_scenario(scenario) for scenario in scenarios]
+        baseline = self.by_department(self.pay(self.basic, self.hra)[np.newaxis])[0]
+        step = max(1, chunk_cells // max(len(self), 1))
+        totals = np.zeros((len(scenarios), len(self.departments)))
+        for start in range(0, len(scenarios), step):
+            chunk = scenarios[start:start + step]
+            pay = self.pay(self.rate_matrix(chunk, 'basic'), self.rate_matrix(chunk, 'hra'))
+            totals[start:start + len(chunk)] = self.by_department(pay)
+        return {
+            'count': len(self),
+            'baseline': self._report(baseline, np.zeros_like(baseline)),
+            'scenarios': [
+                {'name': scenario.get('name') or f"scenario {index + 1}", **self._report(total, total - baseline)}
+                for index, (scenario, total) in enumerate(zip(scenarios, totals))
+            ],
+        }
+
+    def _report(self, by_department, delta):
+        return {
+            'total': round(float(by_department.sum()), 2),
+            'delta': round(float(delta.sum()), 2),
+            'departments': {
+                department: {'total': round(float(total), 2), 'delta': round(float(change), 2)}
+                for department, total, change in zip(self.departments, by_department, delta)
+            },
+        }
+
+
+def parse_scenario(scenario):
+    """Checks one scenario: each rate is a non-negative number or {rf_category: number}."""
+    if not isinstance(scenario, dict):
+        raise InvalidScenario("Each scenario must be an object.")
+    for rate in RATES:
+        value = scenario.get(rate)
+        values = value.values() if isinstance(value, dict) else [] if value is None else [value]
+        for number in values:
+            if not isinstance(number, Number) or isinstance(number, bool) or number < 0:
+                raise InvalidScenario(f"{rate} must be a non-negative number or a {{category: number}} map.")
+    if not any(scenario.get(rate) is not None for rate in RATES):
+        raise InvalidScenario(f"A scenario must override at least one of {', '.join(RATES)}.")
+    return scenario
@@ -1,3 +1,692 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.contrib.auth.models import User
+from django.db import connection
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.conf import settings
+from django.test.utils import CaptureQueriesContext
+from django.core.management import call_command
+from rest_framework.test import APIClient
+from io import BytesIO, StringIO
+from openpyxl import load_workbook
+from decimal import Decimal
+from calendar import monthrange
+from datetime import date
+import numpy as np
+import base64
+import time
 
-# Create your tests here.
+from Users.models import Roles
+from Users.tests import make_faculty, make_student
+from .models import Scholarship, ScholarshipMonthlySummary, Stage, calculate_pay, month_length
+from .reports import refresh_monthly_summary
+from .simulation import PayrollPeriod, month_lengths
+from . import workflow
+from unittest import mock
+
+
+class ScholarshipListQueryCountTests(TestCase):
+    """Scholarship list endpoints must not issue one query per row."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.supervisor = make_faculty('sup', roles=('FAC', 'HOD'))
+
+    def add_scholarships(self, count):
+        start = Scholarship.objects.count()
+        for i in range(start, start + count):
+            scholar = make_student(f"scholar{i}", self.supervisor)
+            scholarship = Scholarship.objects.create(
+                scholar=scholar, month=1, year=2025, release=True, current_stage_role='FAC', current_stage_status='2'
+            )
+            Stage.objects.create(scholarship=scholarship, role='FAC')
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def assertConstantQueries(self, url):
+        self.add_scholarships(2)
+        small = self.count_queries(url)
+        self.add_scholarships(10)
+        self.assertEqual(self.count_queries(url), small, url)
+
+    def test_scholarship_list(self):
+        self.assertConstantQueries('/api/scholarships/manage/')
+
+    def test_scholarship_list_paged(self):
+        self.assertConstantQueries('/api/scholarships/manage/?page_size=100')
+
+    def test_scholarship_list_by_role(self):
+        self.assertConstantQueries(f'/api/scholarships/manage/?faculty={self.supervisor.id}&role=FAC')
+
+    def test_scholarship_list_by_role_pending(self):
+        self.assertConstantQueries(f'/api/scholarships/manage/?faculty={self.supervisor.id}&role=FAC&type=role_pending')
+
+
+class KeysetPaginationTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        supervisor = make_faculty('sup')
+        scholars = [make_student(f"scholar{i}", supervisor) for i in range(4)]
+        # insertion order differs from (year, month) order so ids alone cannot sort the pages
+        periods = [(2025, 1, 0), (2025, 1, 1), (2024, 12, 0), (2025, 1, 2), (2024, 12, 1), (2024, 2, 0), (2025, 1, 3)]
+        for year, month, scholar in periods:
+            Scholarship.objects.create(scholar=scholars[scholar], year=year, month=month)
+        self.expected = list(Scholarship.objects.order_by('year', 'month', 'id').values_list('id', flat=True))
+
+    def get(self, **params):
+        response = self.client.get('/api/scholarships/manage/', params)
+        return response, response.json()
+
+    def walk(self, page_size):
+        ids, pages, cursor = [], 0, None
+        while True:
+            params = {'page_size': page_size, **({'cursor': cursor} if cursor else {})}
+            response, body = self.get(**params)
+            self.assertEqual(response.status_code, 200)
+            ids += [row['id'] for row in body['scholarships']]
+            pages += 1
+            cursor = body['next']
+            if cursor is None:
+                return ids, pages
+
+    def test_pages_follow_year_month_id_across_ties(self):
+        for page_size in (1, 2, 3, 7, 10):
+            ids, pages = self.walk(page_size)
+            self.assertEqual(ids, self.expected, page_size)
+            self.assertEqual(pages, max(1, -(-len(self.expected) // page_size)), page_size)
+
+    def test_last_page_has_no_cursor(self):
+        _, body = self.get(page_size=len(self.expected))
+        self.assertEqual(len(body['scholarships']), len(self.expected))
+        self.assertIsNone(body['next'])
+        _, body = self.get(page_size=len(self.expected) - 1)
+        self.assertIsNotNone(body['next'])
+        _, body = self.get(page_size=10, cursor=body['next'])
+        self.assertEqual([row['id'] for row in body['scholarships']], self.expected[-1:])
+        self.assertIsNone(body['next'])
+
+    def test_malformed_cursors_are_rejected(self):
+        def encode(raw):
+            return base64.urlsafe_b64encode(raw.encode()).decode()
+
+        cursors = [
+            'not base64!', 'YWJj', encode('2025:1'), encode('2025:1:2:3'), encode('a:b:c'),
+            encode('2025:13:1'), encode('2025:0:1'), encode('-1:1:1'), encode('2025:1:-5'),
+            encode(f"2025:1:{2 ** 70}"), encode(f"{2 ** 70}:1:1"), base64.urlsafe_b64encode(b'\xff\xfe').decode(),
+        ]
+        for cursor in cursors:
+            response, body = self.get(cursor=cursor)
+            self.assertEqual(response.status_code, 400, cursor)
+            self.assertIn('error', body)
+        for page_size in ('x', '0', '-3'):
+            response, _ = self.get(page_size=page_size)
+            self.assertEqual(response.status_code, 400, page_size)
+
+
+class TokenClaimsTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.supervisor = make_faculty('sup', roles=('FAC', 'HOD'))
+        self.supervisor.user.set_password('secret')
+        self.supervisor.user.save()
+        self.other = make_faculty('other', roles=('FAC',))
+        response = self.client.post('/api/users/token/', {'username': 'sup', 'password': 'secret'})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.json()['tokens']['access']}")
+
+    def test_faculty_comes_from_token(self):
+        # the spoofed faculty parameter is ignored in favour of the token's id
+        response = self.client.get(f'/api/scholarships/manage/?faculty={self.other.id}&role=HOD')
+        self.assertEqual(response.status_code, 200)
+
+    def test_roles_claim_skips_role_lookup(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get('/api/scholarships/manage/?role=FAC')
+        self.assertFalse([q for q in ctx.captured_queries if 'users_roles' in q['sql'].lower()])
+
+    def test_revoked_role_is_rejected(self):
+        Roles.objects.filter(faculty=self.supervisor, role='HOD').get().delete()
+        response = self.client.get('/api/scholarships/manage/?role=HOD')
+        self.assertEqual(response.status_code, 400)
+
+    def test_scholar_token_cannot_borrow_faculty_param(self):
+        scholar = make_student('scholar', self.supervisor)
+        scholar.user.set_password('secret')
+        scholar.user.save()
+        scholarship = Scholarship.objects.create(scholar=scholar, month=1, year=2025)
+        workflow.release(scholarship.id, scholar.id)
+        client = APIClient()
+        token = client.post('/api/users/token/', {'username': 'scholar', 'password': 'secret'}).json()['tokens']['access']
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        response = client.get(f'/api/scholarships/manage/?faculty={self.supervisor.id}&role=HOD')
+        self.assertEqual(response.status_code, 400)
+        response = client.post('/api/scholarships/manage/', {
+            'id': scholarship.id, 'faculty': self.supervisor.id, 'role': 'FAC', 'status': 'accept',
+        }, format='json')
+        self.assertIn(response.status_code, (400, 403))
+        response = client.post('/api/scholarships/approve/bulk/', {
+            'faculty': self.supervisor.id, 'role': 'FAC', 'scholarships': [scholarship.id],
+        }, format='json')
+        self.assertIn(response.status_code, (400, 403))
+        scholarship.refresh_from_db()
+        self.assertEqual((scholarship.current_stage_role, scholarship.current_stage_status), ('FAC', '2'))
+
+    def test_revocation_in_another_process_expires(self):
+        # another worker deletes the role and bumps the version in its own LocMem cache
+        other_process = LocMemCache('other-process', {})
+        with mock.patch('Users.roles.cache', other_process):
+            Roles.objects.filter(faculty=self.supervisor, role='HOD').get().delete()
+        self.assertEqual(self.client.get('/api/scholarships/manage/?role=HOD').status_code, 200)
+        # this process stops trusting the claim once its version expires
+        later = time.time() + settings.ROLE_CACHE_TTL + 1
+        with mock.patch('django.core.cache.backends.locmem.time.time', return_value=later):
+            response = self.client.get('/api/scholarships/manage/?role=HOD')
+        self.assertEqual(response.status_code, 400)
+
+
+class CurrentStageTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.supervisor = make_faculty('sup', roles=('FAC', 'HOD'))
+        self.scholar = make_student('scholar', self.supervisor)
+        self.scholarship = Scholarship.objects.create(scholar=self.scholar, month=1, year=2025)
+
+    def approve(self, role):
+        return self.client.post('/api/scholarships/manage/', {
+            'id': self.scholarship.id, 'faculty': self.supervisor.id, 'role': role, 'status': 'accept',
+        })
+
+    def test_release_and_approval_move_current_stage(self):
+        self.client.post('/api/scholarships/manage/', {'id': self.scholarship.id, 'scholar': self.scholar.id})
+        self.scholarship.refresh_from_db()
+        self.assertEqual((self.scholarship.current_stage_role, self.scholarship.current_stage_status), ('FAC', '2'))
+        self.assertEqual(self.approve('FAC').status_code, 200)
+        self.scholarship.refresh_from_db()
+        self.assertEqual((self.scholarship.current_stage_role, self.scholarship.current_stage_status), ('HOD', '2'))
+
+    def test_inbox_filters_match_stage_joins(self):
+        self.client.post('/api/scholarships/manage/', {'id': self.scholarship.id, 'scholar': self.scholar.id})
+        self.approve('FAC')
+        scholarships = Scholarship.objects.all()
+        for role in ('FAC', 'HOD', 'AD', 'DEAN'):
+            self.assertEqual(
+                set(scholarships.reached(role)), set(scholarships.filter(stage__role=role)), role)
+            self.assertEqual(
+                set(scholarships.approved_by(role)), set(scholarships.filter(stage__role=role, stage__status='1')), role)
+            self.assertEqual(
+                set(scholarships.pending_with(role)), set(scholarships.filter(stage__role=role, stage__status='2')), role)
+
+    def test_approval_reads_approver_from_role_directory(self):
+        self.client.post('/api/scholarships/manage/', {'id': self.scholarship.id, 'scholar': self.scholar.id})
+        self.approve('FAC')
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.approve('HOD').status_code, 200)
+        self.assertFalse([q for q in ctx.captured_queries if 'from "users_faculty"' in q['sql'].lower()])
+
+    def test_backfill_copies_latest_stage(self):
+        Stage.objects.create(scholarship=self.scholarship, role='FAC', status='1')
+        Stage.objects.create(scholarship=self.scholarship, role='HOD')
+        call_command('backfillCurrentStage', stdout=StringIO())
+        self.scholarship.refresh_from_db()
+        self.assertEqual((self.scholarship.current_stage_role, self.scholarship.current_stage_status), ('HOD', '2'))
+
+
+class BulkApprovalTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.supervisor = make_faculty('sup', roles=('FAC',))
+        other = make_faculty('other', roles=('FAC',))
+        self.mine = [self.released(make_student(f"mine{i}", self.supervisor)) for i in range(3)]
+        self.theirs = self.released(make_student('theirs', other))
+
+    def released(self, scholar):
+        scholarship = Scholarship.objects.create(
+            scholar=scholar, month=1, year=2025, release=True, current_stage_role='FAC', current_stage_status='2'
+        )
+        Stage.objects.create(scholarship=scholarship, role='FAC')
+        return scholarship
+
+    def test_bulk_approval_reports_per_row_results(self):
+        payload = {
+            'faculty': self.supervisor.id, 'role': 'FAC',
+            'scholarships': [s.id for s in self.mine[:2]] + [{'id': self.mine[2].id, 'deducted_days': 1}, self.theirs.id],
+        }
+        response = self.client.post('/api/scholarships/approve/bulk/', payload, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()['approved'], response.json()['failed']), (3, 1))
+        self.assertEqual(Stage.objects.filter(role='HOD', status='2').count(), 3)
+        self.assertFalse(Stage.objects.filter(scholarship=self.theirs, role='HOD').exists())
+        deducted = Scholarship.objects.get(id=self.mine[2].id)
+        self.assertEqual(deducted.days, 30)
+        scholar = deducted.scholar
+        expected = calculate_pay(scholar.scholarship_basic, scholar.scholarship_hra, 2025, 1, 30)[1]
+        self.assertEqual(deducted.total_pay, expected.quantize(Decimal('0.01')))
+        self.assertEqual(Scholarship.objects.pending_with('HOD').count(), 3)
+
+    def test_bulk_and_single_approval_agree_on_pending(self):
+        # a Stage row without the current_stage_* columns (not backfilled) is not pending for either path
+        stale = self.mine[0]
+        Scholarship.objects.filter(id=stale.id).update(current_stage_role=None, current_stage_status=None)
+        payload = {'faculty': self.supervisor.id, 'role': 'FAC', 'scholarships': [stale.id]}
+        response = self.client.post('/api/scholarships/approve/bulk/', payload, format='json')
+        self.assertEqual(response.json()['results'][0]['error'], "No pending stage found for role 'FAC' on this scholarship.")
+        with self.assertRaises(workflow.TransitionError) as single:
+            workflow.approve(stale.id, 'FAC', self.supervisor)
+        self.assertEqual(single.exception.status_code, 404)
+        self.assertTrue(Stage.objects.filter(scholarship=stale, role='FAC', status='2').exists())
+
+    def test_bulk_approval_uses_constant_queries(self):
+        payload = {'faculty': self.supervisor.id, 'role': 'FAC', 'scholarships': [s.id for s in self.mine]}
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.post('/api/scholarships/approve/bulk/', payload, format='json')
+        self.assertLessEqual(len(ctx.captured_queries), 10)
+
+
+class ExportTests(TestCase):
+
+    def setUp(self):
+        supervisor = make_faculty('sup')
+        for i in range(3):
+            Scholarship.objects.create(scholar=make_student(f"scholar{i}", supervisor), month=1, year=2025)
+
+    def test_csv_export_streams_joined_rows(self):
+        response = self.client.get('/api/scholarships/export/?type=January')
+        self.assertEqual(response.status_code, 200)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertIn('Faculty sup', lines[1])
+
+    def test_xlsx_export(self):
+        response = self.client.get('/api/scholarships/export/?output=xlsx&year=2025')
+        self.assertEqual(response.status_code, 200)
+        sheet = load_workbook(BytesIO(b''.join(response.streaming_content))).active
+        self.assertEqual(sheet.max_row, 4)
+
+
+class DashboardTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.supervisor = make_faculty('sup')
+        self.hod = make_faculty('hod', roles=('FAC', 'HOD'))
+        make_faculty('ece-hod', department='ECE', roles=('HOD',))
+        self.dean = make_faculty('dean', roles=('FAC', 'DEAN'))
+        self.scholar = make_student('scholar', self.supervisor)
+        for month in (1, 2, 3):
+            scholarship = Scholarship.objects.create(scholar=self.scholar, month=month, year=2025, release=True)
+            Stage.objects.create(scholarship=scholarship, role='FAC', status='1')
+            Stage.objects.create(scholarship=scholarship, role='HOD', status='2')
+
+    def test_dashboard_payload(self):
+        response = self.client.get(f'/api/scholarships/dashboard/?scholar={self.scholar.id}&limit=2')
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body['profile']['id'], self.scholar.id)
+        self.assertEqual([s['month'] for s in body['scholarships']], [3, 2])
+        self.assertEqual(body['scholarships'][0]['latest_stage']['role'], 'HOD')
+        self.assertEqual(
+            [(m['role'], m['name']) for m in body['members']],
+            [('Supervisor', self.supervisor.name), ('Head of Department', self.hod.name), ('Dean', self.dean.name)],
+        )
+
+    def test_dashboard_query_count(self):
+        url = f'/api/scholarships/dashboard/?scholar={self.scholar.id}'
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(url)
+        self.assertEqual(len(ctx.captured_queries), 4)
+        # the role directory is cached after the first request
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(url)
+        self.assertEqual(len(ctx.captured_queries), 3)
+
+    def test_role_change_refreshes_directory(self):
+        self.client.get(f'/api/scholarships/dashboard/?scholar={self.scholar.id}')
+        Roles.objects.filter(faculty=self.dean, role='DEAN').delete()
+        response = self.client.get(f'/api/scholarships/dashboard/?scholar={self.scholar.id}')
+        self.assertNotIn('Dean', [m['role'] for m in response.json()['members']])
+
+
+class PayrollSummaryTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        supervisor = make_faculty('sup')
+        cse = [make_student(f"cse{i}", supervisor) for i in range(2)]
+        ece = make_student('ece', supervisor, department='ECE')
+        for scholar, days in ((cse[0], 31), (cse[1], 29), (ece, 30)):
+            Scholarship.objects.create(scholar=scholar, month=1, year=2025, days=days)
+        Scholarship.objects.create(scholar=cse[0], month=2, year=2024, days=27)
+
+    def test_month_length_matches_calendar(self):
+        scholar = Scholarship.objects.first().scholar
+        for year, month in ((2000, 2), (2100, 2), (2023, 2), (2023, 4), (2023, 12)):
+            Scholarship.objects.create(scholar=scholar, month=month, year=year)
+        for year, month, length in Scholarship.objects.annotate(length=month_length()).values_list('year', 'month', 'length'):
+            self.assertEqual(length, monthrange(year, month)[1])
+
+    def test_grouped_totals(self):
+        response = self.client.get('/api/scholarships/summary/?group_by=year,month,department')
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        rows = {(r['year'], r['month'], r['department']): r for r in body['rows']}
+        self.assertEqual(list(rows), [(2024, 2, 'CSE'), (2025, 1, 'CSE'), (2025, 1, 'ECE')])
+        self.assertEqual(rows[(2025, 1, 'CSE')]['count'], 2)
+        self.assertEqual(rows[(2025, 1, 'CSE')]['avg_deducted_days'], 1.0)
+        self.assertEqual(rows[(2024, 2, 'CSE')]['avg_deducted_days'], 2.0)
+        expected = sum(Scholarship.objects.values_list('total_pay', flat=True))
+        # SQLite keeps the unrounded pay as REAL, so the sum may differ by a cent per row
+        self.assertAlmostEqual(Decimal(body['total_pay']), expected, delta=Decimal('0.04'))
+        self.assertEqual(body['count'], 4)
+
+    def test_filters_and_validation(self):
+        body = self.client.get('/api/scholarships/summary/?group_by=department&year=2025&department=ece').json()
+        self.assertEqual([(r['department'], r['count']) for r in body['rows']], [('ECE', 1)])
+        self.assertEqual(self.client.get('/api/scholarships/summary/?group_by=scholar').status_code, 400)
+        self.assertEqual(self.client.get('/api/scholarships/summary/?year=last').status_code, 400)
+
+    def test_cached_until_scholarships_change(self):
+        url = '/api/scholarships/summary/?group_by=year'
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(url)
+        self.assertEqual(len(ctx.captured_queries), 0)
+        scholarship = Scholarship.objects.get(month=2)
+        scholarship.days = 29
+        scholarship.save()
+        rows = self.client.get(url).json()['rows']
+        self.assertEqual(rows[0]['avg_deducted_days'], 0.0)
+
+
+class MonthlySummaryTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.supervisor = make_faculty('sup', roles=('FAC', 'HOD'))
+        self.scholars = [make_student(f"cse{i}", self.supervisor) for i in range(3)]
+        self.scholars.append(make_student('ece', self.supervisor, department='ECE'))
+        self.scholarships = [Scholarship.objects.create(scholar=s, month=1, year=2025) for s in self.scholars]
+        refresh_monthly_summary()
+
+    def summary(self, department='CSE', status='2'):
+        return ScholarshipMonthlySummary.objects.get(year=2025, month=1, department=department, status=status)
+
+    def post(self, data):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post('/api/scholarships/manage/', data)
+
+    def test_rebuild_groups_by_department(self):
+        cse = self.summary()
+        self.assertEqual(cse.count, 3)
+        self.assertEqual(cse.total_pay, sum(s.total_pay for s in self.scholarships[:3]))
+        self.assertEqual(self.summary('ECE').count, 1)
+
+    def test_approval_updates_pending_counts(self):
+        scholarship = self.scholarships[0]
+        self.post({'id': scholarship.id, 'scholar': scholarship.scholar_id})
+        self.assertEqual(self.summary().pending_fac, 1)
+        self.post({'id': scholarship.id, 'faculty': self.supervisor.id, 'role': 'FAC', 'status': 'accept', 'deducted_days': 3})
+        cse = self.summary()
+        self.assertEqual((cse.pending_fac, cse.pending_hod, cse.deducted_days), (0, 1, 3))
+        self.assertEqual(cse.total_pay, sum(s.total_pay for s in Scholarship.objects.filter(scholar__department='CSE')))
+        # the incremental result matches a full rebuild
+        call_command('rebuildMonthlySummary', stdout=StringIO())
+        self.assertEqual(self.summary().total_pay, cse.total_pay)
+        self.assertEqual(self.summary().pending_hod, 1)
+
+    def test_monthly_generation_refreshes_period(self):
+        ScholarshipMonthlySummary.objects.all().delete()
+        Scholarship.objects.all().delete()
+        stderr = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('createMonthlyScholarship', '--bulk', stdout=StringIO(), stderr=stderr)
+        self.assertEqual(sum(ScholarshipMonthlySummary.objects.values_list('count', flat=True)), 4)
+        # LocMem: the running servers' cached reports are not invalidated
+        self.assertIn('PAYROLL_CACHE_TTL', stderr.getvalue())
+
+    def test_endpoint_reads_rollup(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/scholarships/summary/monthly/?year=2025&department=cse')
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertEqual([(r['department'], r['count']) for r in response.json()['summaries']], [('CSE', 3)])
+
+
+class MonthlyGenerationTests(TestCase):
+
+    def setUp(self):
+        self.fellows = [make_student(f"fellow{i}") for i in range(3)]
+        self.fellows[1].rf_category = 'SRF'
+        self.fellows[1].save()
+        self.sponsored = make_student('sponsored', admission_category='SPON')
+
+    def run_bulk(self):
+        stdout = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('createMonthlyScholarship', '--bulk', stdout=stdout, stderr=StringIO())
+        return stdout.getvalue()
+
+    def test_bulk_generation_is_idempotent_and_matches_save(self):
+        self.assertIn('Scholarships created: 3, Skipped: 0', self.run_bulk())
+        self.assertIn('Scholarships created: 0, Skipped: 3', self.run_bulk())
+        today = date.today()
+        generated = Scholarship.objects.filter(year=today.year, month=today.month)
+        self.assertEqual(set(generated.values_list('scholar_id', flat=True)), {f.id for f in self.fellows})
+        bulk = {row[0]: row[1:] for row in generated.values_list('scholar_id', 'days', 'total_pay_per_day', 'total_pay')}
+        # the same rows through Scholarship.save
+        generated.delete()
+        for fellow in self.fellows:
+            Scholarship.objects.create(scholar=fellow, year=today.year, month=today.month)
+        saved = {row[0]: row[1:] for row in generated.values_list('scholar_id', 'days', 'total_pay_per_day', 'total_pay')}
+        self.assertEqual(bulk, saved)
+
+
+class RepriceTests(TestCase):
+
+    def setUp(self):
+        self.scholar = make_student('scholar')
+        self.pending = Scholarship.objects.create(scholar=self.scholar, month=2, year=2024, days=20)
+        self.released = Scholarship.objects.create(scholar=self.scholar, month=1, year=2024, release=True)
+        self.scholar.refresh_from_db()
+
+    def expected(self, scholarship):
+        per_day, total = calculate_pay(
+            self.scholar.scholarship_basic, self.scholar.scholarship_hra, scholarship.year, scholarship.month, scholarship.days
+        )
+        return per_day.quantize(Decimal('0.01')), total.quantize(Decimal('0.01'))
+
+    def test_reprice_matches_calculate_pay(self):
+        Scholarship.objects.update(total_pay=0, total_pay_per_day=0)
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(Scholarship.objects.all().reprice(), 2)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        for scholarship in Scholarship.objects.all():
+            self.assertEqual((scholarship.total_pay_per_day, scholarship.total_pay), self.expected(scholarship))
+
+    def test_rate_change_reprices_unreleased_rows(self):
+        released_pay = self.released.total_pay
+        self.scholar.rf_category = 'SRF'
+        self.scholar.save()
+        self.scholar.refresh_from_db()
+        self.pending.refresh_from_db()
+        self.released.refresh_from_db()
+        self.assertEqual(self.pending.total_pay, self.expected(self.pending)[1])
+        self.assertEqual(self.released.total_pay, released_pay)
+
+    def test_unrelated_save_skips_reprice(self):
+        self.scholar.name = 'Renamed'
+        with CaptureQueriesContext(connection) as ctx, self.captureOnCommitCallbacks() as callbacks:
+            self.scholar.save()
+        self.assertFalse([q for q in ctx.captured_queries if 'scholarship_scholarship' in q['sql'].lower()])
+        self.assertFalse(callbacks)
+
+    def test_department_change_refreshes_both_rollups(self):
+        refresh_monthly_summary()
+        self.scholar.department = 'ECE'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.scholar.save()
+        departments = set(ScholarshipMonthlySummary.objects.values_list('department', flat=True))
+        self.assertEqual(departments, {'ECE'})
+
+    def test_reprice_command(self):
+        Student = type(self.scholar)
+        Student.objects.filter(id=self.scholar.id).update(scholarship_hra=Decimal('0.24'))
+        self.scholar.refresh_from_db()
+        stderr = StringIO()
+        call_command('repriceScholarships', '--year', '2024', '--released', stdout=StringIO(), stderr=stderr)
+        for scholarship in Scholarship.objects.all():
+            self.assertEqual(scholarship.total_pay, self.expected(scholarship)[1])
+        self.assertIn('PAYROLL_CACHE_TTL', stderr.getvalue())
+
+
+class SimulationTests(TestCase):
+
+    def setUp(self):
+        self.jrf = make_student('jrf')
+        self.srf = make_student('srf', department='ECE')
+        self.srf.rf_category = 'SRF'
+        self.srf.save()
+        for scholar in (self.jrf, self.srf):
+            Scholarship.objects.create(scholar=scholar, month=2, year=2024, days=25)
+        self.jrf.refresh_from_db()
+        self.srf.refresh_from_db()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username='admin', is_staff=True))
+
+    def pay(self, scholar, basic=None, hra=None):
+        return float(calculate_pay(
+            Decimal(basic or scholar.scholarship_basic), Decimal(str(hra or scholar.scholarship_hra)), 2024, 2, 25
+        )[1])
+
+    def test_month_lengths_match_calendar(self):
+        years = np.array([2000, 2100, 2023, 2024, 2023])
+        months = np.array([2, 2, 2, 2, 4])
+        self.assertEqual(month_lengths(years, months).tolist(), [monthrange(y, m)[1] for y, m in zip(years, months)])
+
+    def test_scenarios_match_calculate_pay(self):
+        result = PayrollPeriod.load(year=2024).simulate([
+            {'name': 'hra', 'hra': 0.24},
+            {'name': 'srf', 'basic': {'SRF': 45000}},
+        ])
+        baseline = self.pay(self.jrf) + self.pay(self.srf)
+        self.assertAlmostEqual(result['baseline']['total'], baseline, places=1)
+        hra, srf = result['scenarios']
+        self.assertAlmostEqual(hra['total'], self.pay(self.jrf, hra=0.24) + self.pay(self.srf, hra=0.24), places=1)
+        self.assertEqual(srf['departments']['CSE']['delta'], 0)
+        self.assertAlmostEqual(srf['departments']['ECE']['delta'], self.pay(self.srf, basic=45000) - self.pay(self.srf), places=1)
+
+    def test_endpoint_writes_nothing(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post('/api/scholarships/simulate/', {
+                'year': 2024, 'month': 2, 'scenarios': [{'hra': 0.2}] * 50,
+            }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['scenarios']), 50)
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+    def test_chunks_match_single_pass(self):
+        period = PayrollPeriod.load(year=2024)
+        scenarios = [{'hra': 0.1 + i / 100} for i in range(7)] + [{'basic': {'SRF': 40000 + i}} for i in range(5)]
+        self.assertEqual(period.simulate(scenarios, chunk_cells=2), period.simulate(scenarios))
+
+    @override_settings(SIMULATION_MAX_CELLS=3)
+    def test_limits_scenarios_times_scholarships(self):
+        response = self.client.post('/api/scholarships/simulate/', {'year': 2024, 'scenarios': [{'hra': 0.2}] * 2}, format='json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post('/api/scholarships/simulate/', {'year': 2024, 'month': 2, 'scenarios': [{'hra': 0.2}]}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+    def test_requires_staff(self):
+        body = {'year': 2024, 'scenarios': [{'hra': 0.2}]}
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.post('/api/scholarships/simulate/', body, format='json').status_code, 401)
+        self.client.force_authenticate(User.objects.create(username='plain'))
+        self.assertEqual(self.client.post('/api/scholarships/simulate/', body, format='json').status_code, 403)
+
+    def test_invalid_scenarios(self):
+        for scenarios in ([{'hra': 'high'}], [{'name': 'nothing'}], [{'basic': {'SRF': -1}}], []):
+            response = self.client.post('/api/scholarships/simulate/', {'year': 2024, 'scenarios': scenarios}, format='json')
+            self.assertEqual(response.status_code, 400, scenarios)
+
+
+class WorkflowTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.approver = make_faculty('approver', roles=('FAC', 'HOD', 'AD', 'DEAN'))
+        self.scholar = make_student('scholar', self.approver)
+        self.scholarship = Scholarship.objects.create(scholar=self.scholar, month=1, year=2025)
+        workflow.release(self.scholarship.id, self.scholar.id)
+
+    def approve(self, role, **extra):
+        return self.client.post('/api/scholarships/manage/', {
+            'id': self.scholarship.id, 'faculty': self.approver.id, 'role': role, 'status': 'accept', **extra,
+        })
+
+    def test_full_chain(self):
+        for role in ('FAC', 'HOD', 'AD', 'DEAN'):
+            self.assertEqual(self.approve(role, comment=f"ok {role}").status_code, 200, role)
+        self.scholarship.refresh_from_db()
+        self.assertEqual((self.scholarship.status, self.scholarship.current_stage_role), ('1', 'DEAN'))
+        self.assertEqual(
+            list(Stage.objects.filter(scholarship=self.scholarship).values_list('role', 'status', 'comments')),
+            [(role, '1', f"ok {role}") for role in ('FAC', 'HOD', 'AD', 'DEAN')],
+        )
+
+    def test_repeated_transitions_are_rejected(self):
+        self.assertEqual(self.approve('FAC').status_code, 200)
+        self.assertEqual(self.approve('FAC').status_code, 404)
+        self.assertEqual(self.approve('AD').status_code, 404)
+        response = self.client.post('/api/scholarships/manage/', {'id': self.scholarship.id, 'scholar': self.scholar.id})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Stage.objects.filter(scholarship=self.scholarship).count(), 2)
+
+    def test_locked_row_reports_conflict(self):
+        with mock.patch.object(workflow, 'lock_scholarships', return_value={}):
+            response = self.approve('FAC')
+        self.assertEqual(response.status_code, 409)
+        self.scholarship.refresh_from_db()
+        self.assertEqual(self.scholarship.current_stage_role, 'FAC')
+
+    def test_failed_transition_leaves_no_partial_writes(self):
+        with self.assertRaises(workflow.TransitionError):
+            workflow.approve(self.scholarship.id, 'FAC', self.approver, deducted_days=99)
+        self.assertFalse(Stage.objects.filter(scholarship=self.scholarship, role='HOD').exists())
+        self.assertEqual(Stage.objects.get(scholarship=self.scholarship, role='FAC').status, '2')
+
+
+class AsyncScholarshipTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.supervisor = make_faculty('sup', roles=('FAC', 'HOD'))
+        self.scholar = make_student('scholar', self.supervisor)
+        for month in (1, 2, 3):
+            scholarship = Scholarship.objects.create(scholar=self.scholar, month=month, year=2025)
+        workflow.release(scholarship.id, self.scholar.id)
+
+    def test_matches_sync_view(self):
+        for query in (
+            '', 'type=current', 'type=March', 'type=bogus', f'scholar={self.scholar.id}', 'id=1', 'id=999',
+            f'faculty={self.supervisor.id}&role=FAC&type=role_pending', f'faculty={self.supervisor.id}&role=AD',
+            f'faculty={self.supervisor.id}', 'page_size=2', 'cursor=bad',
+        ):
+            sync = self.client.get(f'/api/scholarships/manage/?{query}')
+            async_ = self.client.get(f'/api/scholarships/async/manage/?{query}')
+            self.assertEqual((async_.status_code, async_.json()), (sync.status_code, sync.json()), query)
+
+    def test_invalid_token_is_rejected(self):
+        response = self.client.get('/api/scholarships/async/manage/', HTTP_AUTHORIZATION='Bearer nonsense')
+        self.assertEqual(response.status_code, 401)
@@ -4,5 +4,13 @@ from .views import *
 
 urlpatterns = [
     path('manage/', MultiFuctionalScholarshipAPI.as_view(), name='scholarship-list'),
+    # async GET of manage/, for ASGI deployments
+    path('async/manage/', AsyncScholarshipAPI.as_view(), name='async-scholarship-list'),
+    path('approve/bulk/', BulkApprovalAPI.as_view(), name='scholarship-bulk-approve'),
+    path('export/', ScholarshipExportAPI.as_view(), name='scholarship-export'),
+    path('summary/', PayrollSummaryAPI.as_view(), name='payroll-summary'),
+    path('summary/monthly/', MonthlySummaryAPI.as_view(), name='monthly-summary'),
+    path('simulate/', PayrollSimulationAPI.as_view(), name='payroll-simulate'),
+    path('dashboard/', ScholarDashboardAPI.as_view(), name='scholar-dashboard'),
     path('stage/', MultiFuctionalStageAPI.as_view(), name='scholarship-list'),
 ]
@@ -2,15 +2,37 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from .serializers import *
 from .models import *
+from .export import csv_response, xlsx_response
+from .pagination import InvalidCursor, get_page_size, keyset_page
+from .reports import (
+    InvalidReport, invalidate_payroll, parse_filters, parse_groups, payroll_summary, schedule_summary_refresh,
+)
+from .simulation import InvalidScenario, PayrollPeriod
+from . import workflow
+from .workflow import authority_error, lock_scholarships
 from Users.models import *
-from Users.views import getRoleList,validRolesList
+from Users.serializers import StudentSerializer
+from Users.views import approvalChainMembers, validRolesList
+from Users.async_api import AsyncAPIView
+from asgiref.sync import sync_to_async
+from Users.authentication import TokenClaimsAuthentication, resolve_faculty
+from Users.roles import find_role_holder
 from rest_framework import status
+from rest_framework.permissions import IsAdminUser
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Prefetch
 import calendar
 # Create your views here.
 
+# scholarships shown on the scholar dashboard unless ?limit= asks for more
+DASHBOARD_SCHOLARSHIPS = 12
+
 
 # ===Ray===
 class MultiFuctionalScholarshipAPI(APIView):
+    authentication_classes = [TokenClaimsAuthentication]
+
     @staticmethod
     def get_students_by_role(role, faculty_id):
         try:
@@ -24,18 +46,43 @@ class MultiFuctionalScholarshipAPI(APIView):
         except Faculty.DoesNotExist:
             return None
     
+    @staticmethod
+    def filter_by_type(scholarships, filter_type, role=None):
+        # None for an unknown type
+        if not filter_type:
+            return scholarships
+        elif filter_type == 'current':
+            return scholarships.filter(release=False)
+        elif filter_type == 'previous':
+            return scholarships.filter(release=True)
+        elif filter_type == 'approved':
+            return scholarships.filter(status=1)
+        elif filter_type == 'pending':
+            return scholarships.filter(status=2)
+        elif filter_type == 'role_approved':
+            return scholarships.approved_by(role)
+        elif filter_type == 'role_pending':
+            return scholarships.pending_with(role)
+        elif filter_type in calendar.month_name:
+            month_number = list(calendar.month_name).index(filter_type)
+            return scholarships.filter(month=month_number)
+        return None
+
     def get(self, request, format=None):
         scholarship_id = request.query_params.get('id')
         scholar_id = request.query_params.get('scholar')
-        faculty_id = request.query_params.get('faculty')
+        faculty_param = request.query_params.get('faculty')
         role = request.query_params.get('role')
         filter_type = request.query_params.get('type',None)
+        faculty_id, roles_assigned = None, frozenset()
+        if role or faculty_param:
+            faculty_id, roles_assigned = resolve_faculty(request, faculty_param)
 
         scholarships = None
 
         if scholarship_id:
             try:
-                scholarship = Scholarship.objects.get(id=scholarship_id)
+                scholarship = Scholarship.objects.select_related('scholar').get(id=scholarship_id)
                 serializer = ScholarshipSerializer(scholarship)
                 return Response({'scholarship': serializer.data}, status=status.HTTP_200_OK)
             except Scholarship.DoesNotExist:
@@ -46,7 +93,6 @@ class MultiFuctionalScholarshipAPI(APIView):
 
         # Case 3: Filter by faculty role
         elif faculty_id and role:
-            roles_assigned = getRoleList(faculty_id)
             valid_roles = validRolesList()
             if role not in valid_roles or role not in roles_assigned:
                 return Response(
@@ -60,149 +106,76 @@ class MultiFuctionalScholarshipAPI(APIView):
                     {"error": "Faculty not found or role handler missing."},
                     status=status.HTTP_404_NOT_FOUND
                 )
-            scholarships = Scholarship.objects.filter(scholar__in=students)
-            scholarships = scholarships.filter(stage__role=role,).distinct()
+            scholarships = Scholarship.objects.filter(scholar__in=students).reached(role)
         elif faculty_id:
             return Response({"error": "role parameter required"}, status=status.HTTP_400_BAD_REQUEST)
         elif role:
             return Response({"error": "faculty parameter required"}, status=status.HTTP_400_BAD_REQUEST)
         else:
             scholarships = Scholarship.objects.all()
-        if not filter_type: pass
-        elif filter_type == 'current':
-            scholarships = scholarships.filter(release=False)
-        elif filter_type == 'previous':
-            scholarships = scholarships.filter(release=True)
-        elif filter_type == 'approved':
-            scholarships = scholarships.filter(status=1)
-        elif filter_type == 'pending':
-            scholarships = scholarships.filter(status=2)
-        elif filter_type == 'role_approved':
-            scholarships = scholarships.filter(stage__status="1",stage__role=role)
-        elif filter_type == 'role_pending':
-            scholarships = scholarships.filter(stage__status="2",stage__role=role)
-        elif filter_type in calendar.month_name:
-            month_number = list(calendar.month_name).index(filter_type)
-            scholarships = scholarships.filter(month=month_number)
-        else:
+        scholarships = self.filter_by_type(scholarships, filter_type, role)
+        if scholarships is None:
             return Response({"error": "Unknown type"}, status=status.HTTP_400_BAD_REQUEST)
 
+        scholarships = scholarships.select_related('scholar')
+        # Paging is opt-in so existing callers keep getting the full list
+        cursor = request.query_params.get('cursor')
+        page_size = request.query_params.get('page_size')
+        if cursor is not None or page_size is not None:
+            try:
+                page, next_cursor = keyset_page(scholarships, cursor, get_page_size(page_size))
+            except InvalidCursor as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            serializer = ScholarshipSerializer(page, many=True)
+            return Response({'scholarships': serializer.data, 'next': next_cursor}, status=status.HTTP_200_OK)
+
         serializer = ScholarshipSerializer(scholarships, many=True)
         return Response({'scholarships': serializer.data}, status=status.HTTP_200_OK)
     def post(self, request, format=None):
-            scholarship_id = request.data.get('id')
-            scholar_id = request.data.get('scholar')
-            faculty_id = request.data.get('faculty')
-            role = request.data.get('role')
-            if not scholarship_id:
-                return Response({"error": "Scholarship ID is required."}, status=status.HTTP_400_BAD_REQUEST)
-            try:
-                scholarship = Scholarship.objects.select_related('scholar').get(id=scholarship_id)
-            except Scholarship.DoesNotExist:
-                return Response({"error": "Scholarship not found."}, status=status.HTTP_404_NOT_FOUND)
+        # release by the scholar, or one approval step; transitions live in workflow.py
+        scholarship_id = request.data.get('id')
+        scholar_id = request.data.get('scholar')
+        faculty_id, roles_assigned = resolve_faculty(request, request.data.get('faculty'))
+        role = request.data.get('role')
+        if not scholarship_id:
+            return Response({"error": "Scholarship ID is required."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            scholarship_id = int(scholarship_id)
+        except (TypeError, ValueError):
+            return Response({"error": "Scholarship ID must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
             # Scholar flow - Release the scholarship
             if scholar_id:
-                if str(scholarship.scholar.id) != str(scholar_id) or scholarship.status != "2" or scholarship.release==True:
-                    return Response({
-                        "error": f"Scholarship does not belong to student ID {scholar_id} or is not pending or already released."
-                    }, status=status.HTTP_400_BAD_REQUEST)
-                try:
-                    Stage.objects.create(scholarship=scholarship, role="FAC")
-                    scholarship.release = True
-                    scholarship.save()
-                    return Response({
-                        "success": f"Scholarship released by {scholar_id} and SUP stage created."
-                    }, status=status.HTTP_200_OK)
-                except Exception as e:
-                    return Response({"error": f"Error creating stage: {str(e)}"}, status=status.HTTP_400_BAD_REQUEST)
+                workflow.release(scholarship_id, scholar_id)
+                return Response({
+                    "success": f"Scholarship released by {scholar_id} and SUP stage created."
+                }, status=status.HTTP_200_OK)
             # Faculty flow - Review stage
             elif faculty_id and role:
-                if scholarship.release != True:
-                    return Response({
-                        "error": f'Scholarship not released yet'
-                    }, status=status.HTTP_400_BAD_REQUEST)
-                roles_assigned = getRoleList(faculty_id)
-                valid_roles = validRolesList()
-                print(roles_assigned)
-                if role not in valid_roles or role not in roles_assigned:
+                if role not in validRolesList() or role not in roles_assigned:
                     return Response({
                         "error": f"Faculty is not valid for role '{role}'."
                     }, status=status.HTTP_400_BAD_REQUEST)
-
-                try:
-                    current_stage = Stage.objects.get(scholarship=scholarship, role=role, status=2)
-                except Stage.DoesNotExist:
-                    return Response({
-                        "error": f"No pending stage found for role '{role}' on this scholarship."
-                    }, status=status.HTTP_404_NOT_FOUND)
-
                 decision = request.data.get("status")
-                comment = request.data.get("comment", "")
-                d_days=request.data.get("deducted_days", None)
-                
-
                 if decision not in ["accept", "reject"]:
                     return Response({
                         "error": "Invalid status. Must be 'accept' or 'reject'."
                     }, status=status.HTTP_400_BAD_REQUEST)
-                if decision == "reject":    # need to handle this also 
+                if decision == "reject":    # need to handle this also
                     return Response({
                         "error": "Reject state is not handled."
                     }, status=status.HTTP_400_BAD_REQUEST)
-                # Update current stage
-                current_stage.status = 1  # Accepted
-                current_stage.comment = comment
+                d_days = request.data.get("deducted_days", None)
                 try:
-                    faculty = Faculty.objects.get(id=faculty_id)
-                except Faculty.DoesNotExist:
+                    d_days = int(d_days) if d_days is not None else None
+                except ValueError:
+                    return Response({
+                        "error": "deducted_days must be an integer."
+                    }, status=status.HTTP_400_BAD_REQUEST)
+                faculty = actingFaculty(role, faculty_id)
+                if faculty is None:
                     return Response({"error": f"Faculty with ID {faculty_id} not found."}, status=status.HTTP_404_NOT_FOUND)
-                try:
-                    scholar = scholarship.scholar 
-                except Student.DoesNotExist:
-                    return Response({"error": "Scholar linked to this scholarship not found."}, status=status.HTTP_404_NOT_FOUND)
-                next_stage=None
-                if role == "FAC":
-                    if scholar.supervisor != faculty:
-                        return Response({
-                            "error": f"Provided faculty ID {faculty_id} is not the supervisor of the scholarship ID {scholarship_id}."
-                        }, status=status.HTTP_400_BAD_REQUEST)
-                    next_stage = Stage(scholarship=scholarship, role="HOD")
-                elif role == "HOD":
-                    if scholar.department != faculty.department:
-                        return Response({
-                            "error": f"Provided faculty ID {faculty_id} is not in the same department as the scholar for scholarship ID {scholarship_id}."
-                        }, status=status.HTTP_400_BAD_REQUEST)
-                    next_stage = Stage(scholarship=scholarship, role="AD")
-                elif role == "AD":
-                    if scholar.university != faculty.university:
-                        return Response({
-                            "error": f"Provided faculty ID {faculty_id} is not in the same department as the scholar for scholarship ID {scholarship_id}."
-                        }, status=status.HTTP_400_BAD_REQUEST)
-                    next_stage = Stage(scholarship=scholarship, role="DEAN")
-                elif role == "DEAN":
-                    if scholar.university != faculty.university:
-                        return Response({
-                            "error": f"Provided faculty ID {faculty_id} is not in the same university as the scholar for scholarship ID {scholarship_id}."
-                        }, status=status.HTTP_400_BAD_REQUEST)
-                    scholarship.status = 1
-                if d_days is not None:
-                    try:
-                        d_days = int(d_days)
-                        if d_days < 0 or d_days > scholarship.days:
-                            return Response({
-                                "error": "Invalid number of deducted days."
-                            }, status=status.HTTP_400_BAD_REQUEST)
-                        scholarship.total_pay = (scholarship.days - d_days) * scholarship.total_pay_per_day
-                        scholarship.days -= d_days
-                    except ValueError:
-                        return Response({
-                            "error": "deducted_days must be an integer."
-                        }, status=status.HTTP_400_BAD_REQUEST)
-                scholarship.save()
-                current_stage.save()
-                if next_stage:
-                    next_stage.save()
-                
+                workflow.approve(scholarship_id, role, faculty, request.data.get("comment", ""), d_days)
                 return Response({
                     "success": f"Stage '{role}' successfully updated to '{decision}'."
                 }, status=status.HTTP_200_OK)
@@ -210,7 +183,346 @@ class MultiFuctionalScholarshipAPI(APIView):
                 return Response({
                     "error": "Either scholar_id or (faculty_id and role) must be provided."
                 }, status=status.HTTP_400_BAD_REQUEST)
-                
+        except workflow.TransitionError as e:
+            return Response({"error": str(e)}, status=e.status_code)
+
+
+class AsyncScholarshipAPI(AsyncAPIView):
+    """Async GET of MultiFuctionalScholarshipAPI (same parameters and responses) for ASGI servers."""
+    authentication_classes = [TokenClaimsAuthentication]
+
+    @staticmethod
+    async def students_by_role(role, faculty_id):
+        try:
+            faculty = await Faculty.objects.only('department', 'university').aget(id=faculty_id)
+        except Faculty.DoesNotExist:
+            return None
+        if role == "FAC":
+            return Student.objects.filter(supervisor__id=faculty_id)
+        elif role == "HOD":
+            return Student.objects.filter(department=faculty.department)
+        elif role in ["DEAN", "AD"]:
+            return Student.objects.filter(university=faculty.university)
+        return None
+
+    async def get(self, request, format=None):
+        scholarship_id = request.query_params.get('id')
+        scholar_id = request.query_params.get('scholar')
+        faculty_param = request.query_params.get('faculty')
+        role = request.query_params.get('role')
+        filter_type = request.query_params.get('type', None)
+        faculty_id, roles_assigned = None, frozenset()
+        if role or faculty_param:
+            # roles come from the token or the role cache; a miss is one (sync) query
+            faculty_id, roles_assigned = await sync_to_async(resolve_faculty)(request, faculty_param)
+
+        if scholarship_id:
+            try:
+                scholarship = await Scholarship.objects.select_related('scholar').aget(id=scholarship_id)
+            except (Scholarship.DoesNotExist, ValueError):
+                return self.respond({"error": "Scholarship not found"}, status=404)
+            return self.respond({'scholarship': ScholarshipSerializer(scholarship).data})
+
+        if scholar_id:
+            scholarships = Scholarship.objects.filter(scholar__id=scholar_id)
+        elif faculty_id and role:
+            if role not in validRolesList() or role not in roles_assigned:
+                return self.respond({"error": f"Faculty is not valid for role {role}"}, status=400)
+            students = await self.students_by_role(role, faculty_id)
+            if students is None:
+                return self.respond({"error": "Faculty not found or role handler missing."}, status=404)
+            scholarships = Scholarship.objects.filter(scholar__in=students).reached(role)
+        elif faculty_id:
+            return self.respond({"error": "role parameter required"}, status=400)
+        elif role:
+            return self.respond({"error": "faculty parameter required"}, status=400)
+        else:
+            scholarships = Scholarship.objects.all()
+        scholarships = MultiFuctionalScholarshipAPI.filter_by_type(scholarships, filter_type, role)
+        if scholarships is None:
+            return self.respond({"error": "Unknown type"}, status=400)
+
+        scholarships = scholarships.select_related('scholar')
+        cursor = request.query_params.get('cursor')
+        page_size = request.query_params.get('page_size')
+        if cursor is not None or page_size is not None:
+            try:
+                page, next_cursor = await sync_to_async(keyset_page)(scholarships, cursor, get_page_size(page_size))
+            except InvalidCursor as e:
+                return self.respond({"error": str(e)}, status=400)
+            return self.respond({'scholarships': ScholarshipSerializer(page, many=True).data, 'next': next_cursor})
+        scholarships = [scholarship async for scholarship in scholarships]
+        return self.respond({'scholarships': ScholarshipSerializer(scholarships, many=True).data})
+
+
+def actingFaculty(role, faculty_id):
+    # id/department/university of the approver: the cached role directory, or one query if it is stale
+    holder = find_role_holder(role, faculty_id)
+    if holder is not None:
+        return holder
+    try:
+        return Faculty.objects.only('id', 'department', 'university').get(id=faculty_id)
+    except (Faculty.DoesNotExist, ValueError, TypeError):
+        return None
+
+
+class BulkApprovalAPI(APIView):
+    """
+    Approves many scholarships for one role in a single transaction.
+
+    Body: {"role": "DEAN", "status": "accept", "comment": "...",
+           "scholarships": [12, {"id": 13, "deducted_days": 2}, ...]}
+    """
+    authentication_classes = [TokenClaimsAuthentication]
+
+    def post(self, request, format=None):
+        faculty_id, roles_assigned = resolve_faculty(request, request.data.get('faculty'))
+        role = request.data.get('role')
+        decision = request.data.get('status', 'accept')
+        comment = request.data.get('comment', '')
+        items = request.data.get('scholarships')
+        if not faculty_id or not role:
+            return Response({"error": "faculty and role are required."}, status=status.HTTP_400_BAD_REQUEST)
+        if not isinstance(items, list) or not items:
+            return Response({"error": "scholarships must be a non-empty list."}, status=status.HTTP_400_BAD_REQUEST)
+        if decision != "accept":
+            return Response({"error": "Only 'accept' is supported for bulk approval."}, status=status.HTTP_400_BAD_REQUEST)
+        if role not in validRolesList() or role not in roles_assigned or role not in STAGE_FLOW:
+            return Response({"error": f"Faculty is not valid for role '{role}'."}, status=status.HTTP_400_BAD_REQUEST)
+        faculty = actingFaculty(role, faculty_id)
+        if faculty is None:
+            return Response({"error": f"Faculty with ID {faculty_id} not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        deductions = {}
+        for item in items:
+            scholarship_id = item.get('id') if isinstance(item, dict) else item
+            try:
+                scholarship_id = int(scholarship_id)
+                d_days = item.get('deducted_days') if isinstance(item, dict) else None
+                deductions[scholarship_id] = int(d_days) if d_days is not None else None
+            except (TypeError, ValueError):
+                return Response({"error": f"Invalid entry {item!r}."}, status=status.HTTP_400_BAD_REQUEST)
+
+        next_role = workflow.NEXT_ROLE[role]
+        results = []
+        with transaction.atomic():
+            # rows another approver holds are skipped rather than waited on
+            scholarships = lock_scholarships(deductions)
+            busy = set(Scholarship.objects.filter(id__in=set(deductions) - set(scholarships)).values_list('id', flat=True))
+            # pending is decided by current_stage_*, like workflow.approve(); the Stage row is only what gets updated
+            pending = [scholarship_id for scholarship_id, scholarship in scholarships.items() if workflow.is_pending(scholarship, role)]
+            stages = {
+                stage.scholarship_id: stage
+                for stage in Stage.objects.select_for_update().filter(scholarship_id__in=pending, role=role, status="2")
+            }
+            approved_scholarships, approved_stages, next_stages, deducted = [], [], [], []
+            for scholarship_id, d_days in deductions.items():
+                scholarship = scholarships.get(scholarship_id)
+                stage = stages.get(scholarship_id)
+                if scholarship_id in busy:
+                    error = "Scholarship is being processed by another request; try again."
+                elif scholarship is None:
+                    error = "Scholarship not found."
+                elif not scholarship.release:
+                    error = "Scholarship not released yet."
+                elif not workflow.is_pending(scholarship, role) or stage is None:
+                    error = f"No pending stage found for role '{role}' on this scholarship."
+                elif d_days is not None and (d_days < 0 or d_days > scholarship.days):
+                    error = "Invalid number of deducted days."
+                else:
+                    error = authority_error(role, faculty, scholarship.scholar)
+                if error:
+                    results.append({"id": scholarship_id, "success": False, "error": error})
+                    continue
+
+                stage.status = "1"
+                stage.comments = comment
+                approved_stages.append(stage)
+                if d_days:
+                    scholarship.days -= d_days
+                    deducted.append(scholarship_id)
+                if next_role:
+                    next_stages.append(Stage(scholarship=scholarship, role=next_role))
+                    scholarship.current_stage_role, scholarship.current_stage_status = next_role, "2"
+                else:
+                    scholarship.status = "1"
+                    scholarship.current_stage_role, scholarship.current_stage_status = role, "1"
+                approved_scholarships.append(scholarship)
+                results.append({"id": scholarship_id, "success": True})
+
+            Stage.objects.bulk_update(approved_stages, ['status', 'comments'])
+            Stage.objects.bulk_create(next_stages)
+            Scholarship.objects.bulk_update(
+                approved_scholarships,
+                ['days', 'status', 'current_stage_role', 'current_stage_status'],
+            )
+            Scholarship.objects.filter(id__in=deducted).reprice()
+            # bulk_update sends no post_save
+            transaction.on_commit(invalidate_payroll)
+            schedule_summary_refresh((s.year, s.month, s.scholar.department) for s in approved_scholarships)
+        return Response({
+            "approved": len(approved_scholarships),
+            "failed": len(results) - len(approved_scholarships),
+            "results": results,
+        }, status=status.HTTP_200_OK)
+
+
+class ScholarshipExportAPI(APIView):
+    """
+    Streams scholarships joined with scholar and supervisor details.
+    ?output=csv (default) or xlsx, filtered by type (same values as
+    MultiFuctionalScholarshipAPI), year and department.
+    """
+    def get(self, request, format=None):
+        output = request.query_params.get('output', 'csv')
+        filter_type = request.query_params.get('type')
+        year = request.query_params.get('year')
+        department = request.query_params.get('department')
+        if output not in ['csv', 'xlsx']:
+            return Response({"error": "output must be 'csv' or 'xlsx'."}, status=status.HTTP_400_BAD_REQUEST)
+        if filter_type in ['role_approved', 'role_pending']:
+            return Response({"error": "Role types are not supported for export."}, status=status.HTTP_400_BAD_REQUEST)
+        scholarships = MultiFuctionalScholarshipAPI.filter_by_type(Scholarship.objects.all(), filter_type)
+        if scholarships is None:
+            return Response({"error": "Unknown type"}, status=status.HTTP_400_BAD_REQUEST)
+        if year:
+            try:
+                scholarships = scholarships.filter(year=int(year))
+            except ValueError:
+                return Response({"error": "year must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+        if department:
+            scholarships = scholarships.filter(scholar__department__iexact=department)
+        filename = "_".join(["scholarships"] + [part for part in (filter_type, year, department) if part])
+        if output == 'xlsx':
+            return xlsx_response(scholarships, filename)
+        return csv_response(scholarships, filename)
+
+
+class PayrollSummaryAPI(APIView):
+    """
+    Payroll totals grouped in the database:
+    ?group_by=year,month,department (any of year, month, department,
+    rf_category, supervisor, status, release) with the same names as filters.
+    Each row has count, total_pay and avg_deducted_days.
+    """
+    def get(self, request, format=None):
+        try:
+            groups = parse_groups(request.query_params.get('group_by'))
+            filters = parse_filters(request.query_params)
+        except InvalidReport as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(payroll_summary(groups, filters), status=status.HTTP_200_OK)
+
+
+class PayrollSimulationAPI(APIView):
+    """
+    What-if payroll for one period without writing anything.
+
+    Body: {"year": 2025, "month": 4, "department": "CSE",
+           "scenarios": [{"name": "HRA 24%", "hra": 0.24},
+                         {"name": "SRF 45k", "basic": {"SRF": 45000}}]}
+    Returns baseline and per-scenario totals and deltas by department.
+    Staff only; scenarios x scholarships is capped by SIMULATION_MAX_CELLS.
+    """
+    permission_classes = [IsAdminUser]
+
+    def post(self, request, format=None):
+        scenarios = request.data.get('scenarios')
+        maximum = getattr(settings, 'SIMULATION_MAX_SCENARIOS', 5000)
+        if not isinstance(scenarios, list) or not scenarios:
+            return Response({"error": "scenarios must be a non-empty list."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(scenarios) > maximum:
+            return Response({"error": f"At most {maximum} scenarios per request."}, status=status.HTTP_400_BAD_REQUEST)
+        filters = {}
+        try:
+            filters['year'] = int(request.data.get('year'))
+            if request.data.get('month') is not None:
+                filters['month'] = int(request.data.get('month'))
+        except (TypeError, ValueError):
+            return Response({"error": "year is required; year and month must be integers."}, status=status.HTTP_400_BAD_REQUEST)
+        if request.data.get('department'):
+            filters['scholar__department__iexact'] = request.data.get('department')
+        period = PayrollPeriod.load(**filters)
+        max_cells = getattr(settings, 'SIMULATION_MAX_CELLS', 20_000_000)
+        if len(scenarios) * len(period) > max_cells:
+            return Response(
+                {"error": f"{len(scenarios)} scenarios x {len(period)} scholarships exceeds {max_cells}; "
+                          "send fewer scenarios or narrow the period."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            result = period.simulate(scenarios)
+        except InvalidScenario as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result, status=status.HTTP_200_OK)
+
+
+class MonthlySummaryAPI(APIView):
+    """
+    Rows of the precomputed ScholarshipMonthlySummary rollup, filtered by
+    year, month, department and status. Reads one row per group instead of
+    scanning Scholarship.
+    """
+    def get(self, request, format=None):
+        summaries = ScholarshipMonthlySummary.objects.order_by('-year', '-month', 'department', 'status')
+        try:
+            for name in ('year', 'month'):
+                if request.query_params.get(name):
+                    summaries = summaries.filter(**{name: int(request.query_params[name])})
+        except ValueError:
+            return Response({"error": "year and month must be integers."}, status=status.HTTP_400_BAD_REQUEST)
+        department = request.query_params.get('department')
+        if department:
+            summaries = summaries.filter(department__iexact=department)
+        if request.query_params.get('status'):
+            summaries = summaries.filter(status=request.query_params['status'])
+        serializer = MonthlySummarySerializer(summaries, many=True)
+        return Response({'summaries': serializer.data}, status=status.HTTP_200_OK)
+
+
+class ScholarDashboardAPI(APIView):
+    """
+    Everything the scholar landing page needs in one response: the profile,
+    recent scholarships with their latest stage, and the approval chain.
+    Three queries; role holders come from the cached role directory.
+    """
+    authentication_classes = [TokenClaimsAuthentication]
+
+    def get(self, request, format=None):
+        token = getattr(request, 'auth', None)
+        if token is not None and token.get('type') == 'scholar':
+            scholar_id = token.get('id')
+        else:
+            scholar_id = request.query_params.get('scholar')
+        if not scholar_id:
+            return Response({"error": "Scholar ID is required."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = int(request.query_params.get('limit', DASHBOARD_SCHOLARSHIPS))
+            student = Student.objects.select_related('supervisor', 'co_supervisor').get(id=int(scholar_id))
+        except ValueError:
+            return Response({"error": "scholar and limit must be integers."}, status=status.HTTP_400_BAD_REQUEST)
+        except Student.DoesNotExist:
+            return Response({"error": "Scholar not found"}, status=status.HTTP_404_NOT_FOUND)
+        limit = max(1, min(limit, getattr(settings, 'SCHOLARSHIP_MAX_PAGE_SIZE', 500)))
+
+        scholarships = Scholarship.objects.filter(scholar=student).order_by('-year', '-month', '-id').prefetch_related(
+            Prefetch('stage_set', queryset=Stage.objects.order_by('-id'), to_attr='latest_first')
+        )
+        recent = []
+        for scholarship in scholarships[:limit]:
+            scholarship.scholar = student
+            data = ScholarshipSerializer(scholarship).data
+            latest = scholarship.latest_first[0] if scholarship.latest_first else None
+            data['latest_stage'] = StageSerializer(latest).data if latest else None
+            recent.append(data)
+
+        return Response({
+            "profile": StudentSerializer(student).data,
+            "scholarships": recent,
+            "members": approvalChainMembers(student),
+        }, status=status.HTTP_200_OK)
+
+
 class MultiFuctionalStageAPI(APIView):
     def get(self, request, format=None):
         scholarship_id = request.query_params.get('id')
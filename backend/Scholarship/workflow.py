@@ -0,0 +1,118 @@
+"""
+Approval state machine for a scholarship:
+
+    unreleased --release--> FAC pending --> HOD --> AD --> DEAN --> approved
+
+Each transition runs in one transaction holding a row lock on the scholarship
+and checks the locked row's current stage, so a double-click or two approvers
+acting at once cannot apply the same step twice. A row another request is
+already working on is skipped (SKIP LOCKED) and reported as busy instead of
+waiting on the lock.
+"""
+from django.db import transaction
+from rest_framework import status
+
+from .models import STAGE_FLOW, Scholarship, Stage
+from .reports import schedule_summary_refresh
+
+# role -> role whose stage the approval opens (None: the scholarship is approved)
+NEXT_ROLE = dict(zip(STAGE_FLOW, STAGE_FLOW[1:] + [None]))
+
+
+class TransitionError(Exception):
+    def __init__(self, message, status_code=status.HTTP_400_BAD_REQUEST):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def authority_error(role, faculty, scholar):
+    # None when the faculty member may act as role for this scholar
+    if role == "FAC" and scholar.supervisor_id != faculty.id:
+        return f"Faculty ID {faculty.id} is not the supervisor of this scholar."
+    if role == "HOD" and scholar.department != faculty.department:
+        return f"Faculty ID {faculty.id} is not in the same department as the scholar."
+    if role in ["AD", "DEAN"] and scholar.university != faculty.university:
+        return f"Faculty ID {faculty.id} is not in the same university as the scholar."
+    return None
+
+
+def is_pending(scholarship, role):
+    """Whether ``role`` may act on the scholarship now, from its current_stage_* columns."""
+    return role in NEXT_ROLE and (scholarship.current_stage_role, scholarship.current_stage_status) == (role, "2")
+
+
+def lock_scholarships(ids):
+    """
+    {id: scholarship} for the given ids, row-locked until the transaction
+    ends. Rows locked by another transaction are left out.
+    """
+    return (
+        Scholarship.objects.select_related('scholar')
+        .select_for_update(skip_locked=True, of=('self',))
+        .in_bulk(list(ids))
+    )
+
+
+def _locked(scholarship_id):
+    scholarship = lock_scholarships([scholarship_id]).get(scholarship_id)
+    if scholarship is not None:
+        return scholarship
+    if Scholarship.objects.filter(id=scholarship_id).exists():
+        raise TransitionError("Scholarship is being processed by another request; try again.", status.HTTP_409_CONFLICT)
+    raise TransitionError("Scholarship not found.", status.HTTP_404_NOT_FOUND)
+
+
+def release(scholarship_id, scholar_id):
+    """The scholar submits the month: opens the FAC stage."""
+    with transaction.atomic():
+        scholarship = _locked(scholarship_id)
+        if str(scholarship.scholar_id) != str(scholar_id) or scholarship.status != "2" or scholarship.release:
+            raise TransitionError(
+                f"Scholarship does not belong to student ID {scholar_id} or is not pending or already released."
+            )
+        Stage.objects.create(scholarship=scholarship, role=STAGE_FLOW[0])
+        scholarship.release = True
+        scholarship.current_stage_role, scholarship.current_stage_status = STAGE_FLOW[0], "2"
+        scholarship.save()
+        schedule_summary_refresh([(scholarship.year, scholarship.month, scholarship.scholar.department)])
+    return scholarship
+
+
+def approve(scholarship_id, role, faculty, comment='', deducted_days=None):
+    """
+    Accepts the pending ``role`` stage as ``faculty`` (anything with id,
+    department and university) and opens the next one, or approves the
+    scholarship after the last role. ``deducted_days`` are taken off the
+    paid days and the pay is recomputed.
+    """
+    with transaction.atomic():
+        scholarship = _locked(scholarship_id)
+        if not scholarship.release:
+            raise TransitionError("Scholarship not released yet")
+        if not is_pending(scholarship, role):
+            raise TransitionError(
+                f"No pending stage found for role '{role}' on this scholarship.", status.HTTP_404_NOT_FOUND
+            )
+        error = authority_error(role, faculty, scholarship.scholar)
+        if error:
+            raise TransitionError(error)
+        if deducted_days is not None:
+            if deducted_days < 0 or deducted_days > scholarship.days:
+                raise TransitionError("Invalid number of deducted days.")
+            # save() reprices from the remaining days
+            scholarship.days -= deducted_days
+
+        if not Stage.objects.filter(scholarship=scholarship, role=role, status="2").update(status="1", comments=comment):
+            raise TransitionError(
+                f"No pending stage found for role '{role}' on this scholarship.", status.HTTP_404_NOT_FOUND
+            )
+        next_role = NEXT_ROLE[role]
+        if next_role:
+            Stage.objects.create(scholarship=scholarship, role=next_role)
+            scholarship.current_stage_role, scholarship.current_stage_status = next_role, "2"
+        else:
+            scholarship.status = "1"
+            scholarship.current_stage_role, scholarship.current_stage_status = role, "1"
+        scholarship.save()
+        schedule_summary_refresh([(scholarship.year, scholarship.month, scholarship.scholar.department)])
+    return scholarship
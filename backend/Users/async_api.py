@@ -0,0 +1,36 @@
+"""
+Async base for the read-only endpoints served under ASGI.
+
+DRF's APIView is synchronous, so under an ASGI server every request to it
+runs in a worker thread. Views built on AsyncAPIView define ``async def get``
+and use the async ORM (aget, async for); Django runs them on the event loop.
+"""
+from django.http import JsonResponse
+from django.views import View
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class AsyncAPIView(View):
+    """
+    Sets request.auth from ``authentication_classes`` (stateless, no database)
+    and request.query_params like DRF, and renders dicts/lists with respond().
+    """
+    authentication_classes = ()
+
+    async def dispatch(self, request, *args, **kwargs):
+        request.auth = None
+        for authentication in self.authentication_classes:
+            try:
+                result = authentication().authenticate(request)
+            except AuthenticationFailed as e:
+                return self.respond({'detail': e.detail}, status=401)
+            if result is not None:
+                request.auth = result[1]
+                break
+        request.query_params = request.GET
+        return await super().dispatch(request, *args, **kwargs)
+
+    @staticmethod
+    def respond(data, status=200):
+        return JsonResponse(data, status=status, safe=False, encoder=JSONEncoder)
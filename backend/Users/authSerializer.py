@@ -4,6 +4,8 @@ from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from django.contrib.auth import get_user_model
 from .models import *
 from .views import getRoleList
+from .roles import issue_role_version
+from .authentication import ROLE_VERSION_CLAIM
 from .serializers import FacultySerializer, StudentSerializer
 from rest_framework_simplejwt.tokens import RefreshToken, AccessToken
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
@@ -67,6 +69,8 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         try:
             faculty = Faculty.objects.get(user=user)
             user_type = 'faculty'
+            # read the version before the roles so a concurrent change invalidates this token
+            token[ROLE_VERSION_CLAIM] = issue_role_version(faculty.id)
             roles = getRoleList(faculty.id)
             token['id'] = faculty.id  # Use faculty model id
         except Faculty.DoesNotExist:
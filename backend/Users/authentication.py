@@ -0,0 +1,42 @@
+from django.conf import settings
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+
+from .roles import current_role_version, get_faculty_roles
+
+ROLE_VERSION_CLAIM = 'role_version'
+
+
+class TokenClaimsAuthentication(JWTStatelessUserAuthentication):
+    """
+    Validates the bearer token without loading the User row; views read the
+    caller's identity from request.auth claims instead.
+    """
+
+
+def resolve_faculty(request, faculty_id=None):
+    """
+    Returns (faculty_id, roles) for the caller.
+
+    A faculty access token is authoritative: its id replaces any faculty
+    parameter and its roles claim is trusted while the role_version claim
+    matches the current version, which expires after ROLE_CACHE_TTL. Any
+    other token (a scholar's) resolves to no faculty. Only callers sending no
+    token at all get the legacy faculty parameter, and only if
+    SCHOLARSHIP_ALLOW_FACULTY_PARAM is set.
+    """
+    token = getattr(request, 'auth', None)
+    if token is not None and token.get('type') == 'faculty':
+        token_faculty = token.get('id')
+        claimed = token.get('roles')
+        if claimed is not None and not getattr(settings, 'ROLE_VERSION_CHECK', True):
+            return token_faculty, frozenset(claimed)
+        version = token.get(ROLE_VERSION_CLAIM)
+        if claimed is not None and version is not None and version == current_role_version(token_faculty):
+            return token_faculty, frozenset(claimed)
+        return token_faculty, get_faculty_roles(token_faculty, request)
+    if token is not None:
+        # scholars and other token holders never act as a faculty member
+        return None, frozenset()
+    if faculty_id and getattr(settings, 'SCHOLARSHIP_ALLOW_FACULTY_PARAM', True):
+        return faculty_id, get_faculty_roles(faculty_id, request)
+    return None, frozenset()
@@ -0,0 +1,50 @@
+"""
+Whether the default cache is shared between processes.
+
+Role versions, the role directory and the payroll report version are bumped
+in the Django cache. With a process-local backend (LocMemCache, DummyCache)
+a bump made by one worker or management command is invisible to the others,
+which only see the change once their own entries expire (ROLE_CACHE_TTL,
+PAYROLL_CACHE_TTL). Deployments with more than one process should point
+CACHES at Redis, Memcached or the database cache.
+"""
+from django.conf import settings
+from django.core import checks
+
+PROCESS_LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def cache_is_shared():
+    return settings.CACHES['default']['BACKEND'] not in PROCESS_LOCAL_BACKENDS
+
+
+def stale_cache_warning(what, ttl_setting):
+    """
+    The warning a management command prints after invalidating ``what``, or
+    None when the cache is shared and the invalidation reached the servers.
+    """
+    if cache_is_shared():
+        return None
+    return (
+        f"CACHES['default'] is process-local, so this command could not invalidate the {what} cached by running "
+        f"servers; they serve it until {ttl_setting} ({getattr(settings, ttl_setting, None)}s) expires. "
+        "Configure a shared cache backend to apply changes immediately."
+    )
+
+
+@checks.register(checks.Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    if cache_is_shared():
+        return []
+    return [checks.Warning(
+        "CACHES['default'] is process-local.",
+        hint=(
+            "Role revocations, role directory changes and payroll invalidations made in one process reach the "
+            "others only after ROLE_CACHE_TTL/PAYROLL_CACHE_TTL. Use Redis, Memcached or the database cache "
+            "when running several workers or management commands next to the server."
+        ),
+        id='Users.W001',
+    )]
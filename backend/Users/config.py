@@ -0,0 +1,104 @@
+import json
+import logging
+import os
+import threading
+import time
+from types import MappingProxyType
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONFIG_PATH = os.path.join(BASE_DIR, 'conf.json')
+
+# seconds between mtime checks, so the request path does not stat on every call
+RELOAD_INTERVAL = 5
+
+# sections of conf.json that must be flat {code: label} mappings
+MAPPING_SECTIONS = (
+    'admission_category', 'type_of_work', 'type_of_employee', 'designation',
+    'nature_of_employment', 'status', 'gender', 'research_category',
+)
+COLLEGE_SECTIONS = ('departments', 'administrative_units', 'roles', 'university', 'course')
+
+
+class ConfigError(ValueError):
+    pass
+
+
+def _mapping(data, name):
+    value = data.get(name, {})
+    if not isinstance(value, dict) or not all(isinstance(k, str) and isinstance(v, str) for k, v in value.items()):
+        raise ConfigError(f"'{name}' in conf.json must map codes to labels.")
+    return MappingProxyType(dict(value))
+
+
+def _choices(mapping):
+    return tuple(mapping.items())
+
+
+class Config:
+    """Parsed and validated view of conf.json. Instances are never mutated."""
+
+    def __init__(self, data=None, mtime=None):
+        data = data or {}
+        if not isinstance(data, dict):
+            raise ConfigError("conf.json must contain an object.")
+        college = data.get('college', {})
+        if not isinstance(college, dict):
+            raise ConfigError("'college' in conf.json must be an object.")
+        self.mtime = mtime
+        self.college = MappingProxyType({name: _mapping(college, name) for name in COLLEGE_SECTIONS})
+        self.sections = MappingProxyType({name: _mapping(data, name) for name in MAPPING_SECTIONS})
+        self.frontend = data.get('frontend')
+        self.backend = data.get('backend')
+
+        self.DEPARTMENT_CHOICES = _choices(self.college['departments'])
+        self.ROLES = _choices(self.college['roles'])
+        self.UNIVERSITIES = _choices(self.college['university'])
+        self.TOE = _choices(self.sections['type_of_employee'])
+        self.TOW = _choices(self.sections['type_of_work'])
+        self.NOE = _choices(self.sections['nature_of_employment'])
+        self.RC = _choices(self.sections['research_category'])
+        self.GENDER = _choices(self.sections['gender'])
+        self.DESIGNATION = _choices(self.sections['designation'])
+        self.AC = _choices(self.sections['admission_category'])
+        self.STATUS = _choices(self.sections['status'])
+
+        self.ROLE_CODES = frozenset(self.college['roles'])
+        self.DEPARTMENT_CODES = frozenset(self.college['departments'])
+        self.UNIVERSITY_CODES = frozenset(self.college['university'])
+
+
+def _read(path):
+    mtime = os.stat(path).st_mtime_ns
+    with open(path, 'r') as file:
+        return Config(json.load(file), mtime)
+
+
+_lock = threading.Lock()
+_config = None
+_checked_at = 0.0
+
+
+def get_config():
+    """
+    Returns the current Config. conf.json is parsed once per process and only
+    re-read when its mtime changes; a broken edit keeps the last good copy.
+    """
+    global _config, _checked_at
+    now = time.monotonic()
+    if _config is not None and now - _checked_at < RELOAD_INTERVAL:
+        return _config
+    with _lock:
+        if _config is not None and now - _checked_at < RELOAD_INTERVAL:
+            return _config
+        _checked_at = now
+        try:
+            mtime = os.stat(CONFIG_PATH).st_mtime_ns
+            if _config is None or mtime != _config.mtime:
+                _config = _read(CONFIG_PATH)
+        except (OSError, ValueError) as e:
+            logger.error(f"Error loading {CONFIG_PATH}: {e}")
+            if _config is None:
+                _config = Config()
+        return _config
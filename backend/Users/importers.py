@@ -0,0 +1,359 @@
+"""
+Column-wise helpers shared by the Excel import commands. Everything here works
+on whole pandas columns and touches the database a fixed number of times.
+"""
+import itertools
+import json
+import numbers
+import os
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+import pandas as pd
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from openpyxl import load_workbook
+
+from Scholarship.models import Scholarship
+from Scholarship.reports import invalidate_payroll, schedule_summary_refresh
+
+from .models import Faculty, Student
+from .caching import stale_cache_warning
+from .roles import invalidate_role_directory
+
+DEFAULT_DATE = pd.Timestamp("1970-01-01").date()
+
+# below this many passwords a thread pool costs more than it saves
+PARALLEL_HASH_THRESHOLD = 32
+
+# strings pd.read_excel/read_csv treat as missing; openpyxl hands them back verbatim
+NA_STRINGS = frozenset({
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN', '<NA>', 'N/A',
+    'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null',
+})
+
+
+def column(df, name):
+    """df[name], or an all-blank column when the sheet does not have it (like row.get)."""
+    if name in df:
+        return df[name]
+    return pd.Series(None, index=df.index, dtype=object)
+
+
+def clean_text(series):
+    """Stripped strings with '' for blanks; integral floats lose their '.0'."""
+    if pd.api.types.is_float_dtype(series):
+        whole = series.dropna()
+        if (whole == whole.round()).all():
+            series = series.astype('Int64')
+    return series.astype(object).where(series.notna(), '').astype(str).str.strip()
+
+
+def normalize_names(series):
+    # lowercase, single-spaced, without the "Prof " prefix some sheets carry
+    names = clean_text(series).str.replace(r'^prof\.?\s+', '', case=False, regex=True)
+    return names.str.lower().str.split().str.join(' ').fillna('')
+
+
+def invert_mapping(mapping):
+    """{label.lower(): code}, keeping the first code for duplicate labels."""
+    inverted = {}
+    for code, label in mapping.items():
+        inverted.setdefault(str(label).strip().lower(), code)
+    return inverted
+
+
+def map_labels(series, mapping):
+    # column-wise reverse_lookup: label -> config code, None when unknown
+    codes = clean_text(series).str.lower().map(invert_mapping(mapping))
+    return codes.astype(object).where(codes.notna(), None)
+
+
+def parse_dates(series):
+    parsed = pd.to_datetime(series, errors='coerce')
+    return parsed.dt.date.astype(object).where(parsed.notna(), DEFAULT_DATE)
+
+
+def existing_usernames(candidates=None):
+    """Usernames already taken, limited to ``candidates`` (one IN query) when given."""
+    users = get_user_model().objects.all()
+    if candidates is not None:
+        users = users.filter(username__in=set(candidates))
+    return set(users.values_list('username', flat=True))
+
+
+def hash_passwords(raw_passwords, workers=None):
+    """
+    make_password() for every value, spread over a thread pool.
+
+    hashlib.pbkdf2_hmac releases the GIL for the whole computation and
+    make_password adds no measurable Python work around it, so threads hash
+    in parallel like processes would, without forking or pickling. Results
+    come back in input order.
+    """
+    raw_passwords = list(raw_passwords)
+    if workers == 1 or len(raw_passwords) < PARALLEL_HASH_THRESHOLD:
+        return [make_password(password) for password in raw_passwords]
+    workers = workers or os.cpu_count() or 1
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(make_password, raw_passwords))
+
+
+def load_faculty_index():
+    """One query for every faculty member, keyed by normalized name."""
+    faculty = pd.DataFrame(
+        list(Faculty.objects.order_by('id').values_list('id', 'name', 'department')),
+        columns=['faculty_id', 'name', 'faculty_department'],
+    )
+    faculty['name_key'] = normalize_names(faculty['name'])
+    faculty['faculty_department'] = clean_text(faculty['faculty_department']).str.upper()
+    return faculty
+
+
+def resolve_faculty(names, departments, faculty, fallback=True):
+    """
+    Returns faculty ids (or None) for a column of names.
+
+    Matches the case-insensitive full name first (lowest id wins, like
+    .filter(name__iexact=...).first()), then optionally a faculty member in
+    the same department whose name contains the surname.
+    """
+    rows = pd.DataFrame({
+        'row': range(len(names)),
+        'name_key': normalize_names(names).values,
+        'department': clean_text(departments).str.upper().values,
+    })
+    rows = rows[rows['name_key'] != '']
+    exact = faculty.drop_duplicates('name_key')[['name_key', 'faculty_id']]
+    rows = rows.merge(exact, on='name_key', how='left')
+
+    if fallback:
+        missing = rows[rows['faculty_id'].isna()].drop(columns='faculty_id')
+        missing = missing.assign(surname=missing['name_key'].str.split().str[-1])
+        candidates = missing.merge(faculty, left_on='department', right_on='faculty_department', suffixes=('', '_f'))
+        hits = pd.Series(
+            [surname in name for surname, name in zip(candidates['surname'], candidates['name_key_f'])],
+            index=candidates.index, dtype=bool,
+        )
+        candidates = candidates[hits].sort_values(['row', 'faculty_id']).drop_duplicates('row')
+        rows = rows.set_index('row')
+        rows.loc[candidates['row'].values, 'faculty_id'] = candidates['faculty_id'].values
+        rows = rows.reset_index()
+
+    ids = pd.Series([None] * len(names), index=names.index, dtype=object)
+    matched = rows[rows['faculty_id'].notna()]
+    ids.iloc[matched['row'].values] = matched['faculty_id'].astype(int).values
+    return ids
+
+
+
+def _comparable(value):
+    # Decimal/float/numpy ints from the sheet compare equal to the database values
+    if isinstance(value, numbers.Number) and not isinstance(value, bool):
+        return None if pd.isna(value) else Decimal(str(value)).normalize()
+    return value
+
+
+def _is_blank(value):
+    # DEFAULT_DATE is the importers' own placeholder for unparseable dates
+    return value is None or value == '' or value == DEFAULT_DATE or (isinstance(value, float) and pd.isna(value))
+
+
+def sync_plan(model, frame, key, fields):
+    """
+    Diffs sheet rows against existing ``model`` rows matched on ``key`` (one query).
+
+    Returns ``(new, changed, diff)``: the rows with no match, the matched rows
+    that differ (every stored column plus the updates, since the INSERT half of
+    an upsert must satisfy NOT NULL), and ``(key, field, old, new)`` tuples.
+    Blank sheet cells never overwrite stored values.
+    """
+    columns = [f.attname for f in model._meta.concrete_fields if not f.primary_key]
+    existing = {
+        row[key]: row
+        for row in model.objects.filter(**{f"{key}__in": list(frame[key])}).values(*columns)
+    }
+    new = frame[~frame[key].isin(existing)]
+    changed, diff = [], []
+    for row in frame[frame[key].isin(existing)].to_dict('records'):
+        current = existing[row[key]]
+        updates = {
+            field: row[field] for field in fields
+            if not _is_blank(row[field]) and _comparable(row[field]) != _comparable(current[field])
+        }
+        if updates:
+            changed.append({**current, **updates})
+            diff += [(row[key], field, current[field], value) for field, value in updates.items()]
+    return new, changed, diff
+
+
+RATE_FIELDS = ('scholarship_basic', 'scholarship_hra')
+CATEGORY_FIELDS = ('admission_category', 'rf_category')
+
+
+def fellowship_rates(frame):
+    """
+    The scholarship_basic/scholarship_hra of each row of ``frame`` from its
+    admission_category and rf_category: the defaults for fellows (42000 basic
+    for SRF), 0 for everyone else. bulk_create and upserts bypass Student.save.
+    """
+    fellowship = frame["admission_category"] == "INST_FEL"
+    rates = pd.DataFrame({
+        "scholarship_basic": Student._meta.get_field('scholarship_basic').default,
+        "scholarship_hra": Student._meta.get_field('scholarship_hra').default,
+    }, index=frame.index)
+    rates.loc[fellowship & (frame["rf_category"] == "SRF"), "scholarship_basic"] = 42000
+    rates.loc[~fellowship, list(RATE_FIELDS)] = 0
+    return rates
+
+
+def recategorize(changed, diff, key):
+    """
+    Recomputes RATE_FIELDS on the sync_plan ``changed`` rows whose category
+    changed, adding the rate changes to ``diff``. Returns their keys; other
+    rows keep their stored (possibly hand-edited) rates.
+    """
+    moved = {row_key for row_key, field, _, _ in diff if field in CATEGORY_FIELDS}
+    rows = [row for row in changed if row[key] in moved]
+    if rows:
+        rates = fellowship_rates(pd.DataFrame(rows))
+        for row, new_rates in zip(rows, rates.to_dict('records')):
+            for field in RATE_FIELDS:
+                if _comparable(new_rates[field]) != _comparable(row[field]):
+                    diff.append((row[key], field, row[field], new_rates[field]))
+                    row[field] = new_rates[field]
+    return moved
+
+
+def reprice_scholars(scholars):
+    """
+    Reprices the unreleased scholarships of ``scholars`` (a Student queryset)
+    after an upsert changed their rates, which sends no signals, and refreshes
+    the affected rollups and payroll reports when the transaction commits.
+    """
+    unreleased = Scholarship.objects.filter(scholar__in=scholars, release=False)
+    repriced = unreleased.reprice()
+    if repriced:
+        groups = set(unreleased.values_list('year', 'month', 'scholar__department'))
+        schedule_summary_refresh((year, month, department or '') for year, month, department in groups)
+        transaction.on_commit(invalidate_payroll)
+    return repriced
+
+
+def upsert(model, rows, key, fields, batch_size=None):
+    """Writes changed rows with INSERT ... ON CONFLICT (key) DO UPDATE; returns the count."""
+    if not rows:
+        return 0
+    model.objects.bulk_create(
+        [model(**row) for row in rows],
+        update_conflicts=True,
+        unique_fields=[key],
+        update_fields=list(fields),
+        batch_size=batch_size,
+    )
+    return len(rows)
+
+
+def write_diff(stdout, new_keys, diff):
+    """Dry-run report: '+ key' for inserts, '~ key: field old -> new' for updates."""
+    for key in new_keys:
+        stdout.write(f"+ {key}")
+    for key, field, old, new in diff:
+        stdout.write(f"~ {key}: {field} {old!r} -> {new!r}")
+
+
+def read_chunks(path, chunk_size=None, skip=0):
+    """
+    Yields the data rows of an .xlsx or .csv file as DataFrames of at most
+    ``chunk_size`` rows (all of them when None), after skipping ``skip`` rows.
+
+    Workbooks are opened read-only so openpyxl streams rows instead of
+    loading every cell. The index holds each row's position in the file.
+    """
+    if path.lower().endswith('.csv'):
+        chunks = pd.read_csv(path, skiprows=range(1, skip + 1), chunksize=chunk_size)
+        for start, chunk in _numbered(chunks if chunk_size else [chunks], skip):
+            if len(chunk):
+                chunk.columns = chunk.columns.str.strip()
+                yield chunk.set_axis(pd.RangeIndex(start, start + len(chunk)))
+        return
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(cell).strip() if cell is not None else '' for cell in next(rows, ())]
+        rows = itertools.islice(rows, skip, None)
+        start = skip
+        while batch := list(itertools.islice(rows, chunk_size)):
+            frame = pd.DataFrame(batch, columns=header, index=pd.RangeIndex(start, start + len(batch)))
+            yield frame.mask(frame.isin(NA_STRINGS))
+            start += len(batch)
+    finally:
+        workbook.close()
+
+
+def _numbered(chunks, start):
+    for chunk in chunks:
+        yield start, chunk
+        start += len(chunk)
+
+
+class ChunkedImportMixin:
+    """
+    Streaming driver for the import commands.
+
+    The source is read in chunks and each chunk is committed in its own
+    transaction, after which ``<source>.checkpoint`` records how many rows are
+    done; ``--resume`` skips those rows. Commands implement
+    ``import_chunk(df, options)`` returning ``(created, updated)``.
+    """
+
+    def add_chunk_arguments(self, parser):
+        parser.add_argument('--file', help='Source .xlsx or .csv file (defaults to the bundled sheet)')
+        parser.add_argument('--chunk-size', type=int, default=None, help='Rows per transaction (default: the whole file)')
+        parser.add_argument('--resume', action='store_true', help='Continue an interrupted run from its checkpoint')
+
+    def run_import(self, path, options):
+        checkpoint = f"{path}.checkpoint"
+        done = self.read_checkpoint(checkpoint, path) if options.get('resume') else 0
+        if done:
+            self.stdout.write(f"Resuming after row {done}.")
+        dry_run = options.get('dry_run')
+        created = updated = 0
+        for chunk in read_chunks(path, options.get('chunk_size'), skip=done):
+            with transaction.atomic():
+                chunk_created, chunk_updated = self.import_chunk(chunk, options)
+            # bulk_create/upsert send no signals; only reaches the servers through a shared cache
+            invalidate_role_directory()
+            created += chunk_created
+            updated += chunk_updated
+            done += len(chunk)
+            if not dry_run:
+                self.write_checkpoint(checkpoint, path, done)
+            self.stdout.write(f"Processed {done} rows ({created} created, {updated} updated).")
+        if os.path.exists(checkpoint) and not dry_run:
+            os.remove(checkpoint)
+        warning = stale_cache_warning('role directory', 'ROLE_CACHE_TTL') if created or updated else None
+        if warning and not dry_run:
+            self.stderr.write(self.style.WARNING(warning))
+        return created, updated
+
+    def read_checkpoint(self, checkpoint, path):
+        if not os.path.exists(checkpoint):
+            return 0
+        with open(checkpoint) as f:
+            state = json.load(f)
+        if state.get('source') != _fingerprint(path):
+            # fixing a bad row and resuming is the usual case; rows before the checkpoint must not move
+            self.stdout.write(self.style.WARNING(f"{path} changed since the checkpoint was written."))
+        return state['rows']
+
+    def write_checkpoint(self, checkpoint, path, rows):
+        with open(checkpoint, 'w') as f:
+            json.dump({'source': _fingerprint(path), 'rows': rows}, f)
+
+
+def _fingerprint(path):
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
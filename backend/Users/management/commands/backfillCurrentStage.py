@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db.models import OuterRef, Subquery
+
+from Scholarship.models import Scholarship, Stage
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Copy the latest Stage role/status of every scholarship into Scholarship.current_stage_*'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--missing-only',
+            action='store_true',
+            help='Only fill scholarships whose current stage has never been set',
+        )
+
+    def handle(self, *args, **kwargs):
+        started = time.perf_counter()
+        latest = Stage.objects.filter(scholarship=OuterRef('pk')).order_by('-id')
+        scholarships = Scholarship.objects.all()
+        if kwargs.get('missing_only'):
+            scholarships = scholarships.filter(current_stage_role__isnull=True)
+        # one UPDATE with correlated subqueries; scholarships without stages end up NULL
+        updated = scholarships.update(
+            current_stage_role=Subquery(latest.values('role')[:1]),
+            current_stage_status=Subquery(latest.values('status')[:1]),
+        )
+        elapsed = time.perf_counter() - started
+        logger.info(f"Backfilled current stage on {updated} scholarships in {elapsed:.2f}s")
+        self.stdout.write(self.style.SUCCESS(f"Scholarships updated: {updated}, Time: {elapsed:.2f}s"))
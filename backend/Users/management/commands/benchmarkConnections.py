@@ -0,0 +1,119 @@
+from django.conf import settings
+from django.contrib.auth.hashers import MD5PasswordHasher
+from django.contrib.auth.models import User
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import override_settings
+
+from Users.models import Faculty, Roles
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BENCH_USERNAME = 'bench-connections'
+BENCH_PASSWORD = 'bench-connections'
+
+# mode -> settings_dict overrides for the default database
+MODES = {
+    'no reuse': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False},
+    'persistent': {'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': False},
+    'persistent + health checks': {'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': True},
+    'pool': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False, 'OPTIONS': {'pool': {'min_size': 1, 'max_size': 4}}},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Time the token and scholarship endpoints through the full WSGI request cycle (where Django opens '
+        'and closes connections) with no connection reuse, persistent connections, and the psycopg pool. '
+        'Passwords are hashed with MD5 for the run so the timings show the database part.'
+    )
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Requests per endpoint and mode')
+        parser.add_argument('--mode', choices=list(MODES), help='Measure a single mode in this process (used internally)')
+
+    def handle(self, *args, **options):
+        if options.get('mode'):
+            return self.stdout.write(json.dumps(self.measure(options['mode'], options['requests'])))
+
+        modes = [mode for mode in MODES if mode != 'pool' or connection.vendor == 'postgresql']
+        if len(modes) < len(MODES):
+            self.stdout.write(self.style.WARNING(f"Skipping the pool: it needs PostgreSQL, not {connection.vendor}."))
+        faculty = Faculty.objects.first()
+        if faculty is None:
+            raise CommandError("Load some faculty first (employeeEntries).")
+        # a supervisor's FAC inbox when there is one, else the plain list
+        scholarship_params = {'page_size': 20}
+        supervisor = Roles.objects.filter(role='FAC', faculty__Supervisor__isnull=False).values_list('faculty_id', flat=True).first()
+        if supervisor:
+            scholarship_params.update(faculty=supervisor, role='FAC')
+        # throwaway faculty login with a cheap hash; deleting the user removes it again
+        user = User.objects.create(username=BENCH_USERNAME, password=MD5PasswordHasher().encode(BENCH_PASSWORD, 'bench'))
+        try:
+            Faculty.objects.create(
+                user=user, name='Connection benchmark', email=f"{BENCH_USERNAME}@example.com", phone_number='0',
+                department=faculty.department, university=faculty.university, designation=faculty.designation,
+                date_of_birth=faculty.date_of_birth,
+            )
+            results = {mode: self.run_child(mode, options['requests'], scholarship_params) for mode in modes}
+        finally:
+            user.delete()
+
+        baseline = results[modes[0]]
+        self.stdout.write(f"{'endpoint':<14}{'mode':<28}{'median ms':>11}{'p90 ms':>9}{'saved ms':>10}")
+        for endpoint in baseline:
+            for mode in modes:
+                median, p90 = results[mode][endpoint]
+                saved = baseline[endpoint][0] - median
+                self.stdout.write(f"{endpoint:<14}{mode:<28}{median:>11.2f}{p90:>9.2f}{saved:>10.2f}")
+
+    def run_child(self, mode, requests, scholarship_params):
+        # a fresh process per mode, so no connection or pool outlives its mode
+        env = {**os.environ, 'BENCH_SCHOLARSHIP_PARAMS': json.dumps(scholarship_params)}
+        command = [
+            sys.executable, os.path.join(settings.BASE_DIR, 'manage.py'), 'benchmarkConnections',
+            '--mode', mode, '--requests', str(requests),
+        ]
+        output = subprocess.run(command, env=env, capture_output=True, text=True)
+        if output.returncode:
+            raise CommandError(f"{mode} run failed:\n{output.stderr}")
+        return json.loads(output.stdout.strip().splitlines()[-1])
+
+    def measure(self, mode, requests):
+        connection.close()
+        connection.settings_dict.update(MODES[mode])
+        scholarship_params = json.loads(os.environ['BENCH_SCHOLARSHIP_PARAMS'])
+        factory = RequestFactory()
+        endpoints = {
+            'token': lambda: factory.post(
+                '/api/users/token/', {'username': BENCH_USERNAME, 'password': BENCH_PASSWORD},
+                content_type='application/json',
+            ),
+            'scholarships': lambda: factory.get('/api/scholarships/manage/', scholarship_params),
+        }
+        handler = WSGIHandler()
+        results = {}
+        with override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher']):
+            for endpoint, build in endpoints.items():
+                timings = []
+                for attempt in range(requests + 1):
+                    environ = build().environ
+                    started = time.perf_counter()
+                    response = handler(environ, lambda status, headers, exc_info=None: None)
+                    b''.join(response)
+                    # fires request_finished, where Django closes or keeps the connection
+                    response.close()
+                    if attempt:
+                        timings.append((time.perf_counter() - started) * 1000)
+                    if response.status_code != 200:
+                        raise CommandError(f"{endpoint} returned {response.status_code}")
+                timings.sort()
+                results[endpoint] = (statistics.median(timings), timings[int(len(timings) * 0.9)])
+        return results
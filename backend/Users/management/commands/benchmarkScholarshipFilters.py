@@ -0,0 +1,175 @@
+from django.core.management.base import BaseCommand
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIRequestFactory
+
+from Scholarship.models import STAGE_FLOW, Scholarship, Stage, calculate_pay
+from Scholarship.views import MultiFuctionalScholarshipAPI
+from Users.models import Faculty, Roles, Student
+from calendar import monthrange
+from datetime import date
+import statistics
+import time
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed scholarship data inside a transaction, time every MultiFuctionalScholarshipAPI.get '
+        'filter with and without the Scholarship/Stage/Student indexes, then roll everything back. '
+        'Run it against a scratch database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scholars', type=int, default=2000)
+        parser.add_argument('--months', type=int, default=24)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--page-size', type=int, default=50, help='0 serializes the full list')
+        parser.add_argument('--plans', action='store_true', help='Print the plan of the slowest query for each filter')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options)
+                raise Rollback()
+        except Rollback:
+            self.stdout.write(self.style.SUCCESS("Benchmark data rolled back."))
+
+    def run(self, options):
+        started = time.perf_counter()
+        faculty = self.seed(options['scholars'], options['months'])
+        self.stdout.write(f"Seeded {Scholarship.objects.count()} scholarships and {Stage.objects.count()} stages "
+                          f"in {time.perf_counter() - started:.1f}s")
+        cases = self.cases(faculty, options['page_size'])
+        plans = options['plans']
+        with override_settings(SCHOLARSHIP_ALLOW_FACULTY_PARAM=True):
+            indexed = {label: self.measure(params, options['repeat'], plans and 'indexed') for label, params in cases}
+            self.drop_indexes()
+            plain = {label: self.measure(params, options['repeat'], plans and 'no index') for label, params in cases}
+
+        self.stdout.write(f"{'filter':<28}{'indexed ms':>12}{'no index ms':>13}{'queries':>9}")
+        for label, _ in cases:
+            ms, queries, plan = indexed[label]
+            self.stdout.write(f"{label:<28}{ms:>12.2f}{plain[label][0]:>13.2f}{queries:>9}")
+            if plans:
+                self.stdout.write(f"  with indexes:\n{plan}\n  without indexes:\n{plain[label][2]}")
+
+    def seed(self, scholars, months):
+        departments = ['CSE', 'ECE', 'MECH', 'CIVIL', 'PHY', 'MATH']
+        users = User.objects.bulk_create(
+            [User(username=f"bench-fac-{dept}", password='!') for dept in departments]
+            + [User(username=f"bench-sch-{i}", password='!') for i in range(scholars)]
+        )
+        faculty = Faculty.objects.bulk_create([
+            Faculty(user=users[i], name=f"Bench {dept}", email=f"bench-{dept}@example.com", phone_number='0',
+                    department=dept, university='NIT-Sri', designation='PROF', date_of_birth=date(1970, 1, 1))
+            for i, dept in enumerate(departments)
+        ])
+        roles = [Roles(faculty=f, role='FAC') for f in faculty] + [Roles(faculty=f, role='HOD') for f in faculty]
+        roles += [Roles(faculty=faculty[0], role='AD'), Roles(faculty=faculty[0], role='DEAN')]
+        Roles.objects.bulk_create(roles)
+
+        students = Student.objects.bulk_create([
+            Student(user=users[len(departments) + i], enroll=f"bench-{i}", registration=f"bench-{i}",
+                    name=f"Bench Scholar {i}", email='bench@example.com', phone_number='0',
+                    department=departments[i % len(departments)], course='PhD', university='NIT-Sri',
+                    supervisor=faculty[i % len(departments)], admission_category='INST_FEL')
+            for i in range(scholars)
+        ], batch_size=1000)
+
+        today = date.today()
+        periods = []
+        year, month = today.year, today.month
+        for _ in range(months):
+            periods.append((year, month))
+            year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+
+        scholarships = []
+        for age, (year, month) in enumerate(periods):
+            days = monthrange(year, month)[1]
+            for student in students:
+                per_day, total = calculate_pay(student.scholarship_basic, student.scholarship_hra, year, month, days)
+                scholarships.append(Scholarship(
+                    scholar=student, month=month, year=year, days=days, total_pay_per_day=per_day,
+                    total_pay=total, release=age > 0, status="1" if age > 1 else "2",
+                ))
+        Scholarship.objects.bulk_create(scholarships, batch_size=2000)
+
+        # Older months went through the whole chain, last month is part-way, this month is unreleased
+        stages = []
+        for scholarship in scholarships:
+            if not scholarship.release:
+                continue
+            if scholarship.status == "1":
+                stages += [Stage(scholarship=scholarship, role=role, status="1") for role in STAGE_FLOW]
+            else:
+                reached = scholarship.scholar_id % len(STAGE_FLOW)
+                stages += [Stage(scholarship=scholarship, role=role, status="1") for role in STAGE_FLOW[:reached]]
+                stages.append(Stage(scholarship=scholarship, role=STAGE_FLOW[reached], status="2"))
+        Stage.objects.bulk_create(stages, batch_size=5000)
+        for stage in stages:
+            stage.scholarship.current_stage_role = stage.role
+            stage.scholarship.current_stage_status = stage.status
+        Scholarship.objects.bulk_update(
+            [s for s in scholarships if s.release], ['current_stage_role', 'current_stage_status'], batch_size=2000
+        )
+
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                for model in (Student, Scholarship, Stage):
+                    cursor.execute(f'ANALYZE "{model._meta.db_table}"')
+        return faculty
+
+    def cases(self, faculty, page_size):
+        paging = {'page_size': page_size} if page_size else {}
+        scholar = Student.objects.filter(enroll='bench-0').values_list('id', flat=True).get()
+        hod = faculty[1].id
+        dean = faculty[0].id
+        cases = [
+            ('all', {}),
+            ('scholar', {'scholar': scholar}),
+            ('FAC inbox', {'faculty': hod, 'role': 'FAC'}),
+            ('HOD inbox', {'faculty': hod, 'role': 'HOD'}),
+            ('DEAN inbox', {'faculty': dean, 'role': 'DEAN'}),
+        ]
+        for filter_type in ('current', 'previous', 'approved', 'pending', date.today().strftime('%B')):
+            cases.append((f"type={filter_type}", {'type': filter_type}))
+        for filter_type in ('role_approved', 'role_pending'):
+            cases.append((f"HOD {filter_type}", {'faculty': hod, 'role': 'HOD', 'type': filter_type}))
+            cases.append((f"DEAN {filter_type}", {'faculty': dean, 'role': 'DEAN', 'type': filter_type}))
+        return [(label, {**params, **paging}) for label, params in cases]
+
+    def measure(self, params, repeat, phase=None):
+        factory = APIRequestFactory()
+        view = MultiFuctionalScholarshipAPI.as_view()
+        timings = []
+        for _ in range(repeat):
+            request = factory.get('/api/scholarships/manage/', params)
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                response = view(request)
+                response.render()
+                timings.append((time.perf_counter() - started) * 1000)
+        if response.status_code != 200:
+            self.stdout.write(self.style.WARNING(f"{params} returned {response.status_code}"))
+        slowest = max(ctx.captured_queries, key=lambda q: float(q['time']), default=None)
+        plan = self.explain(slowest['sql'], phase) if phase and slowest else None
+        return statistics.median(timings), len(ctx.captured_queries), plan
+
+    def drop_indexes(self):
+        # DDL is transactional on PostgreSQL and SQLite, so the outer rollback restores the indexes
+        with connection.cursor() as cursor:
+            for model in (Scholarship, Stage, Student):
+                for index in model._meta.indexes:
+                    cursor.execute(f"DROP INDEX {connection.ops.quote_name(index.name)}")
+
+    def explain(self, sql, phase):
+        prefix = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN '
+        with connection.cursor() as cursor:
+            # the comment keeps sqlite3's statement cache from replaying the pre-DROP plan
+            cursor.execute(f"/* {phase} */ {prefix}{sql}")
+            return '\n'.join('    ' + ' '.join(str(col) for col in row) for row in cursor.fetchall())
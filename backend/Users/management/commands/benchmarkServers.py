@@ -0,0 +1,155 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from Users.models import Faculty, Student
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+import http.client
+import os
+import shlex
+import socket
+import statistics
+import subprocess
+import time
+
+# (label, WSGI path, ASGI path); the ASGI server gets the async variants
+ENDPOINTS = [
+    ('students', '/api/users/student/', '/api/users/async/student/'),
+    ('faculty', '/api/users/faculty/?department={department}', '/api/users/async/faculty/?department={department}'),
+    ('members', '/api/users/members/?role=scholar&id={scholar}', '/api/users/async/members/?role=scholar&id={scholar}'),
+    ('scholarships', '/api/scholarships/manage/?page_size=50', '/api/scholarships/async/manage/?page_size=50'),
+]
+
+SERVERS = {
+    'wsgi': 'gunicorn backend.wsgi:application --workers {workers} --bind 127.0.0.1:{port}',
+    'asgi': 'uvicorn backend.asgi:application --workers {workers} --host 127.0.0.1 --port {port} --no-access-log',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Load-test the read endpoints under a WSGI server (sync views) and an ASGI server (async views) '
+        'with the same number of workers; reports requests/s, p50/p99 latency and server memory. '
+        'Needs gunicorn and uvicorn, or --wsgi-url/--asgi-url pointing at servers you started.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help='Worker processes for each server')
+        parser.add_argument('--concurrency', type=int, default=32, help='Concurrent client connections')
+        parser.add_argument('--duration', type=float, default=10, help='Seconds per endpoint')
+        parser.add_argument('--servers', default='wsgi,asgi', help='Comma-separated subset of wsgi,asgi')
+        parser.add_argument('--port', type=int, default=8701, help='First port for the spawned servers')
+        parser.add_argument('--wsgi-cmd', default=SERVERS['wsgi'])
+        parser.add_argument('--asgi-cmd', default=SERVERS['asgi'])
+        parser.add_argument('--wsgi-url', help='Benchmark this running WSGI server instead of spawning one')
+        parser.add_argument('--asgi-url', help='Benchmark this running ASGI server instead of spawning one')
+
+    def handle(self, *args, **options):
+        params = self.params()
+        results = []
+        for offset, server in enumerate(options['servers'].split(',')):
+            if server not in SERVERS:
+                raise CommandError(f"Unknown server {server!r}; choose from {', '.join(SERVERS)}.")
+            url = options.get(f'{server}_url')
+            process = None
+            if not url:
+                port = options['port'] + offset
+                url = f"http://127.0.0.1:{port}"
+                process = self.start(options[f'{server}_cmd'].format(workers=options['workers'], port=port), port)
+            try:
+                for label, wsgi_path, asgi_path in ENDPOINTS:
+                    path = (wsgi_path if server == 'wsgi' else asgi_path).format(**params)
+                    self.load(url, path, options['concurrency'], 1)  # warm caches and connections
+                    stats = self.load(url, path, options['concurrency'], options['duration'])
+                    rss = self.memory(process) if process else None
+                    results.append((server, label, stats, rss))
+                    self.stdout.write(f"{server} {label}: {stats['rps']:.0f} req/s")
+            finally:
+                if process:
+                    self.stop(process)
+
+        self.stdout.write(f"{'server':<7}{'endpoint':<14}{'req/s':>9}{'p50 ms':>9}{'p99 ms':>9}{'errors':>8}{'RSS MB':>9}")
+        for server, label, stats, rss in results:
+            memory = f"{rss:>9.0f}" if rss is not None else f"{'-':>9}"
+            self.stdout.write(
+                f"{server:<7}{label:<14}{stats['rps']:>9.0f}{stats['p50']:>9.1f}{stats['p99']:>9.1f}{stats['errors']:>8}{memory}"
+            )
+
+    def params(self):
+        scholar = Student.objects.values_list('id', flat=True).first()
+        department = Faculty.objects.exclude(department=None).values_list('department', flat=True).first()
+        if scholar is None or department is None:
+            raise CommandError("Load some faculty and scholars first (employeeEntries / scholarEntries).")
+        return {'scholar': scholar, 'department': department}
+
+    def start(self, command, port):
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'backend.settings')}
+        try:
+            process = subprocess.Popen(
+                shlex.split(command), cwd=settings.BASE_DIR, env=env,
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+        except FileNotFoundError as e:
+            raise CommandError(f"Cannot start {command!r}: {e}. Install gunicorn/uvicorn or pass --wsgi-url/--asgi-url.")
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise CommandError(f"{command!r} exited with status {process.returncode}.")
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+                return process
+            except OSError:
+                time.sleep(0.2)
+        self.stop(process)
+        raise CommandError(f"{command!r} did not listen on port {port} within 30s.")
+
+    def stop(self, process):
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+    def memory(self, process):
+        # master plus workers; psutil is only needed when the command spawns the servers
+        import psutil
+        parent = psutil.Process(process.pid)
+        return sum(p.memory_info().rss for p in [parent, *parent.children(recursive=True)]) / 2**20
+
+    def load(self, url, path, concurrency, duration):
+        # one keep-alive connection per client thread, each sending requests back to back
+        target = urlsplit(url)
+        deadline = time.monotonic() + duration
+
+        def client():
+            latencies, errors = [], 0
+            connection = http.client.HTTPConnection(target.hostname, target.port, timeout=30)
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                try:
+                    connection.request('GET', path)
+                    response = connection.getresponse()
+                    response.read()
+                    if response.status != 200:
+                        errors += 1
+                except (OSError, http.client.HTTPException):
+                    errors += 1
+                    connection.close()
+                    connection = http.client.HTTPConnection(target.hostname, target.port, timeout=30)
+                latencies.append((time.perf_counter() - started) * 1000)
+            connection.close()
+            return latencies, errors
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            outcomes = list(pool.map(lambda _: client(), range(concurrency)))
+        elapsed = time.perf_counter() - started
+        latencies = sorted(latency for outcome, _ in outcomes for latency in outcome)
+        if not latencies:
+            return {'rps': 0, 'p50': 0, 'p99': 0, 'errors': sum(errors for _, errors in outcomes)}
+        return {
+            'rps': len(latencies) / elapsed,
+            'p50': statistics.median(latencies),
+            'p99': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+            'errors': sum(errors for _, errors in outcomes),
+        }
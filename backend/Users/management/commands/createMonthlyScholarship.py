@@ -1,19 +1,39 @@
 from django.core.management.base import BaseCommand
+from django.db import transaction
 
-from Scholarship.models import Scholarship
+from Scholarship.models import Scholarship, calculate_pay
+from Scholarship.reports import invalidate_payroll, refresh_monthly_summary, schedule_summary_refresh
+from Users.caching import stale_cache_warning
 from Users.models import Student
 from datetime import date
 from calendar import monthrange
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
 class Command(BaseCommand):
     help = 'Create a Scholarship entry for the 1st of the current month'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--bulk',
+            action='store_true',
+            help='Generate all rows with one bulk insert instead of one insert per student',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows per INSERT statement in bulk mode',
+        )
+
     def handle(self, *args, **kwargs):
         today = date.today()
         current_month = today.month
         current_year = today.year
+        if kwargs.get('bulk'):
+            return self.handle_bulk(current_month, current_year, kwargs.get('batch_size'))
         success_count = 0
         error_count = 0
         students = Student.objects.all()
@@ -31,6 +51,53 @@ class Command(BaseCommand):
             except Exception as e:
                 logger.error(f"Error creating scholarship for {student}: {str(e)}")
                 error_count += 1
+        refresh_monthly_summary([(current_year, current_month, None)])
         self.stdout.write(
             self.style.SUCCESS(f"Scholarships created: {success_count}, Errors: {error_count}")
         )
+        if success_count:
+            self.warn_stale_reports()
+
+    def handle_bulk(self, month, year, batch_size):
+        started = time.perf_counter()
+        days = monthrange(year, month)[1]
+        # Only INST_FEL scholars are eligible, same rule as Scholarship.save
+        eligible = Student.objects.filter(admission_category="INST_FEL").values_list(
+            'id', 'scholarship_basic', 'scholarship_hra'
+        )
+        period = Scholarship.objects.filter(month=month, year=year)
+        scholarships, skipped = [], 0
+        with transaction.atomic():
+            # skipped = scholars that already had the month, read once instead of diffing row counts
+            existing = set(period.values_list('scholar_id', flat=True))
+            for scholar_id, basic, hra in eligible:
+                if scholar_id in existing:
+                    skipped += 1
+                    continue
+                total_pay_per_day, total_pay = calculate_pay(basic, hra, year, month, days)
+                scholarships.append(Scholarship(
+                    scholar_id=scholar_id,
+                    month=month,
+                    year=year,
+                    days=days,
+                    total_pay_per_day=total_pay_per_day,
+                    total_pay=total_pay,
+                ))
+            # unique_scholar_month_year still turns a row inserted concurrently into a no-op
+            Scholarship.objects.bulk_create(scholarships, batch_size=batch_size, ignore_conflicts=True)
+            inserted = len(scholarships)
+            # bulk_create sends no post_save; the servers only see this through a shared cache
+            transaction.on_commit(invalidate_payroll)
+            schedule_summary_refresh([(year, month, None)])
+        elapsed = time.perf_counter() - started
+        logger.info(f"Bulk scholarship generation for {month}/{year}: {inserted} inserted, {skipped} skipped in {elapsed:.2f}s")
+        self.stdout.write(
+            self.style.SUCCESS(f"Scholarships created: {inserted}, Skipped: {skipped}, Time: {elapsed:.2f}s")
+        )
+        if inserted:
+            self.warn_stale_reports()
+
+    def warn_stale_reports(self):
+        warning = stale_cache_warning('payroll reports', 'PAYROLL_CACHE_TTL')
+        if warning:
+            self.stderr.write(self.style.WARNING(warning))
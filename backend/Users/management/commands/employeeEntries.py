@@ -1,32 +1,37 @@
 import os
-import json
 import pandas as pd
 import logging
-import re
+import time
 
 from django.core.management.base import BaseCommand
-from django.db import transaction
-from django.contrib.auth.hashers import make_password
 from django.contrib.auth import get_user_model
 
+from Users.config import get_config
+from Users.importers import (
+    ChunkedImportMixin, clean_text, existing_usernames, hash_passwords, map_labels, parse_dates, sync_plan, upsert,
+    write_diff,
+)
 from Users.models import Faculty, Roles
+from Users.provisioning import CredentialManifest
 
 # Setup logger
 logger = logging.getLogger(__name__)
 
 # Load config
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
-CONFIG_PATH = os.path.join(BASE_DIR, 'conf.json')
-
-with open(CONFIG_PATH, 'r') as file:
-    config = json.load(file)
+config = get_config()
 
 # Mappings
-college_data = config.get('college', {})
-toe_map = config.get('type_of_employee', {})
-noe_map = config.get('nature_of_employment', {})
-designation_map = config.get('designation', {})
-departments_map = college_data.get('departments', {})
+toe_map = config.sections['type_of_employee']
+noe_map = config.sections['nature_of_employment']
+designation_map = config.sections['designation']
+departments_map = config.college['departments']
+
+# columns --sync compares and updates; roles are never touched for existing faculty
+SYNC_FIELDS = (
+    'name', 'phone_number', 'date_of_birth', 'department', 'designation', 'type_of_employee',
+    'nature_of_employment',
+)
 
 HOD_EMAILS = {
     "mfwani@nitsri.ac.in",
@@ -43,15 +48,17 @@ HOD_EMAILS = {
     #Chemistry Kausar Maam
 }
 
-def reverse_lookup(mapping: dict, value: str):
-    if not value:
-        return None
-    value = str(value).strip().lower()
-    return next((k for k, v in mapping.items() if v.strip().lower() == value), None)
-
-class Command(BaseCommand):
+class Command(ChunkedImportMixin, BaseCommand):
     help = 'Create Faculty entries from employee Excel file and a default admin user'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None, help='Threads used for password hashing (default: CPU count)')
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows per INSERT statement')
+        parser.add_argument('--sync', action='store_true', help='Insert new faculty and update changed ones, matched on email')
+        parser.add_argument('--dry-run', action='store_true', help='With --sync, print the diff without writing anything')
+        parser.add_argument('--random-passwords', action='store_true', help='Give each new account a random password and write them to a one-time manifest')
+        self.add_chunk_arguments(parser)
+
     def handle(self, *args, **kwargs):
         User = get_user_model()
         try:
@@ -67,91 +74,103 @@ class Command(BaseCommand):
                 self.stdout.write(self.style.WARNING(f"Superuser '{username}' already exists."))
 
             # Load Excel
-            excel_path = os.path.join(BASE_DIR, 'scripts', 'employee.xlsx')
-            df = pd.read_excel(excel_path)
-
-            users = []
-            faculties = []
-            usernames_seen = set()
-            
-
-            user_map = {}
-            faculty_map = {}
-
-            for idx, row in df.iterrows():
-                try:
-                    name = row.get("Name")
-                    phone = str(row.get("Mobile Number", "")).strip()
-                    email = str(row.get("Official Email", "")).strip().lower()
-                    email = str(row.get("Official Email", "")).strip().lower()
-                    email = email.replace("@nitsri.net", "@nitsri.ac.in")
-                    hashed_password = make_password(email)
-
-
-                    if not name or not email or "@" not in email:
-                        self.stdout.write(self.style.WARNING(f"Skipping invalid row {idx}: missing/invalid name/email"))
-                        continue
-
-                    if email in usernames_seen or User.objects.filter(username=email).exists():
-                        self.stdout.write(self.style.WARNING(f"Skipping duplicate/existing user: {email}"))
-                        continue
-
-                    usernames_seen.add(email)
-                    dob_raw = pd.to_datetime(row.get("Date of Birth"), errors='coerce')
-                    dob = dob_raw.date() if not pd.isna(dob_raw) else pd.to_datetime("1970-01-01").date()
-
-                    user = User(
-                        username=email,
-                        email=email,
-                        password=hashed_password,
-                        first_name=name.split()[0]
-                    )
-
-                    raw_department = str(row.get("Organization Unit", ""))
-                    department = re.sub(' +', ' ', raw_department).strip()
-                    department = re.sub(r'^department of\s+', '', department, flags=re.IGNORECASE)
-
-                    faculty = Faculty(
-                        user=None,  # Assign later after user bulk_create
-                        name=name,
-                        email=email,
-                        phone_number=phone,
-                        date_of_birth=dob,
-                        university="NIT-Sri",
-                        department=reverse_lookup(departments_map, department),
-                        designation=reverse_lookup(designation_map, row.get("Post")),
-                        type_of_employee=reverse_lookup(toe_map, row.get("Type of Employee")),
-                        nature_of_employment=reverse_lookup(noe_map, row.get("Nature of Employment")),
-                    )
-
-                    users.append(user)
-                    faculties.append(faculty)
-                    user_map[email] = user
-                    faculty_map[email] = faculty
-
-                except Exception as e:
-                    self.stdout.write(self.style.ERROR(f"Error processing row {idx}: {e}"))
-                    logger.error(f"Error on row {idx}: {row.to_dict()}", exc_info=e)
-
-            if not users:
-                self.stdout.write(self.style.WARNING("No valid users to create."))
-                return
-
-            with transaction.atomic():
-                User.objects.bulk_create(users)
-                # Assign user FK after user save
-                for email in user_map:
-                    faculty_map[email].user = user_map[email]
-                Faculty.objects.bulk_create(faculties)
-                roles = []
-                for email, faculty in faculty_map.items():
-                    roles.append(Roles(faculty=faculty, role='FAC'))
-                    if email in HOD_EMAILS:
-                        roles.append(Roles(faculty=faculty, role='HOD'))
-                        print(f"{email} - {faculty.name} assigned HOD")
-                Roles.objects.bulk_create(roles)
-            self.stdout.write(self.style.SUCCESS(f"Successfully created {len(users)} faculty users."))
+            excel_path = kwargs.get('file') or os.path.join(BASE_DIR, 'scripts', 'employee.xlsx')
+            self.manifest = CredentialManifest('faculty') if kwargs.get('random_passwords') else None
+            created, updated = self.run_import(excel_path, kwargs)
+            self.stdout.write(self.style.SUCCESS(f"Successfully created {created} faculty users and updated {updated}."))
+            if self.manifest and self.manifest.path:
+                self.stdout.write(self.style.WARNING(f"Initial passwords written to {self.manifest.path}"))
 
         except Exception as e:
             self.stdout.write(self.style.ERROR(f"Failed during execution: {e}"))
             logger.exception("Unhandled exception during faculty creation")
+
+    def import_chunk(self, df, options):
+        User = get_user_model()
+        sync = options.get('sync') or options.get('dry_run')
+        employees = self.prepare(df, sync=sync)
+        updates = []
+        if sync:
+            employees, updates, diff = sync_plan(Faculty, employees, 'email', SYNC_FIELDS)
+            taken = employees["email"].isin(existing_usernames(employees["email"]))
+            for email in employees.loc[taken, "email"]:
+                self.stdout.write(self.style.WARNING(f"Skipping duplicate/existing user: {email}"))
+            employees = employees[~taken]
+            self.stdout.write(f"{len(employees)} new and {len(updates)} changed faculty.")
+            if options.get('dry_run'):
+                write_diff(self.stdout, employees["email"], diff)
+                return 0, 0
+        if employees.empty and not updates:
+            self.stdout.write(self.style.WARNING("No valid users to create."))
+            return 0, 0
+
+        started = time.perf_counter()
+        if self.manifest:
+            passwords = self.manifest.provision(employees["email"], workers=options.get('workers'))
+        else:
+            passwords = hash_passwords(employees["email"], workers=options.get('workers'))
+        self.stdout.write(f"Hashed {len(passwords)} passwords in {time.perf_counter() - started:.1f}s")
+
+        users = [
+            User(username=email, email=email, password=hashed_password, first_name=name.split()[0])
+            for email, name, hashed_password in zip(employees["email"], employees["name"], passwords)
+        ]
+        faculties = [
+            Faculty(
+                user=user,
+                name=row.name,
+                email=row.email,
+                phone_number=row.phone_number,
+                date_of_birth=row.date_of_birth,
+                university="NIT-Sri",
+                department=row.department,
+                designation=row.designation,
+                type_of_employee=row.type_of_employee,
+                nature_of_employment=row.nature_of_employment,
+            )
+            for user, row in zip(users, employees.itertuples(index=False))
+        ]
+
+        # run_import wraps each chunk in a transaction
+        batch_size = options.get('batch_size')
+        User.objects.bulk_create(users, batch_size=batch_size)
+        Faculty.objects.bulk_create(faculties, batch_size=batch_size)
+        roles = []
+        for faculty in faculties:
+            roles.append(Roles(faculty=faculty, role='FAC'))
+            if faculty.email in HOD_EMAILS:
+                roles.append(Roles(faculty=faculty, role='HOD'))
+                self.stdout.write(f"{faculty.email} - {faculty.name} assigned HOD")
+        Roles.objects.bulk_create(roles, batch_size=batch_size)
+        updated = upsert(Faculty, updates, 'email', SYNC_FIELDS, batch_size=batch_size)
+        return len(users), updated
+
+    def prepare(self, df, sync=False):
+        """Maps the sheet column by column with inverted config tables; returns the rows to create."""
+        out = pd.DataFrame({
+            "name": clean_text(df["Name"]),
+            "phone_number": clean_text(df["Mobile Number"]),
+            "email": clean_text(df["Official Email"]).str.lower().str.replace("@nitsri.net", "@nitsri.ac.in", regex=False),
+            "date_of_birth": parse_dates(df["Date of Birth"]),
+            "department": map_labels(
+                clean_text(df["Organization Unit"])
+                .str.replace(r' +', ' ', regex=True)
+                .str.replace(r'^department of\s+', '', case=False, regex=True),
+                departments_map,
+            ),
+            "designation": map_labels(df["Post"], designation_map),
+            "type_of_employee": map_labels(df["Type of Employee"], toe_map),
+            "nature_of_employment": map_labels(df["Nature of Employment"], noe_map),
+        })
+
+        invalid = (out["name"] == '') | ~out["email"].str.contains("@", regex=False)
+        for index in out.index[invalid]:
+            self.stdout.write(self.style.WARNING(f"Skipping invalid row {index}: missing/invalid name/email"))
+
+        # in sync mode existing accounts are matched by sync_plan instead of skipped
+        existing = set() if sync else existing_usernames(out.loc[~invalid, "email"])
+        duplicate = ~invalid & (out["email"].isin(existing) | out["email"].where(~invalid).duplicated(keep='first'))
+        for email in out.loc[duplicate, "email"]:
+            self.stdout.write(self.style.WARNING(f"Skipping duplicate/existing user: {email}"))
+
+        return out[~invalid & ~duplicate]
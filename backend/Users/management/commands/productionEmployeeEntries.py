@@ -1,86 +1,90 @@
 import pandas as pd
 from django.core.management.base import BaseCommand
-from django.db import transaction
 from django.contrib.auth.models import User
 from django.contrib.auth.hashers import make_password
+from Users.importers import ChunkedImportMixin, clean_text, column, existing_usernames, parse_dates
 from Users.models import Faculty,Roles
+from Users.provisioning import CredentialManifest
 import logging
 import os
 logger = logging.getLogger(__name__)
 
-class Command(BaseCommand):
+class Command(ChunkedImportMixin, BaseCommand):
     help = 'Create Faculty entries from employee Excel file'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows per INSERT statement')
+        parser.add_argument('--random-passwords', action='store_true', help='Give each new account a random password and write them to a one-time manifest')
+        self.add_chunk_arguments(parser)
+
     def handle(self, *args, **kwargs):
         try:
             BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
-            scholar_df = pd.read_excel(os.path.join(BASE_DIR, 'media/Users/employee.xlsx'))
-            users_to_create = []
-            faculties_to_create = []
-            roles_to_create = []
-            usernames_seen = set()
-            hashed_password = make_password("root")
-            for _, row in scholar_df.iterrows():
-                try:
-                    name = row.get("Name")
-                    phone = row.get("Mobile Number")
-                    email = row.get("Official Email")
-                    toe = row.get("Type of Employee")
-                    noe = row.get("Nature of Employment")
-                    post = row.get("Post")
-                    dept = row.get("Organization Unit")
-                    dob_raw = row.get("Date of Birth")
-                    dob_parsed = pd.to_datetime(dob_raw, errors='coerce')
-                    date_of_birth = dob_parsed.date() if pd.notna(dob_parsed) else pd.to_datetime("1970-01-01").date()
-                    if pd.isna(email) or "@" not in str(email):
-                        raise ValueError(f"Invalid email for {name}: {email}")
-                    username = str(email).strip().lower()
-                    if username in usernames_seen:
-                        raise ValueError(f"Duplicate email/username detected: {username}")
-                    usernames_seen.add(username)
-                    if User.objects.filter(username=username).exists():
-                        raise ValueError(f"User already exists: {username}")
-                    user = User(
-                        username=username,
-                        password=hashed_password,
-                        email=username,
-                        first_name=name.split()[0] if name else ''
-                    )
-                    university = "NIT-Sri"
-                    designation = post if post else "OTHERS"
-                    toe = toe.strip() if toe else "Teaching"
-                    noe = noe.strip() if noe else "Permanent"
-                    faculty = Faculty(
-                        user=user,
-                        name=name,
-                        email=username,
-                        phone_number=str(phone).strip(),
-                        date_of_birth=date_of_birth,
-                        department=dept,
-                        university=university,
-                        designation=designation,
-                        type_of_employee=toe,
-                        nature_of_employment=noe,
-                    )
-                    roles=Roles(
-                        faculty=faculty,
-                        role='FAC'
-                    )
-                    users_to_create.append(user)
-                    faculties_to_create.append(faculty)
-                    roles_to_create.append(roles)
-                    print(f"{name} added:")
-                except Exception as e:
-                    logger.error(f"Error preparing row {row.to_dict()}: {e}")
-                    return 
-            with transaction.atomic():
-                User.objects.bulk_create(users_to_create)
-                for user, faculty in zip(users_to_create, faculties_to_create):
-                    faculty.user = user
-                Faculty.objects.bulk_create(faculties_to_create)
-                for faculty, role in zip(faculties_to_create, roles_to_create):
-                    role.faculty = faculty
-                Roles.objects.bulk_create(roles_to_create)
-            logger.info(f"{len(faculties_to_create)} Faculty records (and users) created successfully.")
+            file_path = kwargs.get('file') or os.path.join(BASE_DIR, 'media/Users/employee.xlsx')
+            self.hashed_password = make_password("root")
+            self.manifest = CredentialManifest('faculty') if kwargs.get('random_passwords') else None
+            created, _ = self.run_import(file_path, kwargs)
+            logger.info(f"{created} Faculty records (and users) created successfully.")
+            if self.manifest and self.manifest.path:
+                logger.warning(f"Initial passwords written to {self.manifest.path}")
         except Exception as e:
             logger.error(f"Failed during processing: {e}")
+
+    def import_chunk(self, df, options):
+        faculty_rows = self.prepare(df)
+        if self.manifest:
+            passwords = self.manifest.provision(faculty_rows["username"])
+        else:
+            passwords = [self.hashed_password] * len(faculty_rows)
+        users_to_create = [
+            User(username=username, password=password, email=username, first_name=name.split()[0] if name else '')
+            for username, name, password in zip(faculty_rows["username"], faculty_rows["name"], passwords)
+        ]
+        faculties_to_create = [
+            Faculty(
+                user=user,
+                name=row.name,
+                email=row.username,
+                phone_number=row.phone_number,
+                date_of_birth=row.date_of_birth,
+                department=row.department,
+                university="NIT-Sri",
+                designation=row.designation,
+                type_of_employee=row.type_of_employee,
+                nature_of_employment=row.nature_of_employment,
+            )
+            for user, row in zip(users_to_create, faculty_rows.itertuples(index=False))
+        ]
+        # run_import wraps each chunk in a transaction
+        batch_size = options.get('batch_size')
+        User.objects.bulk_create(users_to_create, batch_size=batch_size)
+        Faculty.objects.bulk_create(faculties_to_create, batch_size=batch_size)
+        Roles.objects.bulk_create([Roles(faculty=faculty, role='FAC') for faculty in faculties_to_create], batch_size=batch_size)
+        return len(faculties_to_create), 0
+
+    def prepare(self, df):
+        """Builds every row column-wise; an invalid email or any duplicate aborts the import."""
+        out = pd.DataFrame({
+            "name": clean_text(column(df, "Name")),
+            "username": clean_text(column(df, "Official Email")).str.lower(),
+            "phone_number": clean_text(column(df, "Mobile Number")),
+            "date_of_birth": parse_dates(column(df, "Date of Birth")),
+            "department": column(df, "Organization Unit").astype(object).where(column(df, "Organization Unit").notna(), None),
+            "designation": clean_text(column(df, "Post")).replace('', "OTHERS"),
+            "type_of_employee": clean_text(column(df, "Type of Employee")).replace('', "Teaching"),
+            "nature_of_employment": clean_text(column(df, "Nature of Employment")).replace('', "Permanent"),
+        })
+
+        invalid = ~out["username"].str.contains("@", regex=False)
+        if invalid.any():
+            index = invalid.idxmax()
+            raise ValueError(f"Invalid email for {out.at[index, 'name']}: {column(df, 'Official Email')[index]}")
+
+        duplicate = out["username"].duplicated()
+        if duplicate.any():
+            raise ValueError(f"Duplicate email/username detected: {out.loc[duplicate.idxmax(), 'username']}")
+
+        existing = out["username"].isin(existing_usernames(out["username"]))
+        if existing.any():
+            raise ValueError(f"User already exists: {out.loc[existing.idxmax(), 'username']}")
+        return out
@@ -1,93 +1,134 @@
 import pandas as pd
 from django.core.management.base import BaseCommand
-from django.utils import timezone
-from django.db import transaction
 from django.contrib.auth.models import User
 from django.contrib.auth.hashers import make_password
-from Users.models import Faculty, Student
+from Users.importers import (
+    RATE_FIELDS, ChunkedImportMixin, clean_text, existing_usernames, load_faculty_index, parse_dates, recategorize,
+    reprice_scholars, resolve_faculty, sync_plan, upsert, write_diff,
+)
+from Users.models import Student
+from Users.provisioning import CredentialManifest
 import os
 import logging
 
 logger = logging.getLogger(__name__)
 
-class Command(BaseCommand):
+# columns --sync compares and updates; pay rates are only recomputed when a category changes,
+# so manual changes survive otherwise
+SYNC_FIELDS = (
+    'name', 'registration', 'department', 'gender', 'joining_date', 'supervisor_id', 'co_supervisor_id',
+    'admission_category', 'type_of_work',
+)
+
+class Command(ChunkedImportMixin, BaseCommand):
     help = 'Import students from Excel file into Student model'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows per INSERT statement')
+        parser.add_argument('--sync', action='store_true', help='Insert new scholars and update changed ones, matched on enrolment number')
+        parser.add_argument('--dry-run', action='store_true', help='With --sync, print the diff without writing anything')
+        parser.add_argument('--random-passwords', action='store_true', help='Give each new account a random password and write them to a one-time manifest')
+        self.add_chunk_arguments(parser)
+
     def handle(self, *args, **kwargs):
         try:
             BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
-            file_path = os.path.join(BASE_DIR, 'media/Users/scholar.xlsx')
-            df = pd.read_excel(file_path)
-
-            df["Supervisor"] = df["Supervisor"].astype(str).str.replace("Prof ", "", regex=False).str.strip()
-            df["Co-supervisor"] = df["Co-supervisor"].astype(str).str.replace("Prof ", "", regex=False).str.strip()
-            df.columns = df.columns.str.strip()
-
-            users_to_create = []
-            students_to_create = []
-            usernames_seen = set()
-            hashed_password=make_password("root")
-            for _, row in df.iterrows():
-
-                name = row.get("Student's Name", '').strip()
-                registration = str(row.get("Registration No", '')).strip()
-                enrollment = str(row.get("Enrolment No", '')).strip()
-                department = str(row.get("Department", '')).strip()
-                gender = str(row.get("Gender", '')).strip().upper()
-                batch = row.get("Batch", '')
-                joining_date_raw = pd.to_datetime(row.get("Date of Joining", timezone.now())).date()
-                joining_date_parsed = pd.to_datetime(joining_date_raw, errors='coerce')
-                joining_date = joining_date_parsed.date() if pd.notna(joining_date_parsed) else pd.to_datetime("1970-01-01").date()
-                admission_category = str(row.get("Admission Category", '')).strip()
-                work_type = str(row.get("Full Time/Part Time", '')).strip().title()
-                supervisor_name = str(row.get("Supervisor", '')).strip()
-                co_supervisor_name = str(row.get("Co-supervisor", '')).strip()
+            file_path = kwargs.get('file') or os.path.join(BASE_DIR, 'media/Users/scholar.xlsx')
+            self.faculty = load_faculty_index()
+            self.hashed_password = make_password("root")
+            self.manifest = CredentialManifest('scholars') if kwargs.get('random_passwords') else None
+            created, updated = self.run_import(file_path, kwargs)
+            self.stdout.write(self.style.SUCCESS(f"Successfully imported {created} students and updated {updated}."))
+            if self.manifest and self.manifest.path:
+                self.stdout.write(self.style.WARNING(f"Initial passwords written to {self.manifest.path}"))
 
-                username = enrollment.lower()
+        except Exception as e:
+            logger.error(f"Import failed: {e}")
 
-                if not name or not registration or not enrollment:
-                    raise ValueError(f"Missing essential fields in row: {row.to_dict()}")
+    def import_chunk(self, df, options):
+        sync = options.get('sync') or options.get('dry_run')
+        students = self.prepare(df, sync=sync)
+        updates, recategorized = [], set()
+        if sync:
+            students, updates, diff = sync_plan(Student, students, 'enroll', SYNC_FIELDS)
+            recategorized = recategorize(updates, diff, 'enroll')
+            taken = students["username"].isin(existing_usernames(students["username"]))
+            if taken.any():
+                raise ValueError(f"Duplicate username/email: {students.loc[taken.idxmax(), 'username']}")
+            self.stdout.write(f"{len(students)} new and {len(updates)} changed students.")
+            if options.get('dry_run'):
+                write_diff(self.stdout, students["enroll"], diff)
+                return 0, 0
 
-                if username in usernames_seen or User.objects.filter(username=username).exists():
-                    raise ValueError(f"Duplicate username/email: {username}")
-                usernames_seen.add(username)
+        if self.manifest:
+            passwords = self.manifest.provision(students["username"])
+        else:
+            passwords = [self.hashed_password] * len(students)
+        users_to_create = [
+            User(username=username, email=f"{username}@example.com", password=password, first_name=name.split()[0])
+            for username, name, password in zip(students["username"], students["name"], passwords)
+        ]
+        students_to_create = [
+            Student(
+                user=user,
+                name=row.name,
+                registration=row.registration,
+                enroll=row.enroll,
+                department=row.department,
+                gender=row.gender,
+                course="PhD",
+                university="NIT-Sri",
+                joining_date=row.joining_date,
+                supervisor_id=row.supervisor_id,
+                co_supervisor_id=row.co_supervisor_id,
+                admission_category=row.admission_category,
+                type_of_work=row.type_of_work,
+                scholarship_basic=row.scholarship_basic,
+                scholarship_hra=row.scholarship_hra,
+            )
+            for user, row in zip(users_to_create, students.itertuples(index=False))
+        ]
 
-                user = User(username=username, email=f"{username}@example.com",password=hashed_password, first_name=name.split()[0])
-                users_to_create.append(user)
+        # Second stage: save only if the whole chunk prepared cleanly; run_import wraps it in a transaction
+        batch_size = options.get('batch_size')
+        User.objects.bulk_create(users_to_create, batch_size=batch_size)
+        Student.objects.bulk_create(students_to_create, batch_size=batch_size)
+        updated = upsert(Student, updates, 'enroll', SYNC_FIELDS + RATE_FIELDS, batch_size=batch_size)
+        if recategorized:
+            # the upsert sends no post_save, so the scholarships are repriced here
+            reprice_scholars(Student.objects.filter(enroll__in=recategorized))
+        return len(students_to_create), updated
 
-                supervisor = Faculty.objects.filter(name__iexact=supervisor_name).first() if supervisor_name else None
-                if supervisor_name and not supervisor:
-                    surname = supervisor_name.strip().split()[-1]
-                    fallback_supervisor = Faculty.objects.filter(name__icontains=surname, department__iexact=department).first()
-                    if fallback_supervisor:
-                        supervisor = fallback_supervisor
+    def prepare(self, df, sync=False):
+        """Builds every row column-wise; any missing field or duplicate aborts the whole import."""
+        out = pd.DataFrame({
+            "name": clean_text(df["Student's Name"]),
+            "registration": clean_text(df["Registration No"]),
+            "enroll": clean_text(df["Enrolment No"]),
+            "department": clean_text(df["Department"]).str.upper(),
+            "gender": clean_text(df["Gender"]).str.upper(),
+            "joining_date": parse_dates(df["Date of Joining"]),
+            "admission_category": clean_text(df["Admission Category"]),
+            "type_of_work": clean_text(df["Full Time/Part Time"]).str.title(),
+        })
+        out["username"] = out["enroll"].str.lower()
 
-                co_supervisor = Faculty.objects.filter(name__iexact=co_supervisor_name).first() if co_supervisor_name else None
+        missing = (out["name"] == '') | (out["registration"] == '') | (out["enroll"] == '')
+        if missing.any():
+            raise ValueError(f"Missing essential fields in row: {df.loc[missing.idxmax()].to_dict()}")
 
-                student = Student(
-                    name=name,
-                    registration=registration,
-                    enroll=enrollment,
-                    department=department.upper(),
-                    gender=gender,
-                    course="PhD",
-                    university="NIT-Sri",
-                    joining_date=joining_date,
-                    supervisor=supervisor,
-                    co_supervisor=co_supervisor,
-                    admission_category=admission_category,
-                    type_of_work=work_type,
-                )
-                students_to_create.append(student)
-                print(f"{name} added:")
-            # Second stage: Save to DB only if all above succeeded
-            
-            with transaction.atomic():
-                User.objects.bulk_create(users_to_create)
-                for student, user in zip(students_to_create, users_to_create):
-                    student.user = user
-                Student.objects.bulk_create(students_to_create)
+        duplicate = out["username"].duplicated()
+        if not sync:
+            duplicate |= out["username"].isin(existing_usernames(out["username"]))
+        if duplicate.any():
+            raise ValueError(f"Duplicate username/email: {out.loc[duplicate.idxmax(), 'username']}")
 
+        out["supervisor_id"] = resolve_faculty(df["Supervisor"], out["department"], self.faculty)
+        out["co_supervisor_id"] = resolve_faculty(df["Co-supervisor"], out["department"], self.faculty, fallback=False)
 
-        except Exception as e:
-            logger.error(f"Import failed: {e}")
+        # same rates Student.save would apply (rf_category defaults to JRF); bulk_create bypasses save()
+        fellowship = out["admission_category"] == "INST_FEL"
+        out["scholarship_basic"] = Student._meta.get_field('scholarship_basic').default
+        out["scholarship_hra"] = Student._meta.get_field('scholarship_hra').default
+        out.loc[~fellowship, ["scholarship_basic", "scholarship_hra"]] = 0
+        return out
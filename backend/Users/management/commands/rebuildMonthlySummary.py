@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from Scholarship.reports import refresh_monthly_summary
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Recompute ScholarshipMonthlySummary from Scholarship (all months, or one year/month)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, help='Only rebuild this year')
+        parser.add_argument('--month', type=int, help='Only rebuild this month (requires --year)')
+
+    def handle(self, *args, **kwargs):
+        year, month = kwargs.get('year'), kwargs.get('month')
+        if month and not year:
+            self.stdout.write(self.style.ERROR("--month requires --year"))
+            return
+        started = time.perf_counter()
+        if year:
+            months = [month] if month else range(1, 13)
+            written = refresh_monthly_summary([(year, m, None) for m in months])
+        else:
+            written = refresh_monthly_summary()
+        elapsed = time.perf_counter() - started
+        logger.info(f"Rebuilt {written} monthly summary rows in {elapsed:.2f}s")
+        self.stdout.write(self.style.SUCCESS(f"Summary rows written: {written}, Time: {elapsed:.2f}s"))
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+
+from Scholarship.models import Scholarship
+from Scholarship.reports import invalidate_payroll, refresh_monthly_summary
+from Users.caching import stale_cache_warning
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = "Recompute scholarship pay from the scholars' current basic/HRA in one UPDATE"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, help='Only reprice this year')
+        parser.add_argument('--month', type=int, help='Only reprice this month')
+        parser.add_argument('--scholar', type=int, help='Only reprice this scholar')
+        parser.add_argument(
+            '--released',
+            action='store_true',
+            help='Also reprice released scholarships still pending approval (approved ones are never touched)',
+        )
+
+    def handle(self, *args, **kwargs):
+        started = time.perf_counter()
+        scholarships = Scholarship.objects.filter(status="2")
+        if not kwargs.get('released'):
+            scholarships = scholarships.filter(release=False)
+        for name in ('year', 'month'):
+            if kwargs.get(name):
+                scholarships = scholarships.filter(**{name: kwargs[name]})
+        if kwargs.get('scholar'):
+            scholarships = scholarships.filter(scholar_id=kwargs['scholar'])
+        updated = scholarships.reprice()
+        # update() sends no signals; the servers only see this through a shared cache
+        invalidate_payroll()
+        refresh_monthly_summary(set(scholarships.values_list('year', 'month', 'scholar__department')))
+        elapsed = time.perf_counter() - started
+        logger.info(f"Repriced {updated} scholarships in {elapsed:.2f}s")
+        self.stdout.write(self.style.SUCCESS(f"Scholarships repriced: {updated}, Time: {elapsed:.2f}s"))
+        warning = stale_cache_warning('payroll reports', 'PAYROLL_CACHE_TTL') if updated else None
+        if warning:
+            self.stderr.write(self.style.WARNING(warning))
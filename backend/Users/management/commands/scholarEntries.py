@@ -1,169 +1,178 @@
 import os
-import json
 import logging
 import pandas as pd
 import re
 
 from django.core.management.base import BaseCommand
-from django.utils import timezone
-from django.db import transaction
-from django.contrib.auth.hashers import make_password
 from django.contrib.auth import get_user_model
 
-from Users.models import Faculty, Student
+from Users.config import get_config
+from Users.importers import (
+    RATE_FIELDS, ChunkedImportMixin, clean_text, existing_usernames, fellowship_rates, hash_passwords,
+    load_faculty_index, map_labels, parse_dates, recategorize, reprice_scholars, resolve_faculty, sync_plan, upsert,
+    write_diff,
+)
+from Users.models import Student
+from Users.provisioning import CredentialManifest
 
 logger = logging.getLogger(__name__)
 
 # Load configuration
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
-CONFIG_PATH = os.path.join(BASE_DIR, 'conf.json')
-
-with open(CONFIG_PATH, 'r') as file:
-    config = json.load(file)
+config = get_config()
 
 # Mappings
-college_data = config.get('college', {})
-toe_map = config.get('type_of_employee', {})
-tow_map = config.get('type_of_work', {})
-designation_map = config.get('designation', {})
-noe_map = config.get('nature_of_employment', {})
-ac_map = config.get('admission_category', {})
-gender_map = config.get('gender', {})
-rc_map = config.get('research_category', {})
-
-departments_map = college_data.get('departments', {})
-roles_map = college_data.get('roles', {})
-universities_map = college_data.get('university', {})
-
-
-def reverse_lookup(mapping: dict, value: str):
-    value = str(value).strip().lower()
-    return next((k for k, v in mapping.items() if v.strip().lower() == value), None)
-
-
-class Command(BaseCommand):
+toe_map = config.sections['type_of_employee']
+tow_map = config.sections['type_of_work']
+designation_map = config.sections['designation']
+noe_map = config.sections['nature_of_employment']
+ac_map = config.sections['admission_category']
+gender_map = config.sections['gender']
+rc_map = config.sections['research_category']
+
+departments_map = config.college['departments']
+roles_map = config.college['roles']
+universities_map = config.college['university']
+
+# columns --sync compares and updates; pay rates are only recomputed when a category changes,
+# so manual changes survive otherwise
+SYNC_FIELDS = (
+    'name', 'registration', 'rf_category', 'department', 'gender', 'joining_date', 'supervisor_id',
+    'co_supervisor_id', 'admission_category', 'type_of_work', 'email', 'phone_number',
+)
+
+
+class Command(ChunkedImportMixin, BaseCommand):
     help = 'Import students from Excel file into the Student model'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows per INSERT statement')
+        parser.add_argument('--workers', type=int, default=None, help='Threads used for password hashing (default: CPU count)')
+        parser.add_argument('--sync', action='store_true', help='Insert new scholars and update changed ones, matched on enrolment number')
+        parser.add_argument('--dry-run', action='store_true', help='With --sync, print the diff without writing anything')
+        parser.add_argument('--random-passwords', action='store_true', help='Give each new account a random password and write them to a one-time manifest')
+        self.add_chunk_arguments(parser)
+
     def handle(self, *args, **kwargs):
-        User = get_user_model()
         try:
-            file_path = os.path.join(BASE_DIR, 'scripts', 'scholar.xlsx')
+            file_path = kwargs.get('file') or os.path.join(BASE_DIR, 'scripts', 'scholar.xlsx')
             if not os.path.exists(file_path):
                 self.stdout.write(self.style.ERROR(f"Excel file not found at {file_path}"))
                 return
 
-            df = pd.read_excel(file_path)
-            df.columns = df.columns.str.strip()
-            df["Supervisor"] = df["Supervisor"].astype(str).str.replace("Prof ", "", regex=False).str.strip()
-            df["Co-supervisor"] = df["Co-supervisor"].astype(str).str.replace("Prof ", "", regex=False).str.strip()
-
-            duplicates = df[df.duplicated(subset=["Registration No"], keep=False)]
-            if not duplicates.empty:
-                self.stdout.write(self.style.WARNING("Duplicate registration numbers found in the Excel file:"))
-                self.stdout.write(str(duplicates[["Registration No", "Name of the Research Scholar"]]))
-
-            users_to_create = []
-            students_to_create = []
-            usernames_seen = set()
-            
-
-            for index, row in df.iterrows():
-                try:
-                    name = str(row.get("Name of the Research Scholar", '')).strip()
-                    registration = str(row.get("Registration No", '')).strip()
-                    enrollment = str(row.get("Enrolment No.", '')).strip()
-                    rf_category = str(row.get("JRF/SRF", '')).strip()
-                    email = f"{enrollment.lower()}@example.com"
-                    username = enrollment.lower()
-                    hashed_password = make_password(username)
-
-                    if not name or not registration or not enrollment:
-                        self.stdout.write(self.style.WARNING(f"Skipping row {index} due to missing essential data."))
-                        continue
-
-                    if username in usernames_seen or User.objects.filter(username=username).exists():
-                        self.stdout.write(self.style.WARNING(f"Duplicate username/email detected: {username}"))
-                        continue
-
-                    usernames_seen.add(username)
-
-                    department = reverse_lookup(departments_map, row.get("Department", '')) or "UNKNOWN"
-                    gender = reverse_lookup(gender_map, row.get("Gender", '')) or "U"
-                    admission_category = reverse_lookup(ac_map, row.get("Admission Category", '')) or "OTH"
-                    work_type = reverse_lookup(tow_map, row.get("Full Time/Part Time", '')) or "Unknown"
-
-                    joining_date_raw = pd.to_datetime(row.get("Date of Joining", timezone.now()), errors='coerce')
-                    if pd.isna(joining_date_raw):
-                        logger.warning(f"Invalid joining date for {name} at row {index}. Defaulting to 1970-01-01.")
-                        joining_date = pd.to_datetime("1970-01-01").date()
-                    else:
-                        joining_date = joining_date_raw.date()
-
-                    supervisor_name = str(row.get("Supervisor", '')).strip()
-                    co_supervisor_name = str(row.get("Co-supervisor", '')).strip()
-                    mobile = str(row.get("Contact Number", '')).strip()
-                    mail = str(row.get("Mail ID", '')).strip()
-                    mail = re.sub(r'\s+', ' ', mail)
-
-                    # Match Supervisor
-                    supervisor = Faculty.objects.filter(name__iexact=supervisor_name).first()
-                    if not supervisor and supervisor_name:
-                        surname = supervisor_name.split()[-1]
-                        supervisor = Faculty.objects.filter(name__icontains=surname, department__iexact=department).first()
-
-                    # Match Co-supervisor
-                    co_supervisor = None
-                    if co_supervisor_name and co_supervisor_name.lower() != "nan":
-                        co_supervisor = Faculty.objects.filter(name__iexact=co_supervisor_name).first()
-                        if not co_supervisor:
-                            co_surname = co_supervisor_name.split()[-1]
-                            co_supervisor = Faculty.objects.filter(name__icontains=co_surname, department__iexact=department).first()
-
-                    user = User(
-                        username=username,
-                        email=email,
-                        password=hashed_password,
-                        first_name=name.split()[0]
-                    )
-                    student = Student(
-                        user=user,
-                        name=name,
-                        registration=registration,
-                        enroll=enrollment,
-                        rf_category=rf_category,
-                        department=department.upper(),
-                        gender=gender.upper(),
-                        course="PhD",
-                        university="NIT-Sri",
-                        joining_date=joining_date,
-                        supervisor=supervisor,
-                        co_supervisor=co_supervisor,
-                        admission_category=admission_category,
-                        type_of_work=work_type,
-                        email=mail,
-                        phone_number=mobile
-                    )
-
-                    users_to_create.append(user)
-                    students_to_create.append(student)
-
-                except Exception as row_error:
-                    self.stdout.write(self.style.ERROR(f"Error processing row {index}: {row_error}"))
-                    logger.exception(f"Row {index} error: {row.to_dict()}")
-
-            # Save all users and students atomically
-            with transaction.atomic():
-                User.objects.bulk_create(users_to_create)
-                for student, user in zip(students_to_create, users_to_create):
-                    student.user = user
-                for student in students_to_create:
-                    if student.admission_category != "INST_FEL":
-                        student.scholarship_basic = 0
-                        student.scholarship_hra = 0
-                Student.objects.bulk_create(students_to_create)
-
-            self.stdout.write(self.style.SUCCESS(f"Successfully imported {len(students_to_create)} students."))
+            self.faculty = load_faculty_index()
+            self.manifest = CredentialManifest('scholars') if kwargs.get('random_passwords') else None
+            created, updated = self.run_import(file_path, kwargs)
+            self.stdout.write(self.style.SUCCESS(f"Successfully imported {created} students and updated {updated}."))
+            if self.manifest and self.manifest.path:
+                self.stdout.write(self.style.WARNING(f"Initial passwords written to {self.manifest.path}"))
 
         except Exception as e:
             self.stdout.write(self.style.ERROR(f"Import failed: {e}"))
             logger.exception("Failed during student import")
+
+    def import_chunk(self, df, options):
+        User = get_user_model()
+        duplicates = df[df.duplicated(subset=["Registration No"], keep=False)]
+        if not duplicates.empty:
+            self.stdout.write(self.style.WARNING("Duplicate registration numbers found in the Excel file:"))
+            self.stdout.write(str(duplicates[["Registration No", "Name of the Research Scholar"]]))
+
+        sync = options.get('sync') or options.get('dry_run')
+        students = self.prepare(df, sync=sync)
+        updates, recategorized = [], set()
+        if sync:
+            students, updates, diff = sync_plan(Student, students, 'enroll', SYNC_FIELDS)
+            recategorized = recategorize(updates, diff, 'enroll')
+            taken = students["username"].isin(existing_usernames(students["username"]))
+            for username in students.loc[taken, "username"]:
+                self.stdout.write(self.style.WARNING(f"Duplicate username/email detected: {username}"))
+            students = students[~taken]
+            self.stdout.write(f"{len(students)} new and {len(updates)} changed students.")
+            if options.get('dry_run'):
+                write_diff(self.stdout, students["enroll"], diff)
+                return 0, 0
+        if students.empty and not updates:
+            self.stdout.write(self.style.WARNING("No valid students to import."))
+            return 0, 0
+
+        if self.manifest:
+            passwords = self.manifest.provision(students["username"], workers=options.get('workers'))
+        else:
+            passwords = hash_passwords(students["username"], workers=options.get('workers'))
+        users_to_create = [
+            User(username=username, email=f"{username}@example.com",
+                 password=password, first_name=name.split()[0])
+            for username, name, password in zip(students["username"], students["name"], passwords)
+        ]
+        students_to_create = [
+            Student(
+                user=user,
+                name=row.name,
+                registration=row.registration,
+                enroll=row.enroll,
+                rf_category=row.rf_category,
+                department=row.department,
+                gender=row.gender,
+                course="PhD",
+                university="NIT-Sri",
+                joining_date=row.joining_date,
+                supervisor_id=row.supervisor_id,
+                co_supervisor_id=row.co_supervisor_id,
+                admission_category=row.admission_category,
+                type_of_work=row.type_of_work,
+                email=row.email,
+                phone_number=row.phone_number,
+                scholarship_basic=row.scholarship_basic,
+                scholarship_hra=row.scholarship_hra,
+            )
+            for user, row in zip(users_to_create, students.itertuples(index=False))
+        ]
+
+        # run_import wraps each chunk in a transaction
+        batch_size = options.get('batch_size')
+        User.objects.bulk_create(users_to_create, batch_size=batch_size)
+        Student.objects.bulk_create(students_to_create, batch_size=batch_size)
+        updated = upsert(Student, updates, 'enroll', SYNC_FIELDS + RATE_FIELDS, batch_size=batch_size)
+        if recategorized:
+            # the upsert sends no post_save, so the scholarships are repriced here
+            reprice_scholars(Student.objects.filter(enroll__in=recategorized))
+        return len(students_to_create), updated
+
+    def prepare(self, df, sync=False):
+        """Validates and maps the sheet column by column; returns the rows to insert (or sync)."""
+        out = pd.DataFrame({
+            "name": clean_text(df["Name of the Research Scholar"]),
+            "registration": clean_text(df["Registration No"]),
+            "enroll": clean_text(df["Enrolment No."]),
+            "rf_category": clean_text(df["JRF/SRF"]).replace('', Student._meta.get_field('rf_category').default),
+            "department": map_labels(df["Department"], departments_map).fillna("UNKNOWN").str.upper(),
+            "gender": map_labels(df["Gender"], gender_map).fillna("U").str.upper(),
+            "admission_category": map_labels(df["Admission Category"], ac_map).fillna("OTH"),
+            "type_of_work": map_labels(df["Full Time/Part Time"], tow_map).fillna("Unknown"),
+            "joining_date": parse_dates(df["Date of Joining"]),
+            "phone_number": clean_text(df["Contact Number"]),
+            "email": clean_text(df["Mail ID"]).map(lambda mail: re.sub(r'\s+', ' ', mail)),
+        })
+        out["username"] = out["enroll"].str.lower()
+
+        missing = (out["name"] == '') | (out["registration"] == '') | (out["enroll"] == '')
+        for index in out.index[missing]:
+            self.stdout.write(self.style.WARNING(f"Skipping row {index} due to missing essential data."))
+        bad_dates = pd.to_datetime(df["Date of Joining"], errors='coerce').isna() & ~missing
+        for index in out.index[bad_dates]:
+            logger.warning(f"Invalid joining date for {out.at[index, 'name']} at row {index}. Defaulting to 1970-01-01.")
+
+        # in sync mode existing accounts are matched by sync_plan instead of skipped
+        existing = set() if sync else existing_usernames(out.loc[~missing, "username"])
+        duplicate = ~missing & (out["username"].isin(existing) | out["username"].where(~missing).duplicated(keep='first'))
+        for username in out.loc[duplicate, "username"]:
+            self.stdout.write(self.style.WARNING(f"Duplicate username/email detected: {username}"))
+
+        out["supervisor_id"] = resolve_faculty(df["Supervisor"], out["department"], self.faculty)
+        out["co_supervisor_id"] = resolve_faculty(df["Co-supervisor"], out["department"], self.faculty)
+
+        # same rates Student.save would apply; bulk_create bypasses save()
+        out[list(RATE_FIELDS)] = fellowship_rates(out)
+
+        return out[~missing & ~duplicate]
@@ -1,54 +1,21 @@
 from django.db import models
+from django.db.models.functions import Upper
 from django.contrib.auth.models import User
 from django.utils import timezone
 from django.core.exceptions import ValidationError
-import json
-import os
-
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-DEPARTMENT_JSON_PATH = os.path.join(BASE_DIR, 'conf.json')
-
-try:
-    with open(DEPARTMENT_JSON_PATH, 'r') as file:
-        config = json.load(file)
-
-    college_data = config.get('college', {})
-    toe = config.get('type_of_employee', {})
-    tow = config.get('type_of_work', {})
-    designation = config.get('designation', {})
-    noe = config.get('nature_of_employment', {})
-    ac = config.get('admission_category', {})
-    gender = config.get('gender', {})
-    rc = config.get('research_category', {})
-
-    departments = college_data.get('departments', {})
-    roles = college_data.get('roles', {})
-    universities = college_data.get('university', {})
-
-    DEPARTMENT_CHOICES = [(key, value) for key, value in departments.items()]
-    TOE = [(key, value) for key, value in toe.items()]
-    TOW = [(key, value) for key, value in tow.items()]
-    NOE = [(key, value) for key, value in noe.items()]
-    RC = [(key, value) for key, value in rc.items()]
-    GENDER = [(key, value) for key, value in gender.items()]
-    DESIGNATION = [(key, value) for key, value in designation.items()]
-    ROLES = [(key, value) for key, value in roles.items()]
-    UNIVERSITIES = [(key, value) for key, value in universities.items()]
-    AC = [(key, value) for key, value in ac.items()]
-
-except Exception as e:
-    print(f"Error loading: {e}")
-    DEPARTMENT_CHOICES = []
-    ROLES = []
-    TOE = []
-    RC = []
-    TOW = []
-    AC = []
-    NOE = []
-    DESIGNATION = []
-    UNIVERSITIES = []
-    GENDER = []
+from .config import get_config
 
+config = get_config()
+DEPARTMENT_CHOICES = config.DEPARTMENT_CHOICES
+TOE = config.TOE
+TOW = config.TOW
+NOE = config.NOE
+RC = config.RC
+GENDER = config.GENDER
+DESIGNATION = config.DESIGNATION
+ROLES = config.ROLES
+UNIVERSITIES = config.UNIVERSITIES
+AC = config.AC
 
 
 class Faculty(models.Model):
@@ -97,6 +64,15 @@ class Student(models.Model):
     type_of_work=models.CharField(max_length=255,choices=TOW,default="FT")
     rf_category=models.CharField(max_length=31,choices=RC,default="JRF")
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['department'], name='student_department_idx'),
+            models.Index(fields=['university'], name='student_university_idx'),
+            # department__iexact / university__iexact filters compare UPPER(column)
+            models.Index(Upper('department'), name='student_department_upper_idx'),
+            models.Index(Upper('university'), name='student_university_upper_idx'),
+        ]
+
     def save(self, *args, **kwargs):
         if self.admission_category != "INST_FEL":
             self.scholarship_basic = 0
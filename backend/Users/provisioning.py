@@ -0,0 +1,60 @@
+"""
+Initial credentials for bulk-created accounts: a fresh random password per
+user, hashed across a thread pool, handed out once through a manifest.
+"""
+import csv
+import os
+import secrets
+import string
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.crypto import get_random_string
+
+from .importers import hash_passwords
+
+# no look-alike characters (0/O, 1/l/I) so printed manifests can be typed back
+PASSWORD_ALPHABET = ''.join(c for c in string.ascii_letters + string.digits if c not in '0O1lI')
+
+
+def generate_password(length=None):
+    return get_random_string(length or getattr(settings, 'INITIAL_PASSWORD_LENGTH', 12), PASSWORD_ALPHABET)
+
+
+def provision_passwords(count, workers=None):
+    """Returns ``(raw, hashed)``: ``count`` new random passwords and their hashes, in the same order."""
+    raw = [generate_password() for _ in range(count)]
+    return raw, hash_passwords(raw, workers=workers)
+
+
+class CredentialManifest:
+    """
+    A username,password CSV under CREDENTIAL_MANIFEST_DIR, created on first
+    use with owner-only permissions and never overwritten. Rows are written
+    when the surrounding transaction commits, so the file only lists accounts
+    that exist.
+    """
+
+    def __init__(self, label):
+        self.label = label
+        self.path = None
+
+    def provision(self, usernames, workers=None):
+        """Random passwords for ``usernames``; returns the hashes to store."""
+        usernames = list(usernames)
+        raw, hashed = provision_passwords(len(usernames), workers=workers)
+        transaction.on_commit(lambda: self.write(zip(usernames, raw)))
+        return hashed
+
+    def write(self, credentials):
+        if self.path is None:
+            directory = settings.CREDENTIAL_MANIFEST_DIR
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+            name = f"{self.label}-{timezone.now():%Y%m%d-%H%M%S}-{secrets.token_hex(4)}.csv"
+            path = os.path.join(directory, name)
+            with os.fdopen(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600), 'w', newline='') as f:
+                csv.writer(f).writerow(['username', 'password'])
+            self.path = path
+        with open(self.path, 'a', newline='') as f:
+            csv.writer(f).writerows(credentials)
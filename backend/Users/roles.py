@@ -0,0 +1,153 @@
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .config import get_config
+from .models import Faculty, Roles
+
+CACHE_PREFIX = 'roles:faculty:'
+VERSION_PREFIX = 'roles:version:'
+DIRECTORY_KEY = 'roles:directory'
+DIRECTORY_VERSION_KEY = 'roles:directory:version'
+
+
+def _cache_key(faculty_id):
+    return f"{CACHE_PREFIX}{faculty_id}"
+
+
+def get_faculty_roles(faculty_id, request=None):
+    """
+    Returns the frozenset of role codes held by a faculty member.
+
+    Lookups are memoized on the request (if given) and in the Django cache for
+    ROLE_CACHE_TTL seconds; Roles saves and deletes drop the cached entry.
+    """
+    try:
+        faculty_id = int(faculty_id)
+    except (TypeError, ValueError):
+        return frozenset()
+    memo = None
+    if request is not None:
+        memo = getattr(request, '_faculty_roles', None)
+        if memo is None:
+            memo = {}
+            request._faculty_roles = memo
+        if faculty_id in memo:
+            return memo[faculty_id]
+    key = _cache_key(faculty_id)
+    roles = cache.get(key)
+    if roles is None:
+        roles = frozenset(Roles.objects.filter(faculty_id=faculty_id).values_list('role', flat=True))
+        cache.set(key, roles, getattr(settings, 'ROLE_CACHE_TTL', 300))
+    if memo is not None:
+        memo[faculty_id] = roles
+    return roles
+
+
+def ordered_roles(roles):
+    # conf.json order, so FAC comes first for clients that default to roles[0]
+    order = [code for code, _ in get_config().ROLES]
+    return sorted(roles, key=lambda role: (order.index(role) if role in order else len(order), role))
+
+
+def current_role_version(faculty_id):
+    # None when unknown (expired, evicted or never issued); callers must treat that as stale
+    return cache.get(f"{VERSION_PREFIX}{faculty_id}")
+
+
+def issue_role_version(faculty_id):
+    """
+    Returns the version stamped into new tokens, creating one if needed.
+
+    Versions expire after ROLE_CACHE_TTL like the cached role sets, so a
+    token's roles claim is trusted for at most that long even when the
+    revocation bumped the version in another process's cache.
+    """
+    key = f"{VERSION_PREFIX}{faculty_id}"
+    cache.add(key, time.time_ns(), getattr(settings, 'ROLE_CACHE_TTL', 300))
+    return cache.get(key)
+
+
+def invalidate_faculty_roles(faculty_id):
+    cache.delete(_cache_key(faculty_id))
+    # tokens carrying the old version fall back to a database lookup
+    cache.set(f"{VERSION_PREFIX}{faculty_id}", time.time_ns(), getattr(settings, 'ROLE_CACHE_TTL', 300))
+
+
+RoleHolder = namedtuple('RoleHolder', 'id name department university src')
+
+
+# (version, built_at, directory) for this process; swapped as a whole so readers need no lock
+_local_directory = (None, 0.0, None)
+
+
+def _directory_version():
+    version = cache.get(DIRECTORY_VERSION_KEY)
+    if version is None:
+        cache.add(DIRECTORY_VERSION_KEY, time.time_ns(), None)
+        version = cache.get(DIRECTORY_VERSION_KEY)
+    return version
+
+
+def _build_directory():
+    storage = Faculty._meta.get_field('profile_pic').storage
+    directory = {}
+    rows = Roles.objects.order_by('faculty_id', 'id').values_list(
+        'role', 'faculty_id', 'faculty__name', 'faculty__department', 'faculty__university', 'faculty__profile_pic',
+    )
+    for role, faculty_id, name, department, university, profile_pic in rows:
+        src = storage.url(profile_pic) if profile_pic else None
+        directory.setdefault(role, []).append(RoleHolder(faculty_id, name, department, university, src))
+    return directory
+
+
+def role_directory():
+    """
+    Every role holder, as {role: [RoleHolder, ...]} with the lowest faculty id first.
+
+    Served from an in-process copy while the version stored in the Django
+    cache is unchanged; a cold process reuses the copy kept in the cache
+    (shared when CACHES points at Redis/Memcached) before falling back to a
+    single query. Roles and Faculty saves bump the version. Copies are also
+    rebuilt after ROLE_CACHE_TTL, which covers bulk writes that send no
+    signals.
+    """
+    global _local_directory
+    ttl = getattr(settings, 'ROLE_CACHE_TTL', 300)
+    version = _directory_version()
+    local_version, built_at, directory = _local_directory
+    if local_version == version and time.monotonic() - built_at < ttl:
+        return directory
+    shared = cache.get(DIRECTORY_KEY) if getattr(settings, 'ROLE_DIRECTORY_SHARED', True) else None
+    if shared is not None and shared[0] == version:
+        directory = shared[1]
+    else:
+        directory = _build_directory()
+        if getattr(settings, 'ROLE_DIRECTORY_SHARED', True):
+            cache.set(DIRECTORY_KEY, (version, directory), ttl)
+    _local_directory = (version, time.monotonic(), directory)
+    return directory
+
+
+def role_holder(role, department=None):
+    """The first holder of ``role`` (within ``department`` when given), or None."""
+    for holder in role_directory().get(role, ()):
+        if department is None or holder.department == department:
+            return holder
+    return None
+
+
+def find_role_holder(role, faculty_id):
+    """The RoleHolder for ``faculty_id`` if they hold ``role``, else None."""
+    try:
+        faculty_id = int(faculty_id)
+    except (TypeError, ValueError):
+        return None
+    return next((holder for holder in role_directory().get(role, ()) if holder.id == faculty_id), None)
+
+
+def invalidate_role_directory():
+    cache.set(DIRECTORY_VERSION_KEY, time.time_ns(), None)
+    cache.delete(DIRECTORY_KEY)
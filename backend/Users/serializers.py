@@ -29,6 +29,9 @@ class FacultySerializer(serializers.ModelSerializer):
         fields = '__all__'
 
     def get_roles(self, obj):
+        # list views prefetch roles_set; single objects fall back to a query
+        if 'roles_set' in getattr(obj, '_prefetched_objects_cache', {}):
+            return [r.role for r in obj.roles_set.all()]
         roles_qs = Roles.objects.filter(faculty=obj)
         return [r.role for r in roles_qs]
 
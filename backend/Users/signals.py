@@ -0,0 +1,19 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Faculty, Roles
+from .roles import invalidate_faculty_roles, invalidate_role_directory
+
+
+@receiver(post_save, sender=Roles)
+@receiver(post_delete, sender=Roles)
+def drop_cached_roles(sender, instance, **kwargs):
+    invalidate_faculty_roles(instance.faculty_id)
+    invalidate_role_directory()
+
+
+@receiver(post_save, sender=Faculty)
+@receiver(post_delete, sender=Faculty)
+def drop_role_directory(sender, instance, **kwargs):
+    # holders carry name, department and picture
+    invalidate_role_directory()
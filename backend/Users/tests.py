@@ -1,3 +1,479 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.core.management import call_command
+from django.db import connection
+from django.core.cache import cache
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.models import User
+from django.contrib.auth.hashers import check_password
+from rest_framework.test import APIClient
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+import csv
+import json
+import os
+import tempfile
+import pandas as pd
+from unittest import mock
 
-# Create your tests here.
+from .models import Faculty, Roles, Student
+from .roles import get_faculty_roles
+from . import config, importers
+from .provisioning import CredentialManifest
+from Scholarship.models import Scholarship, ScholarshipMonthlySummary, calculate_pay
+
+
+def make_faculty(username, department='CSE', roles=('FAC',)):
+    user = User.objects.create(username=username)
+    faculty = Faculty.objects.create(
+        user=user,
+        name=f"Faculty {username}",
+        email=f"{username}@nitsri.ac.in",
+        phone_number='0000000000',
+        department=department,
+        university='NIT-Sri',
+        designation='PROF',
+        date_of_birth=date(1970, 1, 1),
+    )
+    Roles.objects.bulk_create([Roles(faculty=faculty, role=role) for role in roles])
+    return faculty
+
+
+def make_student(username, supervisor=None, co_supervisor=None, department='CSE', admission_category='INST_FEL'):
+    user = User.objects.create(username=username)
+    return Student.objects.create(
+        user=user,
+        enroll=username,
+        registration=username,
+        name=f"Scholar {username}",
+        email=f"{username}@example.com",
+        phone_number='0000000000',
+        department=department,
+        course='PhD',
+        university='NIT-Sri',
+        supervisor=supervisor,
+        co_supervisor=co_supervisor,
+        admission_category=admission_category,
+    )
+
+
+class ListQueryCountTests(TestCase):
+    """List endpoints must run a fixed number of queries regardless of row count."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.supervisor = make_faculty('sup')
+        self.co_supervisor = make_faculty('cosup')
+
+    def add_students(self, count):
+        start = Student.objects.count()
+        for i in range(start, start + count):
+            make_student(f"scholar{i}", self.supervisor, self.co_supervisor)
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def add_faculty(self, count):
+        start = Faculty.objects.count()
+        for i in range(start, start + count):
+            make_faculty(f"faculty{i}", roles=('FAC', 'HOD'))
+
+    def assertConstantQueries(self, url, grow=None):
+        grow = grow or self.add_students
+        grow(2)
+        small = self.count_queries(url)
+        grow(10)
+        self.assertEqual(self.count_queries(url), small, url)
+
+    def test_student_list(self):
+        self.assertConstantQueries('/api/users/student/')
+
+    def test_student_list_by_department(self):
+        self.assertConstantQueries('/api/users/student/?department=CSE')
+
+    def test_student_list_by_supervisor(self):
+        self.assertConstantQueries(f'/api/users/student/?faculty={self.supervisor.id}')
+
+    def test_student_list_by_university(self):
+        self.assertConstantQueries('/api/users/student/?university=NIT-Sri')
+
+    def test_faculty_list(self):
+        self.assertConstantQueries('/api/users/faculty/', self.add_faculty)
+
+    def test_faculty_list_by_department(self):
+        self.assertConstantQueries('/api/users/faculty/?department=CSE', self.add_faculty)
+
+    def test_faculty_list_by_university(self):
+        self.assertConstantQueries('/api/users/faculty/?university=NIT-Sri', self.add_faculty)
+
+
+class RoleCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.faculty = make_faculty('hod', roles=('FAC', 'HOD'))
+
+    def test_roles_are_cached_across_calls(self):
+        self.assertEqual(get_faculty_roles(self.faculty.id), frozenset({'FAC', 'HOD'}))
+        with self.assertNumQueries(0):
+            self.assertEqual(get_faculty_roles(self.faculty.id), frozenset({'FAC', 'HOD'}))
+
+    def test_role_changes_invalidate_cache(self):
+        get_faculty_roles(self.faculty.id)
+        role = Roles.objects.create(faculty=self.faculty, role='DEAN')
+        self.assertIn('DEAN', get_faculty_roles(self.faculty.id))
+        role.delete()
+        self.assertNotIn('DEAN', get_faculty_roles(self.faculty.id))
+
+    def test_members_served_from_role_directory(self):
+        dean = make_faculty('dean', roles=('DEAN',))
+        self.client.get('/api/users/members/?role=DEAN')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/users/members/?role=DEAN')
+        self.assertEqual(response.json(), [{'name': dean.name, 'role': 'Dean', 'src': None}])
+        dean.name = 'Renamed Dean'
+        dean.save()
+        self.assertEqual(self.client.get('/api/users/members/?role=DEAN').json()[0]['name'], 'Renamed Dean')
+
+    def test_faculty_members_include_department_hod(self):
+        other = make_faculty('other')
+        make_faculty('ece-hod', department='ECE', roles=('HOD',))
+        response = self.client.get(f'/api/users/members/?role=FAC&id={other.id}')
+        self.assertEqual([(m['role'], m['name']) for m in response.json()], [('Head of Department', self.faculty.name)])
+
+    def test_role_list_keeps_config_order(self):
+        response = self.client.get(f'/api/users/roles/?faculty={self.faculty.id}')
+        self.assertEqual(response.json(), ['FAC', 'HOD'])
+
+
+class ConfigTests(TestCase):
+    """conf.json is parsed once and re-read only when its mtime changes."""
+
+    def setUp(self):
+        with open(config.CONFIG_PATH) as f:
+            self.data = json.load(f)
+        handle, self.path = tempfile.mkstemp(suffix='.json')
+        os.close(handle)
+        self.write(self.data, mtime=1)
+        self.now = 1000.0
+        for patcher in (
+            mock.patch.object(config, 'CONFIG_PATH', self.path),
+            mock.patch.object(config.time, 'monotonic', lambda: self.now),
+            mock.patch.object(config, '_config', None),
+            mock.patch.object(config, '_checked_at', 0.0),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(os.remove, self.path)
+
+    def write(self, data, mtime):
+        with open(self.path, 'w') as f:
+            json.dump(data, f)
+        os.utime(self.path, ns=(mtime * 10 ** 9, mtime * 10 ** 9))
+
+    def renamed_gender(self, label, mtime):
+        self.write({**self.data, 'gender': {**self.data['gender'], 'M': label}}, mtime)
+
+    def test_choices_and_codes_match_conf_json(self):
+        conf = config.get_config()
+        college = self.data['college']
+        self.assertEqual(conf.DEPARTMENT_CHOICES, tuple(college['departments'].items()))
+        self.assertEqual(conf.ROLES, tuple(college['roles'].items()))
+        self.assertEqual(conf.UNIVERSITIES, tuple(college['university'].items()))
+        self.assertEqual(conf.AC, tuple(self.data['admission_category'].items()))
+        self.assertEqual(conf.RC, tuple(self.data['research_category'].items()))
+        self.assertEqual(conf.STATUS, tuple(self.data['status'].items()))
+        self.assertEqual(conf.ROLE_CODES, frozenset(college['roles']))
+        self.assertEqual(conf.DEPARTMENT_CODES, frozenset(college['departments']))
+        self.assertEqual(conf.UNIVERSITY_CODES, frozenset(college['university']))
+
+    def test_sections_are_read_only(self):
+        conf = config.get_config()
+        for mapping in (conf.college, conf.college['roles'], conf.sections, conf.sections['gender']):
+            with self.assertRaises(TypeError):
+                mapping['X'] = 'changed'
+
+    def test_no_reread_within_interval(self):
+        first = config.get_config()
+        self.renamed_gender('Renamed', mtime=2)
+        self.now += config.RELOAD_INTERVAL - 1
+        with mock.patch.object(config, '_read', side_effect=AssertionError('re-read')):
+            self.assertIs(config.get_config(), first)
+
+    def test_reload_after_mtime_change_and_interval(self):
+        first = config.get_config()
+        self.now += config.RELOAD_INTERVAL
+        # interval passed but the file is unchanged: same object
+        self.assertIs(config.get_config(), first)
+        self.renamed_gender('Renamed', mtime=2)
+        self.now += config.RELOAD_INTERVAL
+        reloaded = config.get_config()
+        self.assertIsNot(reloaded, first)
+        self.assertEqual(reloaded.sections['gender']['M'], 'Renamed')
+
+    def test_broken_edit_keeps_last_good_config(self):
+        first = config.get_config()
+        with open(self.path, 'w') as f:
+            f.write('{not json')
+        os.utime(self.path, ns=(3 * 10 ** 9, 3 * 10 ** 9))
+        self.now += config.RELOAD_INTERVAL
+        with self.assertLogs('Users.config', 'ERROR'):
+            self.assertIs(config.get_config(), first)
+
+
+class AsyncViewTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.supervisor = make_faculty('sup', roles=('FAC', 'HOD'))
+        make_faculty('dean', department='ECE', roles=('DEAN',))
+        self.scholar = make_student('scholar', self.supervisor)
+        make_student('ece', department='ECE')
+
+    def assertSameResponses(self, path, queries):
+        for query in queries:
+            sync = self.client.get(f'/api/users/{path}/?{query}')
+            async_ = self.client.get(f'/api/users/async/{path}/?{query}')
+            self.assertEqual((async_.status_code, async_.json()), (sync.status_code, sync.json()), query)
+
+    def test_student_matches_sync_view(self):
+        self.assertSameResponses('student', [
+            '', f'id={self.scholar.id}', 'id=0', 'department=cse', 'department=ME', f'faculty={self.supervisor.id}',
+            'university=nit-sri',
+        ])
+
+    def test_faculty_matches_sync_view(self):
+        self.assertSameResponses('faculty', [
+            '', f'id={self.supervisor.id}', 'id=0', 'department=ece', f'student={self.scholar.id}', 'university=NIT-Sri',
+        ])
+
+    def test_members_match_sync_view(self):
+        self.assertSameResponses('members', [
+            f'role=scholar&id={self.scholar.id}', f'role=FAC&id={self.supervisor.id}', 'role=DEAN', 'role=scholar&id=0', '',
+        ])
+
+    def test_bad_ids_are_client_errors(self):
+        self.assertEqual(self.client.get('/api/users/async/student/?id=x').status_code, 400)
+        self.assertEqual(self.client.get('/api/users/async/faculty/?student=x').status_code, 400)
+
+
+class ImporterTests(TestCase):
+
+    def test_map_labels_uses_first_code_and_none_for_unknown(self):
+        mapping = {'CSE': 'Computer Science', 'CS': 'computer science', 'ECE': 'Electronics'}
+        codes = importers.map_labels(pd.Series([' computer SCIENCE ', 'Electronics', 'Botany', None]), mapping)
+        self.assertEqual(codes.tolist(), ['CSE', 'ECE', None, None])
+
+    def test_existing_usernames_limited_to_candidates(self):
+        make_faculty('taken')
+        make_faculty('other')
+        with self.assertNumQueries(1):
+            self.assertEqual(importers.existing_usernames(['taken', 'free']), {'taken'})
+
+    def test_resolve_faculty_exact_then_surname_in_department(self):
+        faculty = make_faculty('fac')
+        faculty.name = 'Mohammad Yousuf Shah'
+        faculty.save()
+        other = make_faculty('ece', department='ECE')
+        other.name = 'Irfan Shah'
+        other.save()
+        index = importers.load_faculty_index()
+        ids = importers.resolve_faculty(
+            pd.Series(['Prof mohammad  yousuf shah', 'M Y Shah', 'M Y Shah', float('nan')]),
+            pd.Series(['CSE', 'CSE', 'ECE', 'CSE']),
+            index,
+        )
+        self.assertEqual(ids.tolist(), [faculty.id, faculty.id, other.id, None])
+        exact_only = importers.resolve_faculty(pd.Series(['M Y Shah']), pd.Series(['CSE']), index, fallback=False)
+        self.assertEqual(exact_only.tolist(), [None])
+
+    @override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+    def test_hash_passwords_in_pool_keeps_order(self):
+        raw = [f"user{i}@nitsri.ac.in" for i in range(importers.PARALLEL_HASH_THRESHOLD)]
+        hashed = importers.hash_passwords(raw, workers=2)
+        self.assertTrue(all(check_password(password, encoded) for password, encoded in zip(raw, hashed)))
+
+    def test_sync_plan_updates_changed_fields_only(self):
+        faculty = make_faculty('sync')
+        frame = pd.DataFrame({
+            'email': [faculty.email, 'new@nitsri.ac.in'],
+            'name': ['Renamed', 'New Faculty'],
+            'phone_number': ['', '1111111111'],
+            'department': ['ECE', 'CSE'],
+        })
+        fields = ('name', 'phone_number', 'department')
+        with self.assertNumQueries(1):
+            new, changed, diff = importers.sync_plan(Faculty, frame, 'email', fields)
+        self.assertEqual(new['email'].tolist(), ['new@nitsri.ac.in'])
+        self.assertEqual(
+            diff, [(faculty.email, 'name', 'Faculty sync', 'Renamed'), (faculty.email, 'department', 'CSE', 'ECE')]
+        )
+        self.assertEqual(importers.upsert(Faculty, changed, 'email', fields), 1)
+        faculty.refresh_from_db()
+        self.assertEqual((faculty.name, faculty.department, faculty.phone_number), ('Renamed', 'ECE', '0000000000'))
+
+
+class ChunkedImportTests(TestCase):
+    """productionEmployeeEntries commits per chunk and resumes from the checkpoint."""
+
+    def write_sheet(self, emails):
+        pd.DataFrame({
+            'Name': [f"Faculty {i}" for i in range(len(emails))],
+            'Official Email': emails,
+            'Mobile Number': ['0000000000'] * len(emails),
+            'Date of Birth': ['1980-01-01'] * len(emails),
+            'Organization Unit': ['CSE'] * len(emails),
+            'Post': ['PROF'] * len(emails),
+        }).to_csv(self.path, index=False)
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.csv')
+        os.close(handle)
+        self.addCleanup(lambda: [os.remove(p) for p in (self.path, f"{self.path}.checkpoint") if os.path.exists(p)])
+
+    def run_command(self, *args):
+        stderr = StringIO()
+        call_command(
+            'productionEmployeeEntries', '--file', self.path, '--chunk-size', '2', *args, stdout=StringIO(), stderr=stderr,
+        )
+        return stderr.getvalue()
+
+    def test_failed_chunk_rolls_back_and_resume_continues(self):
+        emails = [f"f{i}@nitsri.ac.in" for i in range(5)]
+        self.write_sheet(emails[:3] + ['f0@nitsri.ac.in'] + emails[4:])
+        with self.assertLogs('Users.management.commands.productionEmployeeEntries', 'ERROR'):
+            self.run_command()
+        # the second chunk repeats f0, so only the first chunk is committed
+        self.assertEqual(Faculty.objects.count(), 2)
+        self.assertTrue(os.path.exists(f"{self.path}.checkpoint"))
+
+        self.write_sheet(emails)
+        self.run_command('--resume')
+        self.assertEqual(sorted(Faculty.objects.values_list('email', flat=True)), emails)
+        self.assertEqual(Roles.objects.filter(role='FAC').count(), 5)
+        self.assertFalse(os.path.exists(f"{self.path}.checkpoint"))
+
+    def test_process_local_cache_is_reported(self):
+        self.write_sheet(['f0@nitsri.ac.in'])
+        self.assertIn('ROLE_CACHE_TTL', self.run_command())
+        self.write_sheet(['f1@nitsri.ac.in'])
+        with tempfile.TemporaryDirectory() as directory, override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directory,
+        }}):
+            self.assertEqual(self.run_command(), '')
+
+    def test_xlsx_and_csv_chunks_match(self):
+        frame = pd.DataFrame({'Name': ['A', 'B', 'C'], 'Code': ['nan', 'x', None]})
+        handle, xlsx = tempfile.mkstemp(suffix='.xlsx')
+        os.close(handle)
+        self.addCleanup(os.remove, xlsx)
+        frame.to_excel(xlsx, index=False)
+        frame.to_csv(self.path, index=False)
+        for path in (xlsx, self.path):
+            chunks = list(importers.read_chunks(path, 2, skip=1))
+            self.assertEqual([chunk.index.tolist() for chunk in chunks], [[1, 2]])
+            self.assertEqual(importers.clean_text(chunks[0]['Code']).tolist(), ['x', ''])
+
+
+class ScholarSyncTests(TestCase):
+    """scholarEntries --sync reprices scholars whose category changed."""
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.csv')
+        os.close(handle)
+        self.addCleanup(os.remove, self.path)
+        self.jrf = make_student('enr-jrf')
+        self.sponsored = make_student('enr-spon', admission_category='SPON')
+        self.manual = make_student('enr-manual')
+        Student.objects.filter(id=self.manual.id).update(scholarship_hra=Decimal('0.20'))
+        self.pending = {
+            scholar.id: Scholarship.objects.create(scholar=scholar, year=2025, month=3)
+            for scholar in (self.jrf, self.sponsored, self.manual) if scholar.admission_category == 'INST_FEL'
+        }
+        self.released = Scholarship.objects.create(scholar=self.jrf, year=2025, month=2, release=True)
+
+    def sync(self, rows):
+        pd.DataFrame([{
+            'Name of the Research Scholar': f"Scholar {enroll}", 'Registration No': enroll, 'Enrolment No.': enroll,
+            'JRF/SRF': category, 'Department': 'Computer Science and Engineering', 'Gender': 'Male',
+            'Admission Category': admission, 'Full Time/Part Time': 'Full Time', 'Date of Joining': '2020-01-01',
+            'Contact Number': '0000000000', 'Mail ID': f"{enroll}@example.com", 'Supervisor': '', 'Co-supervisor': '',
+        } for enroll, category, admission in rows]).to_csv(self.path, index=False)
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('scholarEntries', '--sync', '--file', self.path, stdout=StringIO(), stderr=StringIO())
+
+    def test_category_change_reprices_student_and_scholarships(self):
+        released_pay = self.released.total_pay
+        self.sync([
+            ('enr-jrf', 'SRF', 'Institute Fellowship'),
+            ('enr-spon', 'JRF', 'Institute Fellowship'),
+            ('enr-manual', 'JRF', 'Institute Fellowship'),
+        ])
+        srf, fellow, manual = (Student.objects.get(id=s.id) for s in (self.jrf, self.sponsored, self.manual))
+        self.assertEqual((srf.rf_category, srf.scholarship_basic, srf.scholarship_hra), ('SRF', 42000, Decimal('0.18')))
+        self.assertEqual((fellow.admission_category, fellow.scholarship_basic, fellow.scholarship_hra), ('INST_FEL', 37000, Decimal('0.18')))
+        # no category change: the hand-edited rate survives
+        self.assertEqual(manual.scholarship_hra, Decimal('0.20'))
+
+        pending = Scholarship.objects.get(id=self.pending[srf.id].id)
+        expected = calculate_pay(srf.scholarship_basic, srf.scholarship_hra, 2025, 3, pending.days)[1]
+        self.assertEqual(pending.total_pay, expected.quantize(Decimal('0.01')))
+        self.released.refresh_from_db()
+        self.assertEqual(self.released.total_pay, released_pay)
+        self.assertEqual(ScholarshipMonthlySummary.objects.get(year=2025, month=3, status='2').total_pay, pending.total_pay + Scholarship.objects.get(id=self.pending[manual.id].id).total_pay)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ProvisioningTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create(username='admin', is_staff=True)
+
+    def test_bulk_users_get_distinct_passwords(self):
+        User.objects.create(username='taken')
+        self.client.force_authenticate(self.admin)
+        response = self.client.post('/api/users/bulk/', {'users': [
+            {'username': 'a1', 'email': 'a1@nitsri.ac.in', 'first_name': 'A'},
+            'a2', 'a2', 'taken', {'username': 'a3', 'email': 'not-an-email'},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response['Cache-Control'], 'no-store')
+        created = response.json()['created']
+        self.assertEqual([c['username'] for c in created], ['a1', 'a2'])
+        self.assertNotEqual(created[0]['password'], created[1]['password'])
+        for credentials in created:
+            self.assertTrue(User.objects.get(id=credentials['id']).check_password(credentials['password']))
+        self.assertEqual(
+            [(f['username'], f['error']) for f in response.json()['failed']],
+            [('a2', 'duplicate in request'), ('a3', 'invalid email'), ('taken', 'already exists')],
+        )
+
+    def test_bulk_users_rejects_invalid_usernames(self):
+        self.client.force_authenticate(self.admin)
+        response = self.client.post('/api/users/bulk/', {'users': [
+            'ok', 'x' * 151, {'username': 'has space'}, {'username': 'b1', 'email': f"{'e' * 250}@nitsri.ac.in"},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([(r['row'], r['username']) for r in response.json()['rows']], [(1, 'x' * 151), (2, 'has space')])
+        self.assertFalse(User.objects.filter(username='ok').exists())
+
+    def test_bulk_users_requires_staff(self):
+        self.client.force_authenticate(User.objects.create(username='plain'))
+        response = self.client.post('/api/users/bulk/', {'users': ['x']}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+    def test_manifest_written_on_commit_with_owner_only_access(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(CREDENTIAL_MANIFEST_DIR=directory):
+            manifest = CredentialManifest('faculty')
+            with self.captureOnCommitCallbacks(execute=True):
+                hashed = manifest.provision(['f1', 'f2'])
+            with open(manifest.path) as f:
+                rows = list(csv.reader(f))
+            self.assertEqual(os.stat(manifest.path).st_mode & 0o777, 0o600)
+        self.assertEqual([row[0] for row in rows], ['username', 'f1', 'f2'])
+        self.assertTrue(all(check_password(raw, encoded) for (_, raw), encoded in zip(rows[1:], hashed)))
@@ -17,6 +17,11 @@ urlpatterns = [
     path('faculty/<int:pk>/', MultiFuctionalFacultyAPI.as_view(), name='faculty-detail'),
     path('roles/', GetRoleAPI.as_view(), name='role-list'),
     path('members/', GetMembersAPI.as_view(), name='get-members'),
+    # async GET variants of the read endpoints, for ASGI deployments
+    path('async/student/', AsyncStudentAPI.as_view(), name='async-student-list'),
+    path('async/faculty/', AsyncFacultyAPI.as_view(), name='async-faculty-list'),
+    path('async/members/', AsyncMembersAPI.as_view(), name='async-get-members'),
+    path('bulk/', BulkUserAPI.as_view(), name='bulk-users'),
     path('logout/', LogoutView.as_view(), name='logout'),
     
     path('temp/getid/', GetID.as_view(), name='getid'),
@@ -5,12 +5,14 @@ from .serializers import *
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from django.contrib.auth.models import User
 from django.contrib.auth.tokens import default_token_generator
 from django.core.mail import send_mail
 from django.conf import settings
 from django.shortcuts import get_object_or_404
+from django.core.exceptions import ValidationError
+from django.db import transaction
 from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
 from datetime import timedelta
 from rest_framework_simplejwt.exceptions import TokenError
@@ -21,35 +23,79 @@ import pprint
 # ===Ray===
 
 # Functions --->
-import os
-import json
+from .config import get_config
+from .roles import get_faculty_roles, ordered_roles, role_holder
+from .importers import existing_usernames
+from .provisioning import provision_passwords
+from .async_api import AsyncAPIView
+from asgiref.sync import sync_to_async
 
 def validRolesList():
-    BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    department_json_path = os.path.join(BASE_DIR, 'conf.json')
-    
-    try:
-        if not os.path.exists(department_json_path) or os.stat(department_json_path).st_size == 0:
-            raise FileNotFoundError("conf.json does not exist or is empty.")
-        
-        with open(department_json_path, 'r') as file:
-            college_data = json.load(file)
-            return list(college_data.get('college', {}).get('roles', {}).keys())
-    except Exception as e:
-        print(f"Failed to load valid roles from conf.json: {e}")
-        return []
+    # frozenset of role codes from the cached conf.json, no file I/O per call
+    return get_config().ROLE_CODES
 
 
 
-def getRoleList(faculty_id):
-    role_list=[]
-    roles=Roles.objects.filter(faculty__id=faculty_id)
-    if not roles.exists():
-        return role_list
-    serializers=RoleSerializer(roles,many=True)
-    for entry in serializers.data:
-        role_list.append(entry.get("role"))
-    return role_list
+def getRoleList(faculty_id, request=None):
+    # list form of the cached role set, for JSON payloads and token claims
+    return ordered_roles(get_faculty_roles(faculty_id, request))
+
+
+def getProfilePicUrl(profile_pic):
+    if profile_pic and hasattr(profile_pic, 'url'):
+        return profile_pic.url
+    return None
+
+
+def roleHolderMembers(department=None):
+    # HOD (when a department is given), Dean, AD and Accounts from the cached role directory
+    members = []
+    for role, label in (("HOD", "Head of Department"), ("DEAN", "Dean"), ("AD", "Associate Dean"), ("AC", "Accounts")):
+        if role == "HOD" and not department:
+            continue
+        holder = role_holder(role, department if role == "HOD" else None)
+        if holder:
+            members.append({"name": holder.name, "role": label, "src": holder.src})
+    return members
+
+
+def approvalChainMembers(student):
+    # supervisors come from the (select_related) student
+    members = []
+    if student.supervisor:
+        members.append({"name": student.supervisor.name, "role": "Supervisor",
+                        "src": getProfilePicUrl(student.supervisor.profile_pic)})
+    if student.co_supervisor:
+        members.append({"name": student.co_supervisor.name, "role": "Co-Supervisor",
+                        "src": getProfilePicUrl(student.co_supervisor.profile_pic)})
+    return members + roleHolderMembers(student.department)
+
+
+def studentListQuery(params):
+    # (students, message when none match) for the list filters of the student endpoints
+    students = Student.objects.select_related('supervisor', 'co_supervisor')
+    if params.get('department'):
+        department = params['department']
+        return students.filter(department__iexact=department), f"No students found in department '{department}'."
+    if params.get('faculty'):
+        faculty_id = int(params['faculty'])
+        return students.filter(supervisor__id=faculty_id), f"No students found for faculty ID {faculty_id}."
+    if params.get('university'):
+        university = params['university']
+        return students.filter(university__iexact=university), f"No students found for University: {university}."
+    return students, None
+
+
+def facultyListQuery(params):
+    # (faculty, message when none match) for the list filters of the faculty endpoints
+    faculty = Faculty.objects.prefetch_related('roles_set')
+    if params.get('department'):
+        department = params['department']
+        return faculty.filter(department__iexact=department), f"No faculty found in department '{department}'."
+    if params.get('university'):
+        university = params['university']
+        return faculty.filter(university__iexact=university), f"No faculty found for University: {university}."
+    return faculty, None
 
 
 
@@ -71,45 +117,18 @@ class MultiFuctionalStudentAPI(APIView):
         # student=Student.objects.get(user__id=request.user.id)
         # print(f"working {student.name}")
         student_id = request.query_params.get('id', None) 
-        department = request.query_params.get('department', None)
-        faculty_id = request.query_params.get('faculty', None)
-        university_name = request.query_params.get('university', None)
         # sirf ek user ayega 
         if student_id:
             try:
-                student = Student.objects.get(id=int(student_id))
+                student = Student.objects.select_related('supervisor', 'co_supervisor').get(id=int(student_id))
                 serializer = StudentSerializer(student)
                 return Response(serializer.data, status=status.HTTP_200_OK)
             except Student.DoesNotExist:
                 return Response({'error': 'Student not found'}, status=status.HTTP_404_NOT_FOUND)
-        # all department filtered users ayega 
-        elif department:
-            students = Student.objects.filter(department__iexact=department)
-            if not students.exists():
-                return Response(
-                    {"error": f"No students found in department '{department}'."},
-                    status=status.HTTP_404_NOT_FOUND
-                )
-            serializer = StudentSerializer(students, many=True)
-            return Response(serializer.data, status=status.HTTP_200_OK)
-        # all supervisor filtered users ayega 
-        elif faculty_id:
-            student_list = Student.objects.filter(supervisor__id=int(faculty_id))
-            if not student_list.exists():
-                return Response({'error': f"No students found for faculty ID {faculty_id}."},
-                                status=status.HTTP_404_NOT_FOUND)
-            serializer = StudentSerializer(student_list, many=True)
-            return Response(serializer.data, status=status.HTTP_200_OK)
-        # all university filtered users ayega 
-        elif university_name:
-            student_list = Student.objects.filter(university__iexact=university_name)
-            if not student_list.exists():
-                return Response({'error': f"No students found for University: {university_name}."},
-                                status=status.HTTP_404_NOT_FOUND)
-            serializer = StudentSerializer(student_list, many=True)
-            return Response(serializer.data, status=status.HTTP_200_OK)
-        # Default: return all students
-        students = Student.objects.all()
+        # department, supervisor or university filtered users, or everyone
+        students, missing = studentListQuery(request.query_params)
+        if missing and not students.exists():
+            return Response({"error": missing}, status=status.HTTP_404_NOT_FOUND)
         serializer = StudentSerializer(students, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
     def patch(self, request, pk=None):
@@ -133,9 +152,7 @@ class MultiFuctionalFacultyAPI(APIView):
     # need to fix the int() wala exception
     def get(self, request, format=None):
         faculty_id = request.query_params.get('id', None)
-        department = request.query_params.get('department', None)
         student_id = request.query_params.get('student', None)
-        university_name = request.query_params.get('university', None)
         # sirf ek faculty ayega 
         if faculty_id:
             try:
@@ -144,18 +161,8 @@ class MultiFuctionalFacultyAPI(APIView):
                 return Response(serializer.data, status=status.HTTP_200_OK)
             except Faculty.DoesNotExist:
                 return Response({'error': 'Faculty not found'}, status=status.HTTP_404_NOT_FOUND)
-        # all department filtered faculty ayega 
-        elif department:
-            faculty_list = Faculty.objects.filter(department__iexact=department)
-            if not faculty_list.exists():
-                return Response(
-                    {"error": f"No faculty found in department '{department}'."},
-                    status=status.HTTP_404_NOT_FOUND
-                )
-            serializer = FacultySerializer(faculty_list, many=True)
-            return Response(serializer.data, status=status.HTTP_200_OK)
-        # all supervisor filtered users ayega 
-        elif student_id:
+        # all supervisor filtered users ayega (department takes precedence)
+        if student_id and not request.query_params.get('department'):
             try:
                 student = Student.objects.get(id=int(student_id))
                 faculty = student.supervisor
@@ -166,16 +173,10 @@ class MultiFuctionalFacultyAPI(APIView):
                 return Response(serializer.data, status=status.HTTP_200_OK)
             except Student.DoesNotExist:
                 return Response({'error': 'Student is invalid'}, status=status.HTTP_404_NOT_FOUND)
-        # all university filtered users ayega 
-        elif university_name:
-            faculty_list = Faculty.objects.filter(university__iexact=university_name)
-            if not faculty_list.exists():
-                return Response({'error': f"No faculty found for University: {university_name}."},
-                                status=status.HTTP_404_NOT_FOUND)
-            serializer = FacultySerializer(faculty_list, many=True)
-            return Response(serializer.data, status=status.HTTP_200_OK)
-        # Default: return all faculty
-        faculty_list = Faculty.objects.all()
+        # department or university filtered faculty, or everyone
+        faculty_list, missing = facultyListQuery(request.query_params)
+        if missing and not faculty_list.exists():
+            return Response({"error": missing}, status=status.HTTP_404_NOT_FOUND)
         serializer = FacultySerializer(faculty_list, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
     def patch(self, request, pk):
@@ -201,7 +202,7 @@ class GetRoleAPI(APIView):
             faculty_id = int(faculty_id)
         except (TypeError, ValueError):
             return Response({'error': "Faculty ID is not valid"}, status=status.HTTP_400_BAD_REQUEST)
-        role_list = getRoleList(faculty_id)
+        role_list = getRoleList(faculty_id, request)
         if role_list:
             return Response(role_list, status=status.HTTP_200_OK)
         else:
@@ -211,84 +212,18 @@ class GetMembersAPI(APIView):
     def get(self, request, format=None):
         id = request.query_params.get('id')
         role = request.query_params.get('role')
-        data = []
-        def get_faculty_with_role(role_name):
-            try:
-                return Faculty.objects.get(roles__role=role_name)
-            except Faculty.DoesNotExist:
-                return None
-        def get_profile_pic_url(profile_pic):
-            if profile_pic and hasattr(profile_pic, 'url'):
-                return profile_pic.url
-            return None
-        # Common roles
-        dean = get_faculty_with_role("DEAN")
-        ad = get_faculty_with_role("AD")
-        acc = get_faculty_with_role("AC")
         if not role:
             return Response({'error': "Role is required"}, status=status.HTTP_400_BAD_REQUEST)
         try:
             if role == "scholar":
-                user = Student.objects.get(id=id)
-                # Supervisor
-                if user.supervisor:
-                    data.append({
-                        "name": user.supervisor.name,
-                        "role": "Supervisor",
-                        "src": get_profile_pic_url(user.supervisor.profile_pic)
-                    })
-                # Co-Supervisor
-                if user.co_supervisor:
-                    data.append({
-                        "name": user.co_supervisor.name,
-                        "role": "Co-Supervisor",
-                        "src": get_profile_pic_url(user.co_supervisor.profile_pic)
-                    })
-                # HOD
-                if user.department:
-                    try:
-                        hod = Faculty.objects.filter(roles__role="HOD", department=user.department).first()
-                        data.append({
-                            "name": hod.name,
-                            "role": "Head of Department",
-                            "src": get_profile_pic_url(hod.profile_pic)
-                        })
-                    except Faculty.DoesNotExist:
-                        pass
+                user = Student.objects.select_related('supervisor', 'co_supervisor').get(id=id)
+                data = approvalChainMembers(user)
             elif role == "FAC":
-                user = Faculty.objects.get(id=id)
-                if user.department:
-                    try:
-                        hod = Faculty.objects.filter(roles__role="HOD", department=user.department).first()
-                        data.append({
-                            "name": hod.name,
-                            "role": "Head of Department",
-                            "src": get_profile_pic_url(hod.profile_pic)
-                        })
-                    except Faculty.DoesNotExist:
-                        pass
+                department = Faculty.objects.values_list('department', flat=True).get(id=id)
+                data = roleHolderMembers(department)
             else:
                 # For all other roles, no user fetch needed
-                pass
-            # Add roles common to all
-            if dean:
-                data.append({
-                    "name": dean.name,
-                    "role": "Dean",
-                    "src": get_profile_pic_url(dean.profile_pic)
-                })
-            if ad:
-                data.append({
-                    "name": ad.name,
-                    "role": "Associate Dean",
-                    "src": get_profile_pic_url(ad.profile_pic)
-                })
-            if acc:
-                data.append({
-                    "name": acc.name,
-                    "role": "Accounts",
-                    "src": get_profile_pic_url(acc.profile_pic)
-                })
+                data = roleHolderMembers()
             if not data:
                 return Response({'error': "No members found for the given role"}, status=status.HTTP_404_NOT_FOUND)
             return Response(data, status=status.HTTP_200_OK)
@@ -298,6 +233,83 @@ class GetMembersAPI(APIView):
             return Response({'error': "Faculty not found"}, status=status.HTTP_404_NOT_FOUND)
 
 
+class AsyncStudentAPI(AsyncAPIView):
+    """Async GET of MultiFuctionalStudentAPI (same parameters and responses) for ASGI servers."""
+
+    async def get(self, request, format=None):
+        student_id = request.query_params.get('id')
+        try:
+            if student_id:
+                student = await Student.objects.select_related('supervisor', 'co_supervisor').aget(id=int(student_id))
+                return self.respond(StudentSerializer(student).data)
+            students, missing = studentListQuery(request.query_params)
+        except ValueError:
+            return self.respond({'error': "id and faculty must be integers."}, status=400)
+        except Student.DoesNotExist:
+            return self.respond({'error': 'Student not found'}, status=404)
+        students = [student async for student in students]
+        if missing and not students:
+            return self.respond({"error": missing}, status=404)
+        return self.respond(StudentSerializer(students, many=True).data)
+
+
+class AsyncFacultyAPI(AsyncAPIView):
+    """Async GET of MultiFuctionalFacultyAPI (same parameters and responses) for ASGI servers."""
+
+    async def get(self, request, format=None):
+        faculty_id = request.query_params.get('id')
+        student_id = request.query_params.get('student')
+        faculty = Faculty.objects.prefetch_related('roles_set')
+        try:
+            if faculty_id:
+                return self.respond(FacultySerializer(await faculty.aget(id=int(faculty_id))).data)
+            if student_id and not request.query_params.get('department'):
+                student = await Student.objects.only('supervisor_id').aget(id=int(student_id))
+                if student.supervisor_id is None:
+                    return self.respond({'error': f"No faculty (supervisor) assigned to student ID {student_id}."}, status=404)
+                return self.respond(FacultySerializer(await faculty.aget(id=student.supervisor_id)).data)
+        except ValueError:
+            return self.respond({'error': "id and student must be integers."}, status=400)
+        except Faculty.DoesNotExist:
+            return self.respond({'error': 'Faculty not found'}, status=404)
+        except Student.DoesNotExist:
+            return self.respond({'error': 'Student is invalid'}, status=404)
+        faculty_list, missing = facultyListQuery(request.query_params)
+        faculty_list = [member async for member in faculty_list]
+        if missing and not faculty_list:
+            return self.respond({"error": missing}, status=404)
+        return self.respond(FacultySerializer(faculty_list, many=True).data)
+
+
+class AsyncMembersAPI(AsyncAPIView):
+    """Async GetMembersAPI; role holders come from the in-process role directory."""
+
+    async def get(self, request, format=None):
+        id = request.query_params.get('id')
+        role = request.query_params.get('role')
+        if not role:
+            return self.respond({'error': "Role is required"}, status=400)
+        try:
+            if role == "scholar":
+                student = await Student.objects.select_related('supervisor', 'co_supervisor').aget(id=id)
+                # the directory is rebuilt with a (sync) query when stale
+                data = await sync_to_async(approvalChainMembers)(student)
+            elif role == "FAC":
+                department = await Faculty.objects.values_list('department', flat=True).aget(id=id)
+                data = await sync_to_async(roleHolderMembers)(department)
+            else:
+                data = await sync_to_async(roleHolderMembers)()
+        except ValueError:
+            return self.respond({'error': "id must be an integer."}, status=400)
+        except Student.DoesNotExist:
+            return self.respond({'error': "Scholar not found"}, status=404)
+        except Faculty.DoesNotExist:
+            return self.respond({'error': "Faculty not found"}, status=404)
+        if not data:
+            return self.respond({'error': "No members found for the given role"}, status=404)
+        return self.respond(data)
+
+
 class ForgotPasswordView(APIView):
     def post(self, request):
         email = request.data.get('email')
@@ -381,6 +393,85 @@ class LogoutView(APIView):
             return Response({'error': 'Invalid or expired token.'}, status=status.HTTP_400_BAD_REQUEST)
 
 
+class BulkUserAPI(APIView):
+    """
+    Creates login accounts in bulk, each with its own random initial password.
+    The response is the only copy of the passwords, so it is never cached.
+    """
+    permission_classes = [IsAdminUser]
+
+    def post(self, request, format=None):
+        entries = request.data.get('users')
+        if not isinstance(entries, list) or not entries:
+            return Response({"error": "users must be a non-empty list"}, status=status.HTTP_400_BAD_REQUEST)
+        limit = getattr(settings, 'BULK_USER_MAX', 1000)
+        if len(entries) > limit:
+            return Response({"error": f"At most {limit} users per request"}, status=status.HTTP_400_BAD_REQUEST)
+
+        accepted, failed, seen, invalid = [], [], set(), []
+        for row, entry in enumerate(entries):
+            if isinstance(entry, str):
+                entry = {'username': entry}
+            username = str(entry.get('username') or '').strip() if isinstance(entry, dict) else ''
+            email = str(entry.get('email') or '').strip() if isinstance(entry, dict) else ''
+            error = self.username_error(username) if username else None
+            if error:
+                invalid.append({'row': row, 'username': username, 'error': error})
+            elif not username:
+                failed.append({'username': None, 'error': 'username is required'})
+            elif username in seen:
+                failed.append({'username': username, 'error': 'duplicate in request'})
+            elif email and not self.valid_email(email):
+                failed.append({'username': username, 'error': 'invalid email'})
+            else:
+                seen.add(username)
+                accepted.append({**entry, 'username': username, 'email': email})
+        # usernames the User table would reject fail the whole request before anything is hashed
+        if invalid:
+            return Response({"error": "Invalid usernames", "rows": invalid}, status=status.HTTP_400_BAD_REQUEST)
+
+        taken = existing_usernames(seen)
+        failed += [{'username': e['username'], 'error': 'already exists'} for e in accepted if e['username'] in taken]
+        accepted = [e for e in accepted if e['username'] not in taken]
+
+        raw, hashed = provision_passwords(len(accepted))
+        users = [
+            User(
+                username=entry['username'],
+                email=entry['email'],
+                first_name=str(entry.get('first_name') or '')[:150],
+                last_name=str(entry.get('last_name') or '')[:150],
+                password=password,
+            )
+            for entry, password in zip(accepted, hashed)
+        ]
+        with transaction.atomic():
+            User.objects.bulk_create(users)
+        created = [
+            {'id': user.id, 'username': user.username, 'password': password} for user, password in zip(users, raw)
+        ]
+        response = Response({"created": created, "failed": failed}, status=status.HTTP_201_CREATED)
+        response['Cache-Control'] = 'no-store'
+        return response
+
+    @staticmethod
+    def username_error(username):
+        # the User.username validators: length and allowed characters
+        try:
+            User._meta.get_field('username').clean(username, None)
+        except ValidationError as e:
+            return ' '.join(e.messages)
+        return None
+
+    @staticmethod
+    def valid_email(email):
+        try:
+            User._meta.get_field('email').clean(email, None)
+        except ValidationError:
+            return False
+        return True
+
+
 class GetID(APIView):
     def get(self, request, format=None):
         email = request.query_params.get('mail', None)
@@ -111,14 +111,37 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+def env_flag(name, default=False):
+    return os.environ.get(name, str(default)).strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+# Connection reuse, from the environment:
+#   DB_CONN_MAX_AGE        seconds a connection is kept between requests (0 closes it
+#                          after every request; WSGI workers only, see DB_POOL)
+#   DB_CONN_HEALTH_CHECKS  ping a reused connection before the request uses it
+#   DB_POOL                use psycopg 3's connection pool (needs psycopg-pool); the
+#                          right choice under ASGI, where requests run on changing
+#                          threads. Django requires CONN_MAX_AGE = 0 with a pool.
+#   DB_POOL_MIN_SIZE / DB_POOL_MAX_SIZE / DB_POOL_TIMEOUT  per worker process
+DB_POOL = env_flag('DB_POOL')
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
-        'NAME': 'erp',
-        'USER': 'rajesmanna',
-        'PASSWORD': 'root',
-        'HOST': 'localhost',
-        'PORT': '5432',
+        'NAME': os.environ.get('DB_NAME', 'erp'),
+        'USER': os.environ.get('DB_USER', 'rajesmanna'),
+        'PASSWORD': os.environ.get('DB_PASSWORD', 'root'),
+        'HOST': os.environ.get('DB_HOST', 'localhost'),
+        'PORT': os.environ.get('DB_PORT', '5432'),
+        'CONN_MAX_AGE': 0 if DB_POOL else int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': env_flag('DB_CONN_HEALTH_CHECKS', True),
+        'OPTIONS': {
+            'pool': {
+                'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+                'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+                'timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+            },
+        } if DB_POOL else {},
     }
 }
 
@@ -191,6 +214,51 @@ SIMPLE_JWT = {
 
 
 
+# Process-local by default, which is only correct with a single process:
+# role revocations and other invalidations made by one worker or management
+# command reach the others only when their entries expire (*_CACHE_TTL).
+# Point this at Redis/Memcached (or the database cache) when running several
+# workers; the Users.W001 system check warns until then.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# seconds a faculty member's role set stays cached (Roles changes invalidate it)
+ROLE_CACHE_TTL = 300
+# the role-holder directory (Dean/AD/AC/HOD lookups) lives in each process and,
+# when this is True, also in CACHES so a fresh worker skips the query
+ROLE_DIRECTORY_SHARED = True
+
+# Scholarship views take the faculty id and roles from the access token.
+# ROLE_VERSION_CHECK compares the token's role_version claim with the cached
+# version so role revocations apply before the token expires; versions expire
+# after ROLE_CACHE_TTL, which bounds how long another process trusts the claim.
+# SCHOLARSHIP_ALLOW_FACULTY_PARAM keeps the old ?faculty= parameter working for
+# callers that send no token; turn it off once every client sends one.
+ROLE_VERSION_CHECK = True
+SCHOLARSHIP_ALLOW_FACULTY_PARAM = True
+
+# keyset paging for api/scholarships/manage/ (opt-in with ?page_size= or ?cursor=)
+SCHOLARSHIP_PAGE_SIZE = 50
+SCHOLARSHIP_MAX_PAGE_SIZE = 500
+# seconds a grouped api/scholarships/summary/ report stays cached; scholarship
+# and scholar changes invalidate every report before that, but changes made by
+# management commands only reach the servers early through a shared cache
+PAYROLL_CACHE_TTL = 600
+# most what-if scenarios api/scholarships/simulate/ evaluates per request, and
+# the most scenarios x scholarships (the work per request; memory is chunked)
+SIMULATION_MAX_SCENARIOS = 5000
+SIMULATION_MAX_CELLS = 20_000_000
+
+# import commands run with --random-passwords write one-time username,password
+# manifests here (owner-only files); hand them out and delete them
+CREDENTIAL_MANIFEST_DIR = os.path.join(BASE_DIR, 'credentials')
+INITIAL_PASSWORD_LENGTH = 12
+# most accounts api/users/bulk/ creates per request
+BULK_USER_MAX = 1000
+
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
\ No newline at end of file